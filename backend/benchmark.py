@@ -0,0 +1,392 @@
+"""
+Endpoint benchmark suite.
+Generates a plan with plan_generator.py in a scratch database (never gantt.db
+unless --db points there), drives the API in-process through its ASGI
+interface, and reports latency percentiles and throughput per endpoint.
+Results are written as JSON; --compare checks them against an earlier run.
+
+    python benchmark.py --tasks 100000 --depth 10 --links 200000
+    python benchmark.py --compare bench_results/baseline.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from plan_generator import parse_spec
+
+# 実行するシナリオ（この順に実行する。delete_subtree で減ったデータは import_csv が書き戻す）
+SCENARIOS = [
+    "get_all_tasks",
+    "get_all_tasks_cached",
+    "update_task",
+    "reorder_tasks",
+    "export_csv",
+    "delete_subtree",
+    "import_csv",
+]
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class ASGIClient:
+    """Minimal HTTP client calling an ASGI app in-process (no sockets)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(
+        self, method: str, path: str, params: Optional[dict] = None, json_body=None,
+        body: bytes = b"", headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, bytes]:
+        headers = dict(headers or {})
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["content-type"] = "application/json"
+        headers["content-length"] = str(len(body))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}).encode(),
+            "root_path": "",
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+        }
+        status = 0
+        chunks: List[bytes] = []
+        sent = False
+        done = asyncio.Event()
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # 応答を送り終えるまでは切断を知らせない
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status, b"".join(chunks)
+
+
+def multipart(name: str, filename: str, content: bytes) -> Tuple[bytes, Dict[str, str]]:
+    """Body and headers of a multipart/form-data upload of one file."""
+    boundary = f"bench{random.getrandbits(64):x}"
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], sizes: List[int]) -> dict:
+    """Latency percentiles (ms), throughput (requests/s, sequential) and mean response size."""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    result = {
+        "iterations": len(ordered),
+        "mean_ms": round(total / len(ordered) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        **{f"p{p}_ms": round(percentile(ordered, p) * 1000, 3) for p in PERCENTILES},
+        "throughput_per_s": round(len(ordered) / total, 2) if total else None,
+    }
+    if sizes:
+        result["mean_response_bytes"] = round(sum(sizes) / len(sizes))
+    return result
+
+
+class Recorder:
+    """Collects per-request timings by scenario name."""
+
+    def __init__(self, client: ASGIClient):
+        self.client = client
+        self.latencies: Dict[str, List[float]] = {}
+        self.sizes: Dict[str, List[int]] = {}
+
+    async def timed(self, name: str, method: str, path: str, **kwargs) -> bytes:
+        started = time.perf_counter()
+        status, body = await self.client.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - started
+        if status != 200:
+            raise RuntimeError(f"{name}: {method} {path} returned {status}: {body[:300]!r}")
+        self.latencies.setdefault(name, []).append(elapsed)
+        self.sizes.setdefault(name, []).append(len(body))
+        return body
+
+    def results(self) -> Dict[str, dict]:
+        return {
+            name: summarize(latencies, self.sizes.get(name, []))
+            for name, latencies in self.latencies.items()
+        }
+
+
+async def repeat(count: int, call: Callable[[int], Awaitable]):
+    for i in range(count):
+        await call(i)
+
+
+async def run_suite(app, args, rng: random.Random) -> Dict[str, dict]:
+    from response_cache import response_cache
+
+    client = ASGIClient(app)
+    recorder = Recorder(client)
+    scenarios = args.only or SCENARIOS
+    iterations = args.iterations
+
+    _, body = await client.request("GET", "/api/tasks", params={"fields": "parent"})
+    tasks = json.loads(body)["tasks"]
+    ids = [task["id"] for task in tasks]
+    siblings: Dict[int, List[int]] = {}
+    for task in tasks:
+        siblings.setdefault(task["parent"], []).append(task["id"])
+    # 兄弟のあるタスク -> その兄弟グループ（並べ替えても親は変わらない）
+    groups = {task_id: group for group in siblings.values() if len(group) > 1 for task_id in group}
+    movable = list(groups)
+
+    async def warm(call: Callable[[int], Awaitable], *names: str):
+        # ウォームアップの計測値は捨てる
+        await repeat(args.warmup, call)
+        for name in names:
+            recorder.latencies.pop(name, None)
+            recorder.sizes.pop(name, None)
+        await repeat(iterations, call)
+
+    if "get_all_tasks" in scenarios:
+        async def get_all(i):
+            response_cache.invalidate()  # 毎回シリアライズからやり直す
+            await recorder.timed("get_all_tasks", "GET", "/api/tasks")
+        await warm(get_all, "get_all_tasks")
+
+    if "get_all_tasks_cached" in scenarios:
+        async def get_all_cached(i):
+            await recorder.timed("get_all_tasks_cached", "GET", "/api/tasks")
+        await warm(get_all_cached, "get_all_tasks_cached")
+
+    if "update_task" in scenarios:
+        async def update(i):
+            await recorder.timed(
+                "update_task", "PUT", f"/api/tasks/{rng.choice(ids)}",
+                json_body={"text": f"bench {i}", "progress": round(rng.random(), 2)},
+            )
+        await warm(update, "update_task")
+
+    if "reorder_tasks" in scenarios and movable:
+        async def reorder(i):
+            task_id = rng.choice(movable)
+            before = rng.choice([other for other in groups[task_id] if other != task_id])
+            await recorder.timed(
+                "reorder_tasks", "POST", "/api/tasks/reorder",
+                json_body={"items": [{"id": task_id, "before": before}]},
+            )
+        await warm(reorder, "reorder_tasks")
+
+    exported: Dict[str, bytes] = {}
+    if "export_csv" in scenarios:
+        async def export(i):
+            exported["tasks"] = await recorder.timed("export_csv", "GET", "/api/export/csv")
+            exported["links"] = await recorder.timed(
+                "export_csv_links", "GET", "/api/export/csv", params={"table": "links"}
+            )
+        await warm(export, "export_csv", "export_csv_links")
+    elif "import_csv" in scenarios:
+        for table in ("tasks", "links"):
+            _, exported[table] = await client.request("GET", "/api/export/csv", params={"table": table})
+
+    if "delete_subtree" in scenarios:
+        # 2階層目のうち配下の多いタスクから順に消す（同じ階層なので互いに重ならない）
+        _, body = await client.request(
+            "GET", "/api/tasks/roots", params={"depth": 2, "fields": "descendant_count"}
+        )
+        second_level = [task for task in json.loads(body)["tasks"] if task["level"] == 2]
+        second_level.sort(key=lambda task: -task["descendant_count"])
+        targets = second_level[:args.delete_iterations]
+
+        for task in targets:
+            await recorder.timed("delete_subtree", "DELETE", f"/api/tasks/{task['id']}")
+        if targets:
+            recorder.sizes["delete_subtree"] = [task["descendant_count"] + 1 for task in targets]
+
+    if "import_csv" in scenarios:
+        # エクスポートした全件を置き換えで取り込む（delete_subtree で消した分も元に戻る）
+        uploads = {table: multipart("file", f"{table}.csv", exported[table]) for table in ("tasks", "links")}
+        for i in range(args.import_iterations):
+            for table in ("tasks", "links"):
+                body, headers = uploads[table]
+                await recorder.timed(
+                    "import_csv" if table == "tasks" else "import_csv_links", "POST", "/api/import/csv",
+                    params={"table": table, "mode": "replace"}, body=body, headers=headers,
+                )
+
+    results = recorder.results()
+    if "delete_subtree" in results:
+        # 応答サイズではなく削除したタスク数の平均
+        results["delete_subtree"]["mean_deleted_tasks"] = results["delete_subtree"].pop("mean_response_bytes")
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    import config
+
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "git_commit": git_commit(),
+        "db_mode": config.DB_MODE,
+        "db_profile": config.DB_PROFILE,
+        "db_read_pool_size": config.DB_READ_POOL_SIZE,
+        "response_cache_bytes": config.RESPONSE_CACHE_MAX_BYTES,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Print p50/p95 against a baseline run; return the scenarios slower by more than threshold."""
+    regressions = []
+    print(f"{'scenario':<24}{'p50 base':>12}{'p50 new':>12}{'p95 base':>12}{'p95 new':>12}  change")
+    for name, new in results["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        ratio = new["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        flag = "  REGRESSION" if ratio > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(
+            f"{name:<24}{old['p50_ms']:>12.2f}{new['p50_ms']:>12.2f}"
+            f"{old['p95_ms']:>12.2f}{new['p95_ms']:>12.2f}  {ratio:+.1%}{flag}"
+        )
+    if baseline.get("plan") != results["plan"]:
+        print("note: the baseline was measured on a different plan")
+    return regressions
+
+
+async def benchmark(args, spec) -> dict:
+    # 設定は環境変数から読まれるので、DBの場所を決めてから import する
+    import main
+    from database import engine
+    from plan_generator import generate_plan
+
+    async with main.app.router.lifespan_context(main.app):
+        with engine.begin() as conn:
+            stats = generate_plan(conn, spec)
+        print(f"generated {stats.tasks} tasks / {stats.links} links in {stats.seconds}s", file=sys.stderr)
+        started = time.perf_counter()
+        results = await run_suite(main.app, args, random.Random(spec.seed))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "plan": asdict(spec),
+        "plan_stats": asdict(stats),
+        "settings": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "delete_iterations": args.delete_iterations,
+            "import_iterations": args.import_iterations,
+        },
+        "suite_seconds": round(elapsed, 3),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests before each scenario")
+    parser.add_argument("--delete-iterations", type=int, default=5, help="subtrees deleted")
+    parser.add_argument("--import-iterations", type=int, default=3, help="full CSV re-imports")
+    parser.add_argument("--only", type=lambda value: value.split(","), default=None,
+                        help=f"comma-separated subset of: {','.join(SCENARIOS)}")
+    parser.add_argument("--db", default=None, help="SQLite file to use (default: a temporary file)")
+    parser.add_argument("--output", default=None, help="result JSON path (default: bench_results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="p50 slowdown ratio reported as a regression (0.2 = 20%%)")
+    args, spec = parse_spec(parser, argv)
+    unknown = set(args.only or []) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    scratch = None
+    if args.db is None:
+        scratch = tempfile.TemporaryDirectory(prefix="gantt-bench-")
+        args.db = os.path.join(scratch.name, "bench.db")
+    os.environ["GANTT_DB_PATH"] = args.db
+    try:
+        results = asyncio.run(benchmark(args, spec))
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+    output = args.output or os.path.join(
+        "bench_results", f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, result in results["results"].items():
+        print(
+            f"{name:<24}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['throughput_per_s'] or 0:>10.2f}"
+        )
+    print(f"saved {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Live change feed: pushes the changes of every committed write to clients over
+Server-Sent Events (GET /api/events).
+Write paths need no extra code: bump_revision() marks the transaction, and
+after it commits the broker announces the new revision. Each client stream
+then sends one delta since the last revision it sent (the same payload as
+GET /api/tasks/changes). A subscriber holds only its last sent revision, not
+a queue, so bursts are coalesced and a slow client simply gets a bigger delta
+when it catches up; a delta too large to be worth pushing becomes a "resync"
+event telling the client to reload everything.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import (
+    CHANGE_FEED_BROKER, CHANGE_FEED_POLL_SECONDS, CHANGE_FEED_COALESCE_SECONDS,
+    CHANGE_FEED_HEARTBEAT_SECONDS, CHANGE_FEED_MAX_ROWS,
+)
+from database import read_session
+from models import Task as TaskModel, Link as LinkModel, SyncState
+from response_cache import response_cache
+from revision import get_revision
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeBroker:
+    """
+    Tracks the latest committed revision and wakes the waiting subscribers.
+    This base class delivers commits of this process only; subclasses add
+    other sources of revisions (see PollingBroker) by calling advance().
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self.revision = 0
+        self.closed = False
+        self.subscribers = 0
+        self._changed: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self.closed = False
+        async with read_session() as db:
+            self.revision = await get_revision(db)
+
+    async def stop(self):
+        self.closed = True
+        if self._changed is not None:
+            self._wake()
+
+    def publish(self, revision: int):
+        """Announce a committed revision (callable from any thread)."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.advance, revision)
+
+    def advance(self, revision: int):
+        """Record a revision on the event loop, waking subscribers if it is new."""
+        if revision > self.revision:
+            self.revision = revision
+            self._wake()
+
+    def _wake(self):
+        # 待っている購読者をすべて起こし、次の変更用に新しい Event を用意する
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, after: int, timeout: float) -> Optional[int]:
+        """The latest revision once it is past after; None on timeout or shutdown."""
+        while self.revision <= after and not self.closed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return None if self.closed else self.revision
+
+    def stats(self) -> Dict[str, object]:
+        return {"broker": self.name, "revision": self.revision, "subscribers": self.subscribers}
+
+
+class PollingBroker(ChangeBroker):
+    """ChangeBroker that also reads sync_state periodically, so commits of other worker processes are seen."""
+
+    name = "poll"
+
+    def __init__(self, interval: float = CHANGE_FEED_POLL_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await super().start()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await super().stop()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # 購読者がいなければDBを読まない
+            if not self.subscribers:
+                continue
+            try:
+                async with read_session() as db:
+                    self.advance(await get_revision(db))
+            except Exception:
+                logger.exception("Polling the revision for the change feed failed")
+
+
+# GANTT_CHANGE_FEED_BROKER で選ぶ実装（Redis などの配信を足す場合はここに登録する）
+BROKERS = {
+    ChangeBroker.name: ChangeBroker,
+    PollingBroker.name: PollingBroker,
+}
+
+broker: ChangeBroker = BROKERS[CHANGE_FEED_BROKER]()
+
+
+def format_event(event_name: str, revision: int, data: bytes) -> bytes:
+    return f"event: {event_name}\nid: {revision}\ndata: ".encode() + data + b"\n\n"
+
+
+async def delta_too_large(db: AsyncSession, since: int, limit: int) -> bool:
+    """Whether more than limit tasks and links changed after since (counts at most limit + 1 rows)."""
+    remaining = limit
+    for model in (TaskModel, LinkModel):
+        changed = select(model.id).where(model.revision > since).limit(remaining + 1).subquery()
+        remaining -= await db.scalar(select(func.count()).select_from(changed))
+        if remaining < 0:
+            return True
+    return False
+
+
+async def build_event(since: int):
+    """(SSE message, revision) carrying the changes after since; shared by clients at the same revision."""
+    # 循環importを避けるため関数内でimport
+    from routers.tasks import load_changes
+    from serialization import dumps
+
+    variant = f"events-{since}"
+    async with read_session() as db:
+        revision, reset_revision = (await db.execute(
+            select(SyncState.revision, SyncState.reset_revision).where(SyncState.id == 1)
+        )).one()
+        message = response_cache.get(variant, revision)
+        if message is not None:
+            return message, revision
+        # 送らない差分は読み込まない（全件置き換え後か件数が多ければ件数だけ数えて resync にする）
+        if since < reset_revision or await delta_too_large(db, since, CHANGE_FEED_MAX_ROWS):
+            message = format_event("resync", revision, dumps({"revision": revision}))
+        else:
+            changes = await load_changes(db, since)
+            revision = changes.revision
+            message = format_event("changes", revision, changes.model_dump_json().encode())
+    response_cache.put(variant, revision, message)
+    return message, revision
+
+
+async def change_events(since: Optional[int]) -> AsyncIterator[bytes]:
+    """SSE stream of the changes after since (None: from now on)."""
+    last = broker.revision if since is None else since
+    broker.subscribers += 1
+    try:
+        yield b"retry: 3000\n\n" + format_event("ready", last, f'{{"revision":{last}}}'.encode())
+        while True:
+            revision = await broker.wait(last, CHANGE_FEED_HEARTBEAT_SECONDS)
+            if broker.closed:
+                return
+            if revision is None:
+                # 接続を維持するためのコメント行
+                yield b": keepalive\n\n"
+                continue
+            # 続けて来る変更を待ってから1つのイベントにまとめる
+            await asyncio.sleep(CHANGE_FEED_COALESCE_SECONDS)
+            message, last = await build_event(last)
+            yield message
+    finally:
+        broker.subscribers -= 1
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session):
+    revision = session.info.pop("feed_revision", None)
+    if revision is not None:
+        broker.publish(revision)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_unpublished(session: Session):
+    session.info.pop("feed_revision", None)
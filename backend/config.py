@@ -0,0 +1,41 @@
+"""
+Backend settings.
+Values are read from environment variables so that benchmark runs can switch
+configurations without code changes.
+"""
+
+import os
+
+# SQLiteファイルのパス
+DATABASE_PATH = os.getenv("GANTT_DB_PATH", "./gantt.db")
+
+# DBアクセス方式
+#   "async": aiosqlite + AsyncSession（イベントループ上で実行）
+#   "sync":  従来の sync Session をスレッドプールで実行（比較用）
+DB_MODE = os.getenv("GANTT_DB_MODE", "async")
+
+# SQLiteストレージプロファイル
+#   "tuned":   WAL / synchronous=NORMAL / mmap / cache_size / busy_timeout を全接続に設定
+#   "default": SQLiteの既定値のまま（比較用）
+DB_PROFILE = os.getenv("GANTT_DB_PROFILE", "tuned")
+SQLITE_MMAP_SIZE = int(os.getenv("GANTT_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# 負の値はKiB単位（-65536 = 64MiB）
+SQLITE_CACHE_SIZE = int(os.getenv("GANTT_SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("GANTT_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# 読み取り専用エンドポイント用の接続プールサイズ（書き込みは常に1接続で直列化）
+DB_READ_POOL_SIZE = int(os.getenv("GANTT_DB_READ_POOL_SIZE", "4"))
+
+# get_all_tasks のシリアライズ済みJSONをキャッシュする上限（バイト、0で無効）
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("GANTT_RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# 変更フィード（GET /api/events）
+#   "local": プロセス内で配信（1ワーカー向け）
+#   "poll":  sync_state のリビジョンを定期的に読む（同じDBファイルを使う複数ワーカー向け）
+CHANGE_FEED_BROKER = os.getenv("GANTT_CHANGE_FEED_BROKER", "local")
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("GANTT_CHANGE_FEED_POLL_SECONDS", "0.5"))
+# 連続した変更を1つのイベントにまとめるため、通知を受けてから待つ時間
+CHANGE_FEED_COALESCE_SECONDS = float(os.getenv("GANTT_CHANGE_FEED_COALESCE_SECONDS", "0.05"))
+CHANGE_FEED_HEARTBEAT_SECONDS = float(os.getenv("GANTT_CHANGE_FEED_HEARTBEAT_SECONDS", "15"))
+# 1イベントで送るタスク・リンク数の上限（超えたら resync を送り、全件を取り直させる）
+CHANGE_FEED_MAX_ROWS = int(os.getenv("GANTT_CHANGE_FEED_MAX_ROWS", "2000"))
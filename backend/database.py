@@ -1,18 +1,174 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+from contextlib import asynccontextmanager
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./gantt.db"
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
 
+from config import (
+    DATABASE_PATH,
+    DB_MODE,
+    DB_PROFILE,
+    DB_READ_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+)
+
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+# 接続ごとに発行するPRAGMA
+STORAGE_PROFILES = {
+    "default": [],
+    "tuned": [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+    ],
+}
+
+
+def _install_pragmas(sync_engine, read_only: bool = False):
+    """Run the storage profile pragmas on every new connection of an engine."""
+    pragmas = list(STORAGE_PROFILES[DB_PROFILE])
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+# 書き込みは1接続のプールで直列化し、読み取りは別プールで並行させる
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    pool_size=1,
+    max_overflow=0,
+)
+read_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=0,
 )
 
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, pool_size=1, max_overflow=0
+)
+async_read_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, pool_size=DB_READ_POOL_SIZE, max_overflow=0
+)
+
+_install_pragmas(engine)
+_install_pragmas(read_engine, read_only=True)
+_install_pragmas(async_engine.sync_engine)
+_install_pragmas(async_read_engine.sync_engine, read_only=True)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# commit後に属性を遅延ロードしないよう expire_on_commit=False
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
 
 
+class ThreadedSession:
+    """
+    AsyncSession-compatible wrapper around a sync Session.
+    Each call runs on Starlette's threadpool, which reproduces the old
+    sync-handler behaviour when DB_MODE is "sync".
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def info(self):
+        return self.sync_session.info
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def expunge_all(self):
+        self.sync_session.expunge_all()
+
+    async def execute(self, statement, params=None, execution_options=None, **kw):
+        # AsyncSession と同様に結果を先読みしておく
+        options = {**(execution_options or {}), "prebuffer_rows": True}
+        return await run_in_threadpool(
+            self.sync_session.execute, statement, params,
+            execution_options=options, **kw
+        )
+
+    async def stream(self, statement, params=None, **kw):
+        result = await run_in_threadpool(self.sync_session.execute, statement, params, **kw)
+        return ThreadedStreamResult(result)
+
+    async def scalars(self, statement, params=None, **kw):
+        result = await self.execute(statement, params, **kw)
+        return result.scalars()
+
+    async def scalar(self, statement, params=None, **kw):
+        result = await self.execute(statement, params, **kw)
+        return result.scalar()
+
+    async def get(self, entity, ident, **kw):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kw)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kw):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kw)
+
+
+class ThreadedStreamResult:
+    """Minimal AsyncResult counterpart for ThreadedSession.stream()."""
+
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size=None):
+        partitions = self._result.partitions(size)
+        while True:
+            rows = await run_in_threadpool(next, partitions, None)
+            if rows is None:
+                break
+            yield rows
+
+
 def get_db():
     """Dependency for getting database session."""
     db = SessionLocal()
@@ -22,6 +178,61 @@ def get_db():
         db.close()
 
 
+# sync モードではプールの空き待ちでスレッドプールを塞がないよう、
+# 接続数ぶんの枠をイベントループ側で確保してからセッションを開く
+_write_slots = asyncio.Semaphore(1)
+_read_slots = asyncio.Semaphore(DB_READ_POOL_SIZE)
+
+
+@asynccontextmanager
+async def _session_scope(sync_factory, async_factory, slots: asyncio.Semaphore):
+    if DB_MODE == "sync":
+        async with slots:
+            db = ThreadedSession(sync_factory(expire_on_commit=False))
+            try:
+                yield db
+            finally:
+                await db.close()
+    else:
+        db = async_factory()
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+def write_session():
+    """Async context manager for a write session outside of request handlers."""
+    return _session_scope(SessionLocal, AsyncSessionLocal, _write_slots)
+
+
+async def get_async_db():
+    """Dependency for getting an async database session (switchable by DB_MODE)."""
+    async with write_session() as db:
+        yield db
+
+
+def read_session():
+    """Async context manager for a read-only session outside of request handlers."""
+    return _session_scope(ReadSessionLocal, AsyncReadSessionLocal, _read_slots)
+
+
+async def get_async_read_db():
+    """Dependency for getting a session from the read-only connection pool."""
+    async with read_session() as db:
+        yield db
+
+
+async def dispose_engines():
+    """Close all pooled connections."""
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+    engine.dispose()
+    read_engine.dispose()
+
+
 def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+    """Create or upgrade the database schema."""
+    # 循環importを避けるため関数内でimport
+    from migrations import run_migrations
+    run_migrations(engine)
@@ -0,0 +1,101 @@
+"""
+Date parsing and duration computation for whole columns at once.
+Tasks keep "YYYY-MM-DD HH:mm:ss" strings on the wire and in start_date/end_date;
+the database derives integer timestamps (start_ts/end_ts) from them for
+indexing. A plan has far fewer distinct dates than rows, so every batch
+function parses each distinct string only once.
+"""
+
+import calendar
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_EPOCH = datetime(1970, 1, 1)
+
+# fromisoformat が受け付けない "2026/1/5" や "2026-1-5 9:00" のような表記用
+_LOOSE_DATE = re.compile(
+    r"^\s*(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?\s*$"
+)
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse one date string; None if it is empty or invalid."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        pass
+    else:
+        # 日付はサーバーのローカル時刻（タイムゾーンなし）で保存するので、UTCオフセット付きの値は変換する
+        return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo is not None else parsed
+    match = _LOOSE_DATE.match(value)
+    if not match:
+        return None
+    try:
+        return datetime(*(int(part) for part in match.groups() if part is not None))
+    except ValueError:
+        return None
+
+
+def format_datetime(value: datetime) -> str:
+    """Format as "YYYY-MM-DD HH:mm:ss"."""
+    if value.tzinfo is None:
+        # strftime より isoformat の方がかなり速い
+        return value.replace(microsecond=0).isoformat(" ")
+    return value.strftime(DATETIME_FORMAT)
+
+
+def parse_column(values: Iterable[Optional[str]]) -> Dict[Optional[str], Optional[datetime]]:
+    """Parse each distinct value of a column once."""
+    return {value: parse_datetime(value) for value in set(values)}
+
+
+def normalize_dates(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """Canonical "YYYY-MM-DD HH:mm:ss" for each value (None where unparsable)."""
+    parsed = parse_column(values)
+    canonical = {value: format_datetime(dt) if dt else None for value, dt in parsed.items()}
+    return [canonical[value] for value in values]
+
+
+def calculate_durations(starts: Sequence[Optional[str]], ends: Sequence[Optional[str]]) -> List[int]:
+    """Whole days between the date parts of each start/end pair (at least 1, 1 if unparsable)."""
+    parsed = parse_column([*starts, *ends])
+    days = {value: dt.toordinal() if dt else None for value, dt in parsed.items()}
+    durations = []
+    for start, end in zip(starts, ends):
+        start_day, end_day = days[start], days[end]
+        if start_day is None or end_day is None:
+            durations.append(1)
+        else:
+            durations.append(max(1, end_day - start_day))
+    return durations
+
+
+def shift_dates(values: Sequence[Optional[str]], days: int) -> List[Optional[str]]:
+    """Each date moved by whole days ("YYYY-MM-DD HH:mm:ss"); unparsable values are kept as they are."""
+    if not days:
+        return list(values)
+    offset = timedelta(days=days)
+    shifted = {
+        value: format_datetime(dt + offset) if dt else value
+        for value, dt in parse_column(values).items()
+    }
+    return [shifted[value] for value in values]
+
+
+def format_timestamp(timestamp: int) -> str:
+    """Format epoch seconds (UTC, as produced by SQLite's strftime('%s', ...))."""
+    return format_datetime(_EPOCH + timedelta(seconds=timestamp))
+
+
+def format_timestamps(timestamps: Iterable[int]) -> Dict[int, str]:
+    """format_timestamp() of each distinct value, computed once per value."""
+    return {timestamp: format_timestamp(timestamp) for timestamp in set(timestamps)}
+
+
+def date_to_timestamp(day: date) -> int:
+    """Epoch seconds of midnight UTC, matching SQLite's strftime('%s', ...)."""
+    return calendar.timegm(day.timetuple())
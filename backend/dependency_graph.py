@@ -0,0 +1,258 @@
+"""
+In-memory adjacency index of links.
+The index is loaded lazily from the links table and then kept in sync by the
+write paths: they stage their link changes in the session (stage_*), and the
+changes are applied when the transaction commits. The index records the
+revision it reflects; if any commit was missed (another process, a reset
+import), it is reloaded on next use.
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Task as TaskModel, Link as LinkModel, SyncState
+
+LinkEntry = Tuple[int, int, int]  # (source, target, type)
+
+
+class DependencyGraph:
+    """Successor/predecessor index of links keyed by task ID."""
+
+    def __init__(self):
+        self.loaded = False
+        self.revision = -1
+        self.links: Dict[int, LinkEntry] = {}
+        self.outgoing: Dict[int, Set[int]] = defaultdict(set)
+        self.incoming: Dict[int, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    async def ensure_current(self, db: AsyncSession) -> "DependencyGraph":
+        """
+        Load the index if it is missing or behind the database.
+        In a write transaction, call this before the first write.
+        """
+        revision = await db.scalar(select(SyncState.revision).where(SyncState.id == 1))
+        if self.loaded and self.revision == revision:
+            return self
+
+        # リビジョンとリンクを1文で読み、同じスナップショットに揃える
+        rows = (await db.execute(
+            select(
+                select(SyncState.revision).where(SyncState.id == 1).scalar_subquery(),
+                LinkModel.id, LinkModel.source, LinkModel.target, LinkModel.type,
+            )
+        )).all()
+        if rows:
+            revision = rows[0][0]
+
+        with self._lock:
+            self.links = {}
+            self.outgoing = defaultdict(set)
+            self.incoming = defaultdict(set)
+            for _, link_id, source, target, link_type in rows:
+                self._add(link_id, source, target, link_type or 0)
+            self.revision = revision
+            self.loaded = True
+        return self
+
+    def _add(self, link_id: int, source: int, target: int, link_type: int):
+        self.links[link_id] = (source, target, link_type)
+        self.outgoing[source].add(link_id)
+        self.incoming[target].add(link_id)
+
+    def _remove(self, link_id: int):
+        entry = self.links.pop(link_id, None)
+        if entry is None:
+            return
+        source, target, _ = entry
+        self.outgoing[source].discard(link_id)
+        self.incoming[target].discard(link_id)
+
+    def _remove_tasks(self, task_ids: Iterable[int]):
+        for task_id in task_ids:
+            for link_id in list(self.outgoing.pop(task_id, ())) + list(self.incoming.pop(task_id, ())):
+                self._remove(link_id)
+
+    def apply(self, revision: int, ops: List[tuple]):
+        """Apply the staged changes of a committed transaction."""
+        with self._lock:
+            if not self.loaded:
+                return
+            # 取りこぼしたコミットがあれば次回の利用時に読み直す
+            if revision != self.revision + 1 or any(op[0] == "reset" for op in ops):
+                self.loaded = False
+                return
+            for op in ops:
+                if op[0] == "add":
+                    self._add(*op[1:])
+                elif op[0] == "remove":
+                    self._remove(op[1])
+                elif op[0] == "remove_tasks":
+                    self._remove_tasks(op[1])
+            self.revision = revision
+
+    def successors(self, task_id: int) -> List[Tuple[int, int, int, int]]:
+        """(id, source, target, type) of the links leaving a task."""
+        with self._lock:
+            return [(link_id, *self.links[link_id]) for link_id in self.outgoing.get(task_id, ())]
+
+    def predecessors(self, task_id: int) -> List[Tuple[int, int, int, int]]:
+        """(id, source, target, type) of the links entering a task."""
+        with self._lock:
+            return [(link_id, *self.links[link_id]) for link_id in self.incoming.get(task_id, ())]
+
+    def would_create_cycle(self, session_info: dict, source: int, target: int) -> bool:
+        """
+        Whether source -> target closes a cycle, considering changes staged in
+        the current transaction. Visits only tasks reachable from target.
+        """
+        if source == target:
+            return True
+
+        staged_out = defaultdict(list)
+        removed_links: Set[int] = set()
+        removed_tasks: Set[int] = set()
+        for op in session_info.get("graph_ops", ()):
+            if op[0] == "add":
+                staged_out[op[2]].append(op[3])
+            elif op[0] == "remove":
+                removed_links.add(op[1])
+            elif op[0] == "remove_tasks":
+                removed_tasks.update(op[1])
+
+        with self._lock:
+            seen = {target}
+            queue = deque([target])
+            while queue:
+                node = queue.popleft()
+                next_nodes = [
+                    self.links[link_id][1]
+                    for link_id in self.outgoing.get(node, ())
+                    if link_id not in removed_links
+                ]
+                for successor in next_nodes + staged_out.get(node, []):
+                    if successor == source:
+                        return True
+                    if successor not in seen and successor not in removed_tasks:
+                        seen.add(successor)
+                        queue.append(successor)
+        return False
+
+
+dependency_graph = DependencyGraph()
+
+
+def _stage(db: AsyncSession, op: tuple):
+    db.info.setdefault("graph_ops", []).append(op)
+
+
+def stage_link_added(db: AsyncSession, link_id: int, source: int, target: int, link_type: int):
+    _stage(db, ("add", link_id, source, target, link_type))
+
+
+def stage_link_removed(db: AsyncSession, link_id: int):
+    _stage(db, ("remove", link_id))
+
+
+def stage_tasks_removed(db: AsyncSession, task_ids: Iterable[int]):
+    _stage(db, ("remove_tasks", list(task_ids)))
+
+
+def stage_reset(db: AsyncSession):
+    """Mark the index stale (bulk changes such as a CSV import)."""
+    _stage(db, ("reset",))
+
+
+def check_new_link(db: AsyncSession, source: int, target: int):
+    """Reject a link that would make the dependency graph cyclic."""
+    if dependency_graph.would_create_cycle(db.info, source, target):
+        raise HTTPException(
+            status_code=400, detail=f"Link {source} -> {target} would create a dependency cycle"
+        )
+
+
+def find_cycle(edges: Iterable[Tuple[int, int]]) -> Optional[List[int]]:
+    """Task IDs along one cycle of (source, target) edges, or None if they form a DAG."""
+    predecessors = defaultdict(list)
+    successors = defaultdict(list)
+    in_degree: Dict[int, int] = defaultdict(int)
+    for source, target in edges:
+        successors[source].append(target)
+        predecessors[target].append(source)
+        in_degree[target] += 1
+        in_degree.setdefault(source, 0)
+
+    # Kahn法で外せないタスクが残れば循環がある
+    queue = deque(node for node, degree in in_degree.items() if degree == 0)
+    while queue:
+        node = queue.popleft()
+        for successor in successors[node]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                queue.append(successor)
+    remaining = {node for node, degree in in_degree.items() if degree > 0}
+    if not remaining:
+        return None
+
+    # 残ったタスクには残ったタスクからの先行が必ずあるので、先行を辿れば循環に戻ってくる
+    path: List[int] = []
+    index: Dict[int, int] = {}
+    node = min(remaining)
+    while node not in index:
+        index[node] = len(path)
+        path.append(node)
+        node = next(source for source in predecessors[node] if source in remaining)
+    cycle = path[index[node]:]
+    cycle.reverse()
+    # 最小のIDから始める（同じ循環は常に同じ表記になる）
+    first = cycle.index(min(cycle))
+    cycle = cycle[first:] + cycle[:first]
+    return cycle + [cycle[0]]
+
+
+async def check_links(db: AsyncSession):
+    """
+    Reject the links table as seen by the current transaction if a link refers
+    to a missing task or the links form a cycle (bulk writes such as a CSV import).
+    Reads every link once: O(tasks + links).
+    """
+    orphan = (await db.execute(
+        select(LinkModel.id, LinkModel.source, LinkModel.target)
+        .where(or_(
+            ~exists().where(TaskModel.id == LinkModel.source),
+            ~exists().where(TaskModel.id == LinkModel.target),
+        ))
+        .order_by(LinkModel.id)
+        .limit(1)
+    )).first()
+    if orphan is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Link {orphan.id} ({orphan.source} -> {orphan.target}): source or target task not found",
+        )
+    cycle = find_cycle((await db.execute(select(LinkModel.source, LinkModel.target))).all())
+    if cycle is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Links would create a dependency cycle: {' -> '.join(map(str, cycle))}",
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session):
+    revision = session.info.pop("revision", None)
+    ops = session.info.pop("graph_ops", [])
+    if revision is not None:
+        dependency_graph.apply(revision, ops)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged(session: Session):
+    session.info.pop("revision", None)
+    session.info.pop("graph_ops", None)
@@ -0,0 +1,59 @@
+"""
+Edit history of tasks: one task_edits row per task and day it was edited.
+This replaces the comma-separated tasks.edit_date string. Recording an edit is
+a single INSERT OR IGNORE on the (task_id, date) primary key, and activity
+queries use the (date, task_id) index. The legacy string is still produced
+from these rows by Task.edit_date (models.py) for the API and CSV export.
+"""
+
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dates import parse_datetime
+from models import TaskEdit
+
+
+def parse_edit_dates(value: Optional[str]) -> List[str]:
+    """Distinct "YYYY-MM-DD" dates of a legacy edit_date string, oldest first (unparsable entries are dropped)."""
+    if not value:
+        return []
+    # フロントエンドは "2026-1-5" のようにゼロ埋めしないので正規化してから比較する
+    days = {parse_datetime(part) for part in value.split(",")}
+    return sorted({day.date().isoformat() for day in days if day is not None})
+
+
+def unparsed_edit_dates(value: Optional[str]) -> List[str]:
+    """Non-empty entries of a legacy edit_date string that parse_edit_dates() drops."""
+    if not value:
+        return []
+    return [part.strip() for part in value.split(",") if part.strip() and parse_datetime(part) is None]
+
+
+def edit_rows(task_id: int, value: Optional[str]) -> List[dict]:
+    return [{"task_id": task_id, "date": day} for day in parse_edit_dates(value)]
+
+
+async def add_edits(db: AsyncSession, rows: List[dict]):
+    """Insert {task_id, date} rows, ignoring days already recorded."""
+    if rows:
+        await db.execute(sqlite_insert(TaskEdit).on_conflict_do_nothing(), rows)
+
+
+async def record_edit(db: AsyncSession, task_id: int, value: Optional[str] = None):
+    """Record that a task was edited today, plus any dates of a legacy edit_date string sent by the client."""
+    rows = edit_rows(task_id, value)
+    rows.append({"task_id": task_id, "date": date.today().isoformat()})
+    await add_edits(db, rows)
+
+
+async def replace_edits(db: AsyncSession, values: Iterable[Tuple[int, Optional[str]]]):
+    """Replace the history of each task with the dates of its legacy string (CSV merge)."""
+    values = list(values)
+    if not values:
+        return
+    await db.execute(delete(TaskEdit).where(TaskEdit.task_id.in_([task_id for task_id, _ in values])))
+    await add_edits(db, [row for task_id, value in values for row in edit_rows(task_id, value)])
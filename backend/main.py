@@ -1,19 +1,15 @@
-import csv
-import io
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import List
 
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
-from database import init_db, SessionLocal
-from models import Task as TaskModel, Link as LinkModel
-from routers import tasks, links
-from schemas import ImportResponse
+from change_feed import broker
+from database import init_db, dispose_engines
+from ranking import renumberer
+from routers import tasks, links, csv_io, batch, diff, activity, events
 
 
 @asynccontextmanager
@@ -21,8 +17,13 @@ async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup
     init_db()
+    renumberer.start()
+    await broker.start()
     yield
-    # Shutdown (nothing to clean up)
+    # Shutdown
+    await broker.stop()
+    await renumberer.stop()
+    await dispose_engines()
 
 
 app = FastAPI(
@@ -44,10 +45,15 @@ app.add_middleware(
 # Include routers
 app.include_router(tasks.router)
 app.include_router(links.router)
+app.include_router(csv_io.router)
+app.include_router(batch.router)
+app.include_router(diff.router)
+app.include_router(activity.router)
+app.include_router(events.router)
 
 
 @app.get("/api/health")
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return {"status": "ok", "version": "1.0.0"}
 
@@ -75,135 +81,6 @@ async def serve_root():
     return {"message": "Gantt Chart API (Frontend not found)"}
 
 
-@app.get("/api/export/csv")
-def export_csv():
-    """Export tasks and links as CSV files (zipped)."""
-    db = SessionLocal()
-    try:
-        tasks = db.query(TaskModel).order_by(TaskModel.parent, TaskModel.sortorder).all()
-
-        # Create CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        headers = [
-            "id", "text", "start_date", "end_date", "duration", "progress",
-            "parent", "kind_task", "ToDo", "task_schedule", "folder",
-            "url_adress", "mail", "memo", "hyperlink", "color", "textColor",
-            "owner_id", "sortorder", "edit_date"
-        ]
-        writer.writerow(headers)
-
-        # Write tasks
-        for task in tasks:
-            writer.writerow([
-                task.id,
-                task.text,
-                task.start_date,
-                task.end_date,
-                task.duration,
-                task.progress,
-                task.parent,
-                task.kind_task,
-                task.ToDo or "",
-                task.task_schedule or "",
-                task.folder or "",
-                task.url_adress or "",
-                task.mail or "",
-                task.memo or "",
-                task.hyperlink or "",
-                task.color or "",
-                task.textColor or "",
-                task.owner_id,
-                task.sortorder,
-                task.edit_date or "",
-            ])
-
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"gantt_tasks_{timestamp}.csv"
-
-        # Add BOM for Excel compatibility
-        content = "\ufeff" + output.getvalue()
-
-        return StreamingResponse(
-            iter([content]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    finally:
-        db.close()
-
-
-@app.post("/api/import/csv", response_model=ImportResponse)
-async def import_csv(file: UploadFile = File(...)):
-    """Import tasks from CSV file."""
-    db = SessionLocal()
-    try:
-        content = await file.read()
-        # Try to decode with BOM
-        try:
-            text = content.decode("utf-8-sig")
-        except UnicodeDecodeError:
-            text = content.decode("utf-8")
-
-        reader = csv.DictReader(io.StringIO(text))
-
-        imported_count = 0
-        skipped_count = 0
-        errors: List[str] = []
-
-        # Clear existing data
-        db.query(LinkModel).delete()
-        db.query(TaskModel).delete()
-        db.commit()
-
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        for row_num, row in enumerate(reader, start=2):
-            try:
-                task = TaskModel(
-                    id=int(row.get("id", 0)),
-                    text=row.get("text", ""),
-                    start_date=row.get("start_date", now),
-                    end_date=row.get("end_date", now),
-                    duration=int(row.get("duration", 1)) if row.get("duration") else 1,
-                    progress=float(row.get("progress", 0)) if row.get("progress") else 0.0,
-                    parent=int(row.get("parent", 0)) if row.get("parent") else 0,
-                    kind_task=int(row.get("kind_task", 1)) if row.get("kind_task") else 1,
-                    owner_id=int(row.get("owner_id", 0)) if row.get("owner_id") else 0,
-                    sortorder=int(row.get("sortorder", 0)) if row.get("sortorder") else 0,
-                    color=row.get("color") or None,
-                    textColor=row.get("textColor") or None,
-                    ToDo=row.get("ToDo") or None,
-                    task_schedule=row.get("task_schedule") or None,
-                    folder=row.get("folder") or None,
-                    url_adress=row.get("url_adress") or None,
-                    mail=row.get("mail") or None,
-                    memo=row.get("memo") or None,
-                    hyperlink=row.get("hyperlink") or None,
-                    edit_date=row.get("edit_date") or None,
-                    created_at=now,
-                    updated_at=now,
-                )
-                db.add(task)
-                imported_count += 1
-            except Exception as e:
-                errors.append(f"行 {row_num}: {str(e)}")
-                skipped_count += 1
-
-        db.commit()
-
-        return ImportResponse(
-            imported_count=imported_count,
-            skipped_count=skipped_count,
-            errors=errors,
-        )
-    finally:
-        db.close()
-
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,259 @@
+"""
+Versioned schema migrations for the Gantt Chart database.
+The applied version is stored in SQLite's PRAGMA user_version, and each
+migration runs in its own transaction, so existing gantt.db files are
+upgraded in place at startup.
+"""
+
+import logging
+
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+def _v1_initial_schema(conn: Connection):
+    """Tables as originally created by Base.metadata.create_all."""
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            duration INTEGER,
+            progress FLOAT,
+            parent INTEGER,
+            kind_task INTEGER,
+            owner_id INTEGER,
+            sortorder INTEGER,
+            color TEXT,
+            "textColor" TEXT,
+            "ToDo" TEXT,
+            task_schedule TEXT,
+            folder TEXT,
+            url_adress TEXT,
+            mail TEXT,
+            memo TEXT,
+            hyperlink TEXT,
+            edit_date TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_id ON tasks (id)")
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS links (
+            id INTEGER NOT NULL,
+            source INTEGER NOT NULL,
+            target INTEGER NOT NULL,
+            type INTEGER,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_links_id ON links (id)")
+
+
+def _v2_hot_path_indexes(conn: Connection):
+    """Indexes for sibling lookups/ordering and link cleanup."""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_parent_sortorder ON tasks (parent, sortorder)"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_links_source ON links (source)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_links_target ON links (target)")
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    """ALTER TABLE ADD COLUMN unless the column (including generated ones) already exists."""
+    existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_xinfo({table})")}
+    if column not in existing:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _v3_revisions(conn: Connection):
+    """Revision counter, per-row revisions and tombstones for delta sync."""
+    _add_column(conn, "tasks", "revision", "INTEGER DEFAULT '0' NOT NULL")
+    _add_column(conn, "links", "revision", "INTEGER DEFAULT '0' NOT NULL")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tasks_revision ON tasks (revision)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_links_revision ON links (revision)")
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            reset_revision INTEGER NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO sync_state (id, revision, reset_revision) VALUES (1, 0, 0)"
+    )
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS tombstones (
+            id INTEGER NOT NULL,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_tombstones_revision ON tombstones (revision)"
+    )
+
+
+def _v4_date_window_index(conn: Connection):
+    """Index for date-window (viewport) queries."""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_end_start ON tasks (end_date, start_date)"
+    )
+
+
+def _normalize_task_dates(conn: Connection):
+    """Rewrite start_date/end_date in the canonical "YYYY-MM-DD HH:mm:ss" form where they parse."""
+    from dates import normalize_dates
+
+    for column in ("start_date", "end_date"):
+        rows = conn.exec_driver_sql(f"SELECT id, {column} FROM tasks").all()
+        canonical = normalize_dates([value for _, value in rows])
+        changes = []
+        for (task_id, value), new in zip(rows, canonical):
+            if new is None:
+                logger.warning(
+                    "Migration 5: task %d has an unparsable %s %r (it is kept, but left out of date windows)",
+                    task_id, column, value,
+                )
+            elif new != value:
+                changes.append((new, task_id))
+        if changes:
+            conn.exec_driver_sql(f"UPDATE tasks SET {column} = ? WHERE id = ?", changes)
+
+
+def _v5_typed_dates(conn: Connection):
+    """Integer timestamps derived from start_date/end_date, indexed for range queries."""
+    # strftime('%s') は "2026/1/5" のような表記を読めないので、先に正規化しておく
+    _normalize_task_dates(conn)
+    _add_column(
+        conn, "tasks", "start_ts",
+        "INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', start_date) AS INTEGER))",
+    )
+    _add_column(
+        conn, "tasks", "end_ts",
+        "INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', end_date) AS INTEGER))",
+    )
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_tasks_end_start")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_end_ts_start_ts ON tasks (end_ts, start_ts)"
+    )
+
+
+def _v6_rollups(conn: Connection):
+    """Tree rollup columns on tasks (computed in v7)."""
+    _add_column(conn, "tasks", "child_count", "INTEGER DEFAULT '0' NOT NULL")
+    _add_column(conn, "tasks", "rollup_start", "TEXT")
+    _add_column(conn, "tasks", "rollup_end", "TEXT")
+    _add_column(conn, "tasks", "rollup_weight", "FLOAT")
+    _add_column(conn, "tasks", "rollup_progress", "FLOAT")
+
+
+def _v7_descendant_count(conn: Connection):
+    """Subtree size on tasks, and the rollups computed for the existing rows."""
+    # 循環importを避けるため関数内でimport
+    from rollups import rebuild_rollups_sync
+
+    _add_column(conn, "tasks", "descendant_count", "INTEGER DEFAULT '0' NOT NULL")
+    # 集計は現在のコードの全集計カラムを読み書きするので、それらが揃った後で行う
+    rebuild_rollups_sync(conn)
+
+
+def _v8_sort_keys(conn: Connection):
+    """Lexicographic sibling sort keys, assigned in the existing sortorder order."""
+    from ranking import renumber_sync
+
+    _add_column(conn, "tasks", "sort_key", "TEXT DEFAULT '' NOT NULL")
+    renumber_sync(conn)
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_tasks_parent_sortorder")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_parent_sort_key ON tasks (parent, sort_key)"
+    )
+
+
+def _v9_search_index(conn: Connection):
+    """FTS5 trigram index over task text, memo, ToDo and task_schedule, kept in sync by triggers."""
+    from search import create_search_index
+
+    create_search_index(conn)
+
+
+def _v10_edit_history(conn: Connection):
+    """task_edits table filled from the comma-separated tasks.edit_date, which is then dropped."""
+    from edit_history import parse_edit_dates, unparsed_edit_dates
+
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS task_edits (
+            task_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            PRIMARY KEY (task_id, date)
+        ) WITHOUT ROWID
+    """)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_task_edits_date_task_id ON task_edits (date, task_id)"
+    )
+    existing = {row[1] for row in conn.exec_driver_sql("PRAGMA table_xinfo(tasks)")}
+    if "edit_date" not in existing:
+        return
+    rows = conn.exec_driver_sql(
+        "SELECT id, edit_date FROM tasks WHERE edit_date IS NOT NULL AND edit_date != ''"
+    ).all()
+    edits = [(task_id, day) for task_id, value in rows for day in parse_edit_dates(value)]
+    # 日付として読めない値は task_edits に入らず、列ごと消えるので記録を残しておく
+    for task_id, value in rows:
+        unparsed = unparsed_edit_dates(value)
+        if unparsed:
+            logger.warning(
+                "Migration 10: dropping unparsable edit_date entries of task %d: %s (edit_date was %r)",
+                task_id, ", ".join(unparsed), value,
+            )
+    if edits:
+        conn.exec_driver_sql("INSERT OR IGNORE INTO task_edits (task_id, date) VALUES (?, ?)", edits)
+    conn.exec_driver_sql("ALTER TABLE tasks DROP COLUMN edit_date")
+
+
+# (version, description, migrate) — バージョンは1から連番で追加していく
+MIGRATIONS = [
+    (1, "initial schema", _v1_initial_schema),
+    (2, "indexes on tasks(parent, sortorder), links(source), links(target)", _v2_hot_path_indexes),
+    (3, "revision counter and tombstones for delta sync", _v3_revisions),
+    (4, "index on tasks(end_date, start_date)", _v4_date_window_index),
+    (5, "typed start/end timestamps on tasks", _v5_typed_dates),
+    (6, "rollup columns on tasks", _v6_rollups),
+    (7, "descendant_count on tasks", _v7_descendant_count),
+    (8, "sibling sort keys on tasks", _v8_sort_keys),
+    (9, "full-text search index on tasks", _v9_search_index),
+    (10, "task_edits table replacing tasks.edit_date", _v10_edit_history),
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Return the schema version recorded in the database file."""
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def run_migrations(bind: Engine) -> int:
+    """Apply all pending migrations in order and return the resulting version."""
+    # BEGIN/COMMIT を自前で発行するため、ドライバの暗黙トランザクションを無効化する
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        current = get_schema_version(conn)
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                migrate(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+                conn.exec_driver_sql("COMMIT")
+            except Exception:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            logger.info("Applied migration %d: %s", version, description)
+            current = version
+        return current
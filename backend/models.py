@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, Text, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Index, Integer, Text, Float, ForeignKey, func, select
+from sqlalchemy.orm import column_property, relationship
 from database import Base
 
 
@@ -10,12 +10,16 @@ class Task(Base):
     text = Column(Text, nullable=False)
     start_date = Column(Text, nullable=False)  # "YYYY-MM-DD HH:mm:ss"
     end_date = Column(Text, nullable=False)
+    # 日付文字列から導出するUNIX時刻（VIRTUAL生成カラム、解析できない値はNULL）
+    start_ts = Column(Integer, Computed("CAST(strftime('%s', start_date) AS INTEGER)"))
+    end_ts = Column(Integer, Computed("CAST(strftime('%s', end_date) AS INTEGER)"))
     duration = Column(Integer)
     progress = Column(Float, default=0.0)
     parent = Column(Integer, default=0)  # 0 = top level
     kind_task = Column(Integer, default=1)  # 1: task, 2: project
     owner_id = Column(Integer, default=0)  # 0: 自分, 10: 待, 20: サイン取, 30: 他
-    sortorder = Column(Integer, default=0)
+    sortorder = Column(Integer, default=0)  # 兄弟内の位置（参考値。並び順は sort_key で決まる）
+    sort_key = Column(Text, nullable=False, default="", server_default="")  # 兄弟内の並び順キー（ranking.py）
     color = Column(Text)
     textColor = Column(Text)
     ToDo = Column(Text)
@@ -25,15 +29,69 @@ class Task(Base):
     mail = Column(Text)
     memo = Column(Text)
     hyperlink = Column(Text)
-    edit_date = Column(Text)  # Comma-separated edit dates
     created_at = Column(Text)
     updated_at = Column(Text)
+    revision = Column(Integer, nullable=False, default=0, server_default="0", index=True)  # 最終変更リビジョン
+    # 子孫からの集計値（rollups.py が祖先方向に更新する。子がなければ自身の値）
+    child_count = Column(Integer, nullable=False, default=0, server_default="0")
+    descendant_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rollup_start = Column(Text)
+    rollup_end = Column(Text)
+    rollup_weight = Column(Float)  # 配下の作業タスクの期間の合計（進捗の重み）
+    rollup_progress = Column(Float)  # 期間で重み付けした進捗
+
+    __table_args__ = (
+        Index("ix_tasks_parent_sort_key", "parent", "sort_key"),
+        Index("ix_tasks_end_ts_start_ts", "end_ts", "start_ts"),  # 表示期間での絞り込み用
+    )
+
+
+class TaskEdit(Base):
+    """One row per task and day the task was edited (edit_history.py)."""
+    __tablename__ = "task_edits"
+
+    task_id = Column(Integer, primary_key=True)
+    date = Column(Text, primary_key=True)  # "YYYY-MM-DD"
+
+    __table_args__ = (
+        Index("ix_task_edits_date_task_id", "date", "task_id"),  # 期間ごとの集計用
+        {"sqlite_with_rowid": False},  # 主キー (task_id, date) の順に格納する
+    )
+
+
+# 従来のカンマ区切りの編集日（WITHOUT ROWID の主キー順に読むので日付順に連結される）
+Task.edit_date = column_property(
+    select(func.group_concat(TaskEdit.date, ","))
+    .where(TaskEdit.task_id == Task.id)
+    .correlate_except(TaskEdit)
+    .scalar_subquery()
+)
 
 
 class Link(Base):
     __tablename__ = "links"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    source = Column(Integer, nullable=False)  # Source task ID
-    target = Column(Integer, nullable=False)  # Target task ID
+    source = Column(Integer, nullable=False, index=True)  # Source task ID
+    target = Column(Integer, nullable=False, index=True)  # Target task ID
     type = Column(Integer, default=0)  # 0: FS, 1: SS, 2: FF, 3: SF
+    revision = Column(Integer, nullable=False, default=0, server_default="0", index=True)  # 最終変更リビジョン
+
+
+class SyncState(Base):
+    """Single-row table holding the database-wide revision counter."""
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)  # 常に1
+    revision = Column(Integer, nullable=False, default=0)
+    reset_revision = Column(Integer, nullable=False, default=0)  # 全件置き換え（CSVインポート）時のリビジョン
+
+
+class Tombstone(Base):
+    """Deleted task/link IDs, kept so delta sync can report deletions."""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(Text, nullable=False)  # "task" | "link"
+    entity_id = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False, index=True)
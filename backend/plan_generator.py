@@ -0,0 +1,262 @@
+"""
+Synthetic large-plan generator for the Gantt Chart database.
+Builds a reproducible (seeded) plan of any size: a task tree of the given
+depth, links of mixed types between work tasks, and some edit history.
+Rows are bulk-inserted in batches; sort keys and rollups are then computed
+the same way as for a CSV import.
+
+    python plan_generator.py --db large.db --tasks 100000 --depth 10 --links 200000 --seed 1
+"""
+
+import argparse
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.engine import Connection
+
+# 1回の executemany で投入する行数
+INSERT_BATCH_SIZE = 5000
+
+# リンクの種類の割合（0: FS, 1: SS, 2: FF, 3: SF）
+LINK_TYPE_WEIGHTS = (0.6, 0.2, 0.15, 0.05)
+
+# 全文検索の対象になるよう、タスク名とメモは語を組み合わせて作る
+WORDS = [
+    "設計", "実装", "レビュー", "テスト", "仕様書", "調整", "確認", "リリース", "移行", "準備",
+    "見積", "会議", "資料", "発注", "検証", "design", "build", "review", "deploy", "report",
+]
+
+
+@dataclass
+class PlanSpec:
+    tasks: int = 100_000
+    depth: int = 10
+    links: int = 200_000
+    seed: int = 0
+    span_days: int = 730  # 計画全体の期間
+    max_duration: int = 20  # 作業タスクの最大日数
+    memo_ratio: float = 0.3  # メモを持つタスクの割合
+    max_edit_days: int = 3  # タスクごとの編集履歴の最大日数
+    start: Optional[str] = None  # 計画の開始日（既定: 今日）
+
+
+@dataclass
+class PlanStats:
+    tasks: int = 0
+    projects: int = 0
+    links: int = 0
+    edits: int = 0
+    tasks_per_level: List[int] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def level_sizes(tasks: int, depth: int) -> List[int]:
+    """Tasks per level (top level first), growing geometrically so that every level is used."""
+    depth = max(1, min(depth, tasks))
+    # sum(ratio^l) = tasks となる比率を二分法で求める
+    low, high = 1.0, float(tasks)
+    for _ in range(100):
+        ratio = (low + high) / 2
+        if sum(ratio ** level for level in range(depth)) > tasks:
+            high = ratio
+        else:
+            low = ratio
+    sizes = [max(1, int(low ** level)) for level in range(depth)]
+    sizes[-1] += tasks - sum(sizes)
+    # 最下層が負になる（小さな計画）場合は上の階層から減らす
+    for level in range(depth - 1, 0, -1):
+        if sizes[level] < 1:
+            sizes[level - 1] += sizes[level] - 1
+            sizes[level] = 1
+    return sizes
+
+
+def build_tree(spec: PlanSpec, rng: random.Random) -> List[dict]:
+    """Task rows with IDs in level order (parents before children) and dates rolled up from the leaves."""
+    sizes = level_sizes(spec.tasks, spec.depth)
+    start = datetime.fromisoformat(spec.start) if spec.start else datetime.now()
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    rows: List[dict] = []
+    children: Dict[int, List[int]] = {}
+    previous: List[int] = []
+    for level, size in enumerate(sizes):
+        current = []
+        for _ in range(size):
+            task_id = len(rows) + 1
+            parent = rng.choice(previous) if previous else 0
+            siblings = children.setdefault(parent, [])
+            rows.append({
+                "id": task_id,
+                "parent": parent,
+                "sortorder": len(siblings),
+                "text": f"{rng.choice(WORDS)}{rng.choice(WORDS)} {task_id}",
+                "memo": " ".join(rng.sample(WORDS, 4)) if rng.random() < spec.memo_ratio else None,
+                "level": level + 1,
+            })
+            siblings.append(task_id)
+            current.append(task_id)
+        previous = current
+
+    # 子のないタスクに日付を振り、親は子の期間を包む（子から親へ）
+    span: Dict[int, tuple] = {}
+    for row in reversed(rows):
+        kids = children.get(row["id"])
+        if kids:
+            first = min(span[kid][0] for kid in kids)
+            last = max(span[kid][1] for kid in kids)
+            row["kind_task"] = 2
+            row["progress"] = 0.0
+        else:
+            first = start + timedelta(days=rng.randrange(spec.span_days))
+            last = first + timedelta(days=rng.randint(1, spec.max_duration))
+            row["kind_task"] = 1
+            row["progress"] = round(rng.random(), 2)
+        span[row["id"]] = (first, last)
+        row["start_date"] = first.strftime("%Y-%m-%d %H:%M:%S")
+        row["end_date"] = last.strftime("%Y-%m-%d %H:%M:%S")
+        row["duration"] = (last - first).days
+    return rows
+
+
+def build_links(rows: List[dict], count: int, rng: random.Random) -> List[dict]:
+    """Links between work tasks, always from an earlier to a later start (so the graph has no cycles)."""
+    leaves = sorted(
+        (row for row in rows if row["kind_task"] == 1), key=lambda row: (row["start_date"], row["id"])
+    )
+    if len(leaves) < 2:
+        return []
+    count = min(count, len(leaves) * (len(leaves) - 1) // 2)
+    # 近い時期のタスク同士をつなぐ（計画の中で現実的な依存関係になるように）
+    window = max(2, min(len(leaves) - 1, 50))
+    pairs = set()
+    while len(pairs) < count:
+        source = rng.randrange(len(leaves) - 1)
+        target = min(len(leaves) - 1, source + rng.randint(1, window))
+        pairs.add((leaves[source]["id"], leaves[target]["id"]))
+        if len(pairs) < count and window < len(leaves) - 1 and rng.random() < 0.01:
+            window = min(len(leaves) - 1, window * 2)  # 候補が尽きないよう範囲を広げる
+    types = rng.choices(range(len(LINK_TYPE_WEIGHTS)), weights=LINK_TYPE_WEIGHTS, k=len(pairs))
+    return [
+        {"id": link_id, "source": source, "target": target, "type": link_type}
+        for link_id, ((source, target), link_type) in enumerate(zip(sorted(pairs), types), start=1)
+    ]
+
+
+def build_edits(rows: List[dict], spec: PlanSpec, rng: random.Random) -> List[dict]:
+    today = datetime.now().date()
+    edits = []
+    for row in rows:
+        days = {rng.randrange(90) for _ in range(rng.randint(0, spec.max_edit_days))}
+        edits.extend(
+            {"task_id": row["id"], "date": (today - timedelta(days=day)).isoformat()} for day in sorted(days)
+        )
+    return edits
+
+
+def insert_batches(conn: Connection, table, rows: List[dict]):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        conn.execute(insert(table), rows[start:start + INSERT_BATCH_SIZE])
+
+
+def generate_plan(conn: Connection, spec: PlanSpec) -> PlanStats:
+    """Replace every task, link and edit with a generated plan (without committing)."""
+    # models は import 時にDBの設定を読むので、GANTT_DB_PATH を決めた後で import する（benchmark.py）
+    from models import Task as TaskModel, Link as LinkModel, SyncState, TaskEdit, Tombstone
+    from ranking import renumber_sync
+    from rollups import rebuild_rollups_sync
+
+    started = time.perf_counter()
+    rng = random.Random(spec.seed)
+    rows = build_tree(spec, rng)
+    links = build_links(rows, spec.links, rng)
+    edits = build_edits(rows, spec, rng)
+
+    for model in (LinkModel, TaskEdit, TaskModel, Tombstone):
+        conn.execute(delete(model))
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    insert_batches(conn, TaskModel.__table__, [
+        {**{key: value for key, value in row.items() if key != "level"},
+         "owner_id": 0, "created_at": now, "updated_at": now}
+        for row in rows
+    ])
+    insert_batches(conn, LinkModel.__table__, links)
+    insert_batches(conn, TaskEdit.__table__, edits)
+
+    # sortorder から並び順キーを振り、配下の集計を計算する
+    renumber_sync(conn)
+    rebuild_rollups_sync(conn)
+
+    # 差分同期中のクライアントに全件再取得させる
+    conn.execute(
+        update(SyncState)
+        .where(SyncState.id == 1)
+        .values(revision=SyncState.revision + 1, reset_revision=SyncState.revision + 1)
+    )
+
+    sizes = [0] * max(row["level"] for row in rows) if rows else []
+    for row in rows:
+        sizes[row["level"] - 1] += 1
+    return PlanStats(
+        tasks=len(rows),
+        projects=sum(1 for row in rows if row["kind_task"] == 2),
+        links=len(links),
+        edits=len(edits),
+        tasks_per_level=sizes,
+        seconds=round(time.perf_counter() - started, 3),
+    )
+
+
+def parse_spec(parser: argparse.ArgumentParser, argv=None):
+    """Add the PlanSpec options to parser and parse argv into (args, spec)."""
+    defaults = PlanSpec()
+    parser.add_argument("--tasks", type=int, default=defaults.tasks)
+    parser.add_argument("--depth", type=int, default=defaults.depth, help="levels of nesting")
+    parser.add_argument("--links", type=int, default=defaults.links)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--span-days", type=int, default=defaults.span_days)
+    parser.add_argument("--start", default=None, help="plan start date YYYY-MM-DD (default: today)")
+    args = parser.parse_args(argv)
+    spec = PlanSpec(
+        tasks=args.tasks, depth=args.depth, links=args.links, seed=args.seed,
+        span_days=args.span_days, start=args.start,
+    )
+    return args, spec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=None, help="SQLite file to fill (default: GANTT_DB_PATH or ./gantt.db)")
+    parser.add_argument("--replace", action="store_true",
+                        help="allow replacing the tasks and links of a database that already has some")
+    args, spec = parse_spec(parser, argv)
+    if args.db is not None:
+        os.environ["GANTT_DB_PATH"] = args.db
+
+    # 設定は環境変数から読まれるので、DBの場所を決めてから import する
+    from config import DATABASE_PATH
+    from database import engine, init_db
+    from models import Task as TaskModel, Link as LinkModel
+
+    init_db()
+    with engine.begin() as conn:
+        # generate_plan は全件を消すので、既存の計画（既定では ./gantt.db）を黙って上書きしない
+        tasks = conn.scalar(select(func.count()).select_from(TaskModel))
+        links = conn.scalar(select(func.count()).select_from(LinkModel))
+        if (tasks or links) and not args.replace:
+            parser.error(
+                f"{DATABASE_PATH} already has {tasks} tasks and {links} links; "
+                "pass --replace to overwrite them or --db to choose another file"
+            )
+        stats = generate_plan(conn, spec)
+    print(asdict(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Sibling order as lexicographic sort keys.
+Every task has a sort_key string; siblings are ordered by (sort_key, id).
+A key between any two keys (or before the first / after the last) can always
+be generated, so inserting or moving a task writes only that task's row.
+Keys follow the fractional-indexing scheme: a head character encoding the
+length of an integer part, the base-62 integer digits, then an optional
+fraction. Appending or prepending only grows keys logarithmically; repeated
+inserts at the same spot lengthen them, and sibling groups whose keys get
+too long are renumbered in the background.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, event, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Task as TaskModel
+
+logger = logging.getLogger(__name__)
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+INTEGER_ZERO = "a0"
+SMALLEST_INTEGER = "A" + "0" * 26
+
+# これより長いキーを作った兄弟グループは、バックグラウンドで連番キーに振り直す
+MAX_SORT_KEY_LENGTH = 12
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"invalid sort key head: {head!r}")
+
+
+def _split(key: str) -> Tuple[str, str]:
+    """(integer part, fraction) of a key."""
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"invalid sort key: {key!r}")
+    return key[:length], key[length:]
+
+
+def _increment_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) + 1
+        if value < len(DIGITS):
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = "0"
+    # 桁あふれ: 整数部を1桁長くする
+    if head == "Z":
+        return INTEGER_ZERO
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append("0")
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = DIGITS.index(digits[i]) - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    """Fraction strictly between low and high (None: 1); neither ends with "0"."""
+    if high is not None:
+        # 共通の接頭辞はそのまま残す
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else "0") == high[n]:
+            n += 1
+        if n > 0:
+            return high[:n] + _midpoint(low[n:], high[n:])
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else len(DIGITS)
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def key_between(low: Optional[str], high: Optional[str]) -> str:
+    """A key sorting strictly between low and high (None: unbounded on that side)."""
+    if low is not None and high is not None and low >= high:
+        raise ValueError(f"sort keys out of order: {low!r} >= {high!r}")
+    if low is None:
+        if high is None:
+            return INTEGER_ZERO
+        integer, fraction = _split(high)
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if integer < high:
+            return integer
+        decremented = _decrement_integer(integer)
+        if decremented is None:
+            raise ValueError("cannot decrement sort key any further")
+        return decremented
+    integer, fraction = _split(low)
+    if high is None:
+        incremented = _increment_integer(integer)
+        return integer + _midpoint(fraction, None) if incremented is None else incremented
+    high_integer, high_fraction = _split(high)
+    if integer == high_integer:
+        return integer + _midpoint(fraction, high_fraction)
+    incremented = _increment_integer(integer)
+    if incremented is not None and incremented < high:
+        return incremented
+    return integer + _midpoint(fraction, None)
+
+
+def sequential_keys(count: int) -> List[str]:
+    """count increasing keys of minimal length ("a0", "a1", ...)."""
+    keys = []
+    key = INTEGER_ZERO
+    for _ in range(count):
+        keys.append(key)
+        key = _increment_integer(key)
+    return keys
+
+
+# ---------------------------------------------------------------------------
+# Placing tasks
+
+async def check_parent(db: AsyncSession, parent: int, task_id: int):
+    """400 unless parent is the root (0) or an existing task outside the subtree of task_id."""
+    if not parent:
+        return
+    # 新しい親から祖先をたどり、移動するタスク自身が現れたら循環になる
+    ancestors = (
+        select(TaskModel.id, TaskModel.parent)
+        .where(TaskModel.id == parent)
+        .cte("ancestors", recursive=True)
+    )
+    ancestors = ancestors.union(
+        select(TaskModel.id, TaskModel.parent).where(TaskModel.id == ancestors.c.parent)
+    )
+    ids = set((await db.scalars(select(ancestors.c.id))).all())
+    if parent not in ids:
+        raise HTTPException(status_code=400, detail=f"Parent task {parent} does not exist")
+    if task_id in ids:
+        raise HTTPException(
+            status_code=400, detail=f"Task {task_id} cannot be moved under itself or its descendant {parent}"
+        )
+
+
+async def _neighbour(db: AsyncSession, parent: int, key: Optional[str], after: bool, exclude: Optional[int]):
+    """(sort_key, sortorder) of the nearest sibling after/before key (None: from the end)."""
+    statement = select(TaskModel.sort_key, TaskModel.sortorder).where(TaskModel.parent == parent)
+    if exclude is not None:
+        statement = statement.where(TaskModel.id != exclude)
+    if after:
+        if key is not None:
+            statement = statement.where(TaskModel.sort_key > key)
+        statement = statement.order_by(TaskModel.sort_key)
+    else:
+        if key is not None:
+            statement = statement.where(TaskModel.sort_key < key)
+        statement = statement.order_by(TaskModel.sort_key.desc())
+    return (await db.execute(statement.limit(1))).first()
+
+
+async def get_anchor(db: AsyncSession, anchor_id: int, task_id: Optional[int] = None):
+    """(id, parent, sort_key, sortorder) of an anchor task; 400 if it is missing or the task itself."""
+    if anchor_id == task_id:
+        raise HTTPException(status_code=400, detail="A task cannot be placed relative to itself")
+    anchor = (await db.execute(
+        select(TaskModel.id, TaskModel.parent, TaskModel.sort_key, TaskModel.sortorder)
+        .where(TaskModel.id == anchor_id)
+    )).first()
+    if anchor is None:
+        raise HTTPException(status_code=400, detail=f"Anchor task {anchor_id} does not exist")
+    return anchor
+
+
+async def place_task(
+    db: AsyncSession,
+    parent: int,
+    *,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    position: Optional[int] = None,
+    task_id: Optional[int] = None,
+) -> Tuple[int, str, int]:
+    """
+    Choose (parent, sort_key, sortorder) for a task being inserted or moved.
+    before/after: next to an anchor task (whose parent wins); position: 0-based
+    index among the siblings (negative: first); otherwise last. Reads at most
+    two neighbouring index entries; sortorder is only an approximation until
+    the group is renumbered. Moving task_id under a missing task or its own
+    subtree is rejected with 400.
+    """
+    low = high = None
+    anchor = None
+    if before is not None or after is not None:
+        anchor = await get_anchor(db, before if before is not None else after, task_id)
+        parent = anchor.parent
+    if task_id is not None:
+        # 移動するときは、存在しない親や自分の配下への移動（親子の循環）を拒否する
+        await check_parent(db, parent, task_id)
+
+    if anchor is not None:
+        if before is not None:
+            high = anchor
+            low = await _neighbour(db, parent, anchor.sort_key, False, task_id)
+        else:
+            low = anchor
+            high = await _neighbour(db, parent, anchor.sort_key, True, task_id)
+    elif position is not None and position >= 0:
+        # 先頭から position 番目の前に入れる（インデックスを position 件たどるだけで書き込みは1行）
+        siblings = (await db.execute(
+            select(TaskModel.sort_key, TaskModel.sortorder)
+            .where(TaskModel.parent == parent, TaskModel.id != (task_id or 0))
+            .order_by(TaskModel.sort_key)
+            .offset(max(position - 1, 0))
+            .limit(2)
+        )).all()
+        if position == 0:
+            high = siblings[0] if siblings else None
+        else:
+            low = siblings[0] if siblings else await _neighbour(db, parent, None, False, task_id)
+            high = siblings[1] if len(siblings) > 1 else None
+    elif position is not None:
+        high = await _neighbour(db, parent, None, True, task_id)
+    else:
+        low = await _neighbour(db, parent, None, False, task_id)
+
+    low_key = low.sort_key if low is not None else None
+    high_key = high.sort_key if high is not None else None
+    try:
+        key = key_between(low_key, high_key)
+    except ValueError:
+        # 同じキーの兄弟がいる（古いデータなど）: グループを振り直してから選び直す
+        await renumber(db, [parent])
+        return await place_task(
+            db, parent, before=before, after=after, position=position, task_id=task_id
+        )
+
+    if low is not None:
+        sortorder = (low.sortorder or 0) + (1 if high is None else 0)
+    elif high is not None:
+        sortorder = (high.sortorder or 0) - 1
+    else:
+        sortorder = 0
+    if len(key) > MAX_SORT_KEY_LENGTH:
+        db.info.setdefault("renumber_parents", set()).add(parent)
+    return parent, key, sortorder
+
+
+# ---------------------------------------------------------------------------
+# Renumbering
+
+def renumber_query(parents: Optional[Iterable[int]] = None):
+    """Siblings in their current order: (id, parent, sort_key, sortorder)."""
+    statement = select(TaskModel.id, TaskModel.parent, TaskModel.sort_key, TaskModel.sortorder)
+    if parents is not None:
+        statement = statement.where(TaskModel.parent.in_(list(parents)))
+    return statement.order_by(TaskModel.parent, TaskModel.sort_key, TaskModel.id)
+
+
+def assign_keys(rows, by_sortorder: bool = False) -> List[Dict]:
+    """
+    Sequential sort keys and 0-based sortorder for each sibling group in rows.
+    by_sortorder orders a group by sortorder first (CSV import). Returns the
+    values of the rows that change.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row[1]].append(tuple(row))
+    changed = []
+    for siblings in groups.values():
+        if by_sortorder:
+            siblings.sort(key=lambda row: (row[3] or 0, row[2] or "", row[0]))
+        for position, (row, key) in enumerate(zip(siblings, sequential_keys(len(siblings)))):
+            if row[2] != key or row[3] != position:
+                changed.append({"node": row[0], "new_key": key, "new_sortorder": position})
+    return changed
+
+
+def renumber_statement(revision: Optional[int] = None):
+    tasks = TaskModel.__table__
+    values = dict(sort_key=bindparam("new_key"), sortorder=bindparam("new_sortorder"))
+    if revision is not None:
+        values["revision"] = revision
+    return update(tasks).where(tasks.c.id == bindparam("node")).values(**values)
+
+
+async def renumber(
+    db: AsyncSession,
+    parents: Optional[Iterable[int]] = None,
+    revision: Optional[int] = None,
+    by_sortorder: bool = False,
+) -> int:
+    """Renumber the sibling groups of the given parents (None: all); returns the rows changed."""
+    if revision is None:
+        revision = db.info.get("revision")
+    changed = assign_keys((await db.execute(renumber_query(parents))).all(), by_sortorder)
+    if changed:
+        await db.execute(renumber_statement(revision), changed)
+    return len(changed)
+
+
+def renumber_sync(conn: Connection):
+    """renumber() of every group for a plain connection (used by migrations)."""
+    changed = assign_keys(conn.execute(renumber_query()).all(), by_sortorder=True)
+    if changed:
+        conn.execute(renumber_statement(), changed)
+
+
+class Renumberer:
+    """Background task renumbering sibling groups whose keys grew too long."""
+
+    def __init__(self):
+        self.pending: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request(self, parents: Iterable[int]):
+        """Queue sibling groups (callable from any thread)."""
+        self.pending.update(parents)
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        # 循環importを避けるため関数内でimport
+        from database import write_session
+        from revision import bump_revision
+
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            parents, self.pending = self.pending, set()
+            try:
+                async with write_session() as db:
+                    revision = await bump_revision(db)
+                    count = await renumber(db, parents, revision)
+                    await db.commit()
+                logger.info("Renumbered %d tasks under %d parents", count, len(parents))
+            except Exception:
+                logger.exception("Renumbering sort keys failed")
+
+
+renumberer = Renumberer()
+
+
+@event.listens_for(Session, "after_commit")
+def _request_renumber(session: Session):
+    parents = session.info.pop("renumber_parents", None)
+    if parents:
+        renumberer.request(parents)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_renumber(session: Session):
+    session.info.pop("renumber_parents", None)
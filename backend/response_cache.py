@@ -0,0 +1,72 @@
+"""
+In-process cache of serialized response bodies.
+Entries are keyed by a variant name (e.g. a field projection) and the database
+revision they were built from, so a body is only ever served for the exact
+revision it represents; writes additionally drop all entries via invalidate().
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import RESPONSE_CACHE_MAX_BYTES
+
+
+class ResponseCache:
+    """LRU cache of JSON bodies with a total size cap."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, variant: str, revision: int) -> Optional[bytes]:
+        """Return the cached body for the variant at the revision, if any."""
+        entry = self._entries.get(variant)
+        if entry is None or entry[0] != revision:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(variant)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, variant: str, revision: int, body: bytes):
+        """Store a body, evicting least recently used variants over the cap."""
+        current = self._entries.get(variant)
+        # 古いリビジョンで組み立てた本文で新しいものを上書きしない
+        if current is not None and current[0] > revision:
+            return
+        if len(body) > self.max_bytes:
+            return
+        if current is not None:
+            self._size -= len(current[1])
+        self._entries[variant] = (revision, body)
+        self._entries.move_to_end(variant)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self):
+        """Drop every entry."""
+        self._entries.clear()
+        self._size = 0
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
@@ -0,0 +1,80 @@
+"""
+Database-wide revision counter used for delta sync.
+Every write path calls bump_revision() inside its transaction and stamps the
+rows it touches with the returned value; deletions are recorded as tombstones.
+"""
+
+from typing import Iterable
+
+from fastapi import Request, Response
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import SyncState, Tombstone
+from response_cache import response_cache
+
+
+async def bump_revision(db: AsyncSession, reset: bool = False) -> int:
+    """
+    Increment the revision within the current transaction and return it.
+    reset=True marks a wholesale replacement (clients must resync fully).
+    """
+    # キャッシュはリビジョン一致でしか返らないので、ここで捨てるのはメモリ解放のため
+    response_cache.invalidate()
+    values = {"revision": SyncState.revision + 1}
+    if reset:
+        values["reset_revision"] = SyncState.revision + 1
+    revision = await db.scalar(
+        update(SyncState)
+        .where(SyncState.id == 1)
+        .values(**values)
+        .returning(SyncState.revision)
+    )
+    # コミット時のフック（依存グラフの同期、変更フィードの配信など）が参照する
+    db.info["revision"] = revision
+    db.info["feed_revision"] = revision
+    return revision
+
+
+async def get_revision(db: AsyncSession) -> int:
+    """Return the current revision."""
+    return await db.scalar(select(SyncState.revision).where(SyncState.id == 1))
+
+
+async def add_tombstones(db: AsyncSession, entity: str, ids: Iterable[int], revision: int):
+    """Record deleted IDs."""
+    rows = [{"entity": entity, "entity_id": entity_id, "revision": revision} for entity_id in ids]
+    if rows:
+        await db.execute(insert(Tombstone), rows)
+
+
+async def add_tombstones_from(db: AsyncSession, entity: str, id_query, revision: int):
+    """Record deleted IDs selected by a query (set-based, before the DELETE runs)."""
+    await db.execute(
+        insert(Tombstone).from_select(
+            ["entity", "entity_id", "revision"],
+            select(literal(entity), id_query.subquery().c[0], literal(revision)),
+        )
+    )
+
+
+def make_etag(revision: int, *parts) -> str:
+    """Strong ETag for one representation of the data at a revision."""
+    return '"' + "-".join(str(part) for part in (*parts, revision)) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header matches the ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match は弱い比較（W/ プレフィックスを無視）
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the ETag."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
@@ -0,0 +1,184 @@
+"""
+Aggregates over the task tree, stored on every task row.
+child_count, descendant_count, rollup_start (min start), rollup_end (max end), rollup_weight
+(sum of leaf durations) and rollup_progress (duration-weighted progress) are
+computed from the direct children's rollups; a task without children rolls
+up its own values. After a change only the changed tasks and their ancestors
+are recomputed, children before parents.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task as TaskModel
+
+
+def recompute_statement(revision: Optional[int] = None):
+    """
+    UPDATE recomputing one task (bound as "node") from its children.
+    Rows whose rollups are unchanged are left alone (and keep their revision).
+    """
+    # ORMの一括UPDATE（主キー必須）にならないよう Table に対して組み立てる
+    tasks = TaskModel.__table__
+    child = tasks.alias("child")
+
+    def over_children(expression):
+        return select(expression).where(child.c.parent == tasks.c.id).scalar_subquery()
+
+    values = dict(
+        child_count=over_children(func.count()),
+        descendant_count=func.coalesce(over_children(func.sum(child.c.descendant_count + 1)), 0),
+        rollup_start=func.coalesce(over_children(func.min(child.c.rollup_start)), tasks.c.start_date),
+        rollup_end=func.coalesce(over_children(func.max(child.c.rollup_end)), tasks.c.end_date),
+        rollup_weight=func.coalesce(
+            over_children(func.sum(child.c.rollup_weight)),
+            func.max(func.coalesce(tasks.c.duration, 1), 1),
+        ),
+        rollup_progress=func.coalesce(
+            over_children(
+                func.sum(child.c.rollup_weight * child.c.rollup_progress)
+                / func.sum(child.c.rollup_weight)
+            ),
+            func.coalesce(tasks.c.progress, 0.0),
+        ),
+    )
+    changed = or_(*(tasks.c[name].is_distinct_from(value) for name, value in values.items()))
+    if revision is not None:
+        values["revision"] = revision
+    return update(tasks).where(tasks.c.id == bindparam("node"), changed).values(**values)
+
+
+def bottom_up_levels(parents: Dict[int, int]) -> List[List[int]]:
+    """
+    Group tasks (id -> parent, closed under ancestors) so every task comes after
+    all of its children in the set. Tasks on a parent cycle are left out.
+    """
+    pending_children = defaultdict(int)
+    for node, parent in parents.items():
+        if parent in parents and parent != node:
+            pending_children[parent] += 1
+
+    level = [node for node in parents if pending_children[node] == 0]
+    levels = []
+    while level:
+        levels.append(level)
+        next_level = []
+        for node in level:
+            parent = parents[node]
+            if parent in parents and parent != node:
+                pending_children[parent] -= 1
+                if pending_children[parent] == 0:
+                    next_level.append(parent)
+        level = next_level
+    return levels
+
+
+def ancestors_cte(task_ids: Iterable[int]):
+    """Recursive CTE of (id, parent) for the given tasks and all of their ancestors."""
+    chain = (
+        select(TaskModel.id, TaskModel.parent)
+        .where(TaskModel.id.in_(list(task_ids)))
+        .cte("chain", recursive=True)
+    )
+    return chain.union(
+        select(TaskModel.id, TaskModel.parent).where(TaskModel.id == chain.c.parent)
+    )
+
+
+async def refresh_rollups(db: AsyncSession, task_ids: Iterable[int], revision: int):
+    """Recompute the rollups of the given tasks and their ancestors (without committing)."""
+    task_ids: Set[int] = {task_id for task_id in task_ids if task_id}
+    if not task_ids:
+        return
+    chain = ancestors_cte(task_ids)
+    parents = dict((await db.execute(select(chain.c.id, chain.c.parent))).all())
+    statement = recompute_statement(revision)
+    for level in bottom_up_levels(parents):
+        await db.execute(statement, [{"node": node} for node in level])
+
+
+def rebuild_query():
+    """Every task with the inputs and the stored values of its rollups."""
+    tasks = TaskModel.__table__
+    return select(
+        tasks.c.id, tasks.c.parent, tasks.c.start_date, tasks.c.end_date,
+        tasks.c.duration, tasks.c.progress,
+        tasks.c.child_count, tasks.c.descendant_count, tasks.c.rollup_start, tasks.c.rollup_end,
+        tasks.c.rollup_weight, tasks.c.rollup_progress,
+    )
+
+
+def compute_rollups(rows) -> List[Dict]:
+    """
+    Same aggregation as recompute_statement() for the whole tree in memory.
+    rows are rebuild_query() rows; returns the values of the rows that changed.
+    """
+    by_id = {row[0]: tuple(row) for row in rows}
+    parents = {node: row[1] for node, row in by_id.items()}
+    children = defaultdict(list)
+    for node, parent in parents.items():
+        if parent in parents and parent != node:
+            children[parent].append(node)
+
+    computed = {}
+    changed = []
+    for level in bottom_up_levels(parents):
+        for node in level:
+            _, _, start_date, end_date, duration, progress, *stored = by_id[node]
+            kids = [computed[kid] for kid in children.get(node, ()) if kid in computed]
+            if kids:
+                starts = [kid[2] for kid in kids if kid[2] is not None]
+                ends = [kid[3] for kid in kids if kid[3] is not None]
+                weight = sum(kid[4] for kid in kids)
+                values = (
+                    len(kids),
+                    sum(kid[1] + 1 for kid in kids),
+                    min(starts) if starts else start_date,
+                    max(ends) if ends else end_date,
+                    weight,
+                    sum(kid[4] * kid[5] for kid in kids) / weight,
+                )
+            else:
+                values = (0, 0, start_date, end_date, max(duration or 1, 1), progress or 0.0)
+            computed[node] = values
+            if list(values) != stored:
+                changed.append(dict(zip(_APPLY_PARAMS, (node, *values))))
+    return changed
+
+
+_APPLY_PARAMS = ("node", "new_count", "new_descendants", "new_start", "new_end", "new_weight", "new_progress")
+
+
+def apply_statement(revision: Optional[int] = None):
+    """UPDATE writing precomputed rollups (see compute_rollups)."""
+    tasks = TaskModel.__table__
+    values = dict(
+        child_count=bindparam("new_count"),
+        descendant_count=bindparam("new_descendants"),
+        rollup_start=bindparam("new_start"),
+        rollup_end=bindparam("new_end"),
+        rollup_weight=bindparam("new_weight"),
+        rollup_progress=bindparam("new_progress"),
+    )
+    if revision is not None:
+        values["revision"] = revision
+    return update(tasks).where(tasks.c.id == bindparam("node")).values(**values)
+
+
+async def rebuild_rollups(db: AsyncSession, revision: Optional[int] = None):
+    """Recompute the rollups of every task (after bulk changes such as a CSV import)."""
+    # 行ごとの相関サブクエリより、全件を1回読んでメモリ上で集計する方が速い
+    changed = compute_rollups((await db.execute(rebuild_query())).all())
+    if changed:
+        await db.execute(apply_statement(revision), changed)
+
+
+def rebuild_rollups_sync(conn: Connection):
+    """rebuild_rollups() for a plain connection (used by migrations)."""
+    changed = compute_rollups(conn.execute(rebuild_query()).all())
+    if changed:
+        conn.execute(apply_statement(), changed)
@@ -0,0 +1,82 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_read_db
+from models import Task as TaskModel, TaskEdit
+from routers.tasks import check_window
+from revision import get_revision
+from schemas import DailyEdits, EditCount, EditedTasks
+from serialization import parse_fields, rows_to_dicts, task_columns, dumps
+
+router = APIRouter(prefix="/api/activity", tags=["activity"])
+
+
+def edits_in_window(date_from: Optional[date], date_to: Optional[date]) -> list:
+    """Conditions on task_edits.date for a from/to window (both inclusive, either open)."""
+    conditions = []
+    if date_from is not None:
+        conditions.append(TaskEdit.date >= date_from.isoformat())
+    if date_to is not None:
+        conditions.append(TaskEdit.date <= date_to.isoformat())
+    return conditions
+
+
+@router.get("/daily", response_model=DailyEdits)
+async def get_daily_edits(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Number of tasks edited on each day of the window."""
+    check_window(date_from, date_to)
+    revision = await get_revision(db)
+    # ix_task_edits_date_task_id だけで範囲検索・集計できる
+    rows = (await db.execute(
+        select(TaskEdit.date, func.count())
+        .where(*edits_in_window(date_from, date_to))
+        .group_by(TaskEdit.date)
+        .order_by(TaskEdit.date)
+    )).all()
+    return DailyEdits(days=[EditCount(date=day, count=count) for day, count in rows], revision=revision)
+
+
+@router.get("/tasks", response_model=EditedTasks)
+async def get_edited_tasks(
+    fields: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Tasks edited within the window, most recently edited first (optionally projected to fields)."""
+    check_window(date_from, date_to)
+    selected = parse_fields(fields)
+    revision = await get_revision(db)
+
+    edited = (
+        select(
+            TaskEdit.task_id,
+            func.max(TaskEdit.date).label("last_edited"),
+            func.count().label("edit_days"),
+        )
+        .where(*edits_in_window(date_from, date_to))
+        .group_by(TaskEdit.task_id)
+        .subquery()
+    )
+    statement = (
+        select(*task_columns(selected), edited.c.last_edited, edited.c.edit_days)
+        .join(edited, edited.c.task_id == TaskModel.id)
+        .order_by(edited.c.last_edited.desc(), TaskModel.id)
+        .limit(limit)
+    )
+    rows = (await db.execute(statement)).all()
+    body = dumps({
+        "tasks": rows_to_dicts([*selected, "last_edited", "edit_days"], rows),
+        "revision": revision,
+    })
+    return Response(content=body, media_type="application/json")
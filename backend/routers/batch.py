@@ -0,0 +1,126 @@
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from dependency_graph import dependency_graph
+from models import Task as TaskModel, Link as LinkModel, Tombstone
+from revision import bump_revision
+from routers.links import insert_link, remove_link
+from routers.tasks import insert_task, apply_task_update, delete_subtree
+from schemas import (
+    BatchOperation, BatchRequest, BatchResponse, EntityRef, LinkCreate, TaskCreate, TaskUpdate
+)
+
+router = APIRouter(prefix="/api", tags=["batch"])
+
+
+class BatchContext:
+    """temp_id -> real ID resolution within one batch."""
+
+    def __init__(self):
+        self.id_map: Dict[str, int] = {}
+
+    def resolve(self, ref: Optional[EntityRef]) -> Optional[int]:
+        if ref is None or isinstance(ref, int):
+            return ref
+        if ref not in self.id_map:
+            raise HTTPException(status_code=400, detail=f"Unknown temp_id: {ref}")
+        return self.id_map[ref]
+
+    def resolve_fields(self, data: dict, *fields: str) -> dict:
+        return {
+            key: self.resolve(value) if key in fields else value
+            for key, value in data.items()
+        }
+
+    def assign(self, temp_id: Optional[str], real_id: int):
+        if temp_id is None:
+            return
+        if temp_id in self.id_map:
+            raise HTTPException(status_code=400, detail=f"Duplicate temp_id: {temp_id}")
+        self.id_map[temp_id] = real_id
+
+
+def require_id(context: BatchContext, operation: BatchOperation) -> int:
+    if operation.id is None:
+        raise HTTPException(status_code=400, detail=f"'{operation.op}' requires id")
+    return context.resolve(operation.id)
+
+
+async def apply_operation(
+    db: AsyncSession, context: BatchContext, operation: BatchOperation, revision: int
+):
+    """Apply one operation using the same code paths as the single-row endpoints."""
+    if operation.op == "create":
+        task = TaskCreate.model_validate(context.resolve_fields(operation.data, "parent", "before", "after"))
+        db_task = await insert_task(db, task, revision)
+        context.assign(operation.temp_id, db_task.id)
+    elif operation.op == "update":
+        task = TaskUpdate.model_validate(context.resolve_fields(operation.data, "parent", "before", "after"))
+        await apply_task_update(db, require_id(context, operation), task, revision)
+    elif operation.op == "delete":
+        await delete_subtree(db, require_id(context, operation), revision)
+    elif operation.op == "link_create":
+        link = LinkCreate.model_validate(context.resolve_fields(operation.data, "source", "target"))
+        db_link = await insert_link(db, link, revision)
+        context.assign(operation.temp_id, db_link.id)
+    elif operation.op == "link_delete":
+        await remove_link(db, require_id(context, operation), revision)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def apply_batch(request: BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Apply an ordered list of task/link operations in a single transaction.
+    If any operation fails, nothing is applied.
+    """
+    context = BatchContext()
+    # link_create の循環チェック用（最初の書き込みより前に最新化する）
+    await dependency_graph.ensure_current(db)
+    # バッチ全体で1リビジョン。変更された行はこのリビジョンで識別できる
+    revision = await bump_revision(db)
+
+    for index, operation in enumerate(request.operations):
+        try:
+            await apply_operation(db, context, operation, revision)
+        except HTTPException as e:
+            await db.rollback()
+            raise HTTPException(status_code=e.status_code, detail=f"operations[{index}]: {e.detail}")
+        except ValidationError as e:
+            await db.rollback()
+            raise RequestValidationError([
+                {**error, "loc": ("body", "operations", index, "data", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ])
+
+    await db.commit()
+
+    # 作成・更新された行だけを確定後の値で返す
+    tasks = (await db.scalars(
+        select(TaskModel)
+        .where(TaskModel.revision == revision)
+        .order_by(TaskModel.parent, TaskModel.sort_key, TaskModel.id)
+        .execution_options(populate_existing=True)
+    )).all()
+    links = (await db.scalars(
+        select(LinkModel)
+        .where(LinkModel.revision == revision)
+        .execution_options(populate_existing=True)
+    )).all()
+    tombstones = (await db.execute(
+        select(Tombstone.entity, Tombstone.entity_id).where(Tombstone.revision == revision)
+    )).all()
+
+    return BatchResponse(
+        revision=revision,
+        id_map=context.id_map,
+        tasks=tasks,
+        links=links,
+        deleted_tasks=sorted({entity_id for entity, entity_id in tombstones if entity == "task"}),
+        deleted_links=sorted({entity_id for entity, entity_id in tombstones if entity == "link"}),
+    )
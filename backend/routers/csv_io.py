@@ -0,0 +1,350 @@
+import csv
+import hashlib
+import io
+import zlib
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, delete, func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from database import get_async_db, get_async_read_db
+from dates import calculate_durations, normalize_dates
+from dependency_graph import check_links, stage_reset
+from edit_history import add_edits, edit_rows, replace_edits
+from models import Task as TaskModel, Link as LinkModel, TaskEdit, Tombstone
+from ranking import renumber
+from rollups import rebuild_rollups
+from revision import (
+    bump_revision, get_revision, add_tombstones_from, make_etag, etag_matches, not_modified
+)
+from schemas import ImportResponse
+
+router = APIRouter(prefix="/api", tags=["csv"])
+
+TASK_CSV_COLUMNS = [
+    "id", "text", "start_date", "end_date", "duration", "progress",
+    "parent", "kind_task", "ToDo", "task_schedule", "folder",
+    "url_adress", "mail", "memo", "hyperlink", "color", "textColor",
+    "owner_id", "sortorder", "edit_date"
+]
+LINK_CSV_COLUMNS = ["id", "source", "target", "type"]
+
+# table -> (model, default columns, order by, filename prefix)
+EXPORT_TABLES = {
+    "tasks": (TaskModel, TASK_CSV_COLUMNS, ("parent", "sort_key", "id"), "gantt_tasks"),
+    "links": (LinkModel, LINK_CSV_COLUMNS, ("id",), "gantt_links"),
+}
+
+# エクスポート時に1回のフェッチで読む行数（= 1チャンクの行数）
+EXPORT_PAGE_SIZE = 1000
+
+# インポートで sortorder が空欄・列なしの行に仮に入れる値（既存の兄弟のどの値よりも大きい）
+UNORDERED_SORTORDER = 2 ** 62
+
+
+def parse_columns(columns: Optional[str], allowed: List[str]) -> List[str]:
+    """Parse a comma-separated column selector, keeping the requested order."""
+    if not columns:
+        return list(allowed)
+    selected = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in allowed]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown columns: {', '.join(unknown)} (allowed: {', '.join(allowed)})",
+        )
+    return selected
+
+
+async def iter_csv_chunks(db: AsyncSession, statement, header: List[str]) -> AsyncIterator[bytes]:
+    """Stream a query as UTF-8 CSV, one chunk per fetched page."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # Add BOM for Excel compatibility
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    yield buffer.getvalue().encode("utf-8")
+
+    result = await db.stream(statement.execution_options(yield_per=EXPORT_PAGE_SIZE))
+    async for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress a byte stream into a single gzip member on the fly."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export/csv")
+async def export_csv(
+    request: Request,
+    table: Literal["tasks", "links"] = "tasks",
+    columns: Optional[str] = None,
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Export tasks or links as a streamed CSV file (optionally gzip-compressed)."""
+    model, allowed, order_by, prefix = EXPORT_TABLES[table]
+    selected = parse_columns(columns, allowed)
+
+    # 同じリビジョン・同じ出力オプションなら本文は同一
+    variant = hashlib.sha1(f"{','.join(selected)}|{gzip}".encode()).hexdigest()[:12]
+    etag = make_etag(await get_revision(db), "export", table, variant)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    table_columns = model.__table__.c
+    # edit_date は task_edits から組み立てる（models.Task.edit_date）
+    columns = [
+        table_columns[name] if name in table_columns else getattr(model, name).label(name)
+        for name in selected
+    ]
+    if table == "tasks" and "sortorder" in selected:
+        # sortorder は並び順キーの再採番までは近似値なので、出力時に兄弟内の位置を数え直す
+        position = func.row_number().over(
+            partition_by=table_columns.parent, order_by=(table_columns.sort_key, table_columns.id)
+        ) - 1
+        columns[selected.index("sortorder")] = position.label("sortorder")
+    statement = select(*columns).order_by(
+        *[table_columns[name] for name in order_by]
+    )
+
+    # Generate filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{prefix}_{timestamp}.csv"
+
+    chunks = iter_csv_chunks(db, statement, selected)
+    media_type = "text/csv"
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+        }
+    )
+
+
+def task_values(row: dict, now: str) -> dict:
+    """Convert a task CSV row into column values."""
+    return dict(
+        id=int(row.get("id", 0)),
+        text=row.get("text", ""),
+        start_date=row.get("start_date", now),
+        end_date=row.get("end_date", now),
+        duration=int(row["duration"]) if row.get("duration") else None,  # 空欄はバッチで計算
+        progress=float(row.get("progress", 0)) if row.get("progress") else 0.0,
+        parent=int(row.get("parent", 0)) if row.get("parent") else 0,
+        kind_task=int(row.get("kind_task", 1)) if row.get("kind_task") else 1,
+        owner_id=int(row.get("owner_id", 0)) if row.get("owner_id") else 0,
+        # sortorder がない行は兄弟の末尾に置く（インポート後の再採番で連番に置き換わる）
+        sortorder=int(row["sortorder"]) if row.get("sortorder") else UNORDERED_SORTORDER,
+        color=row.get("color") or None,
+        textColor=row.get("textColor") or None,
+        ToDo=row.get("ToDo") or None,
+        task_schedule=row.get("task_schedule") or None,
+        folder=row.get("folder") or None,
+        url_adress=row.get("url_adress") or None,
+        mail=row.get("mail") or None,
+        memo=row.get("memo") or None,
+        hyperlink=row.get("hyperlink") or None,
+        edit_date=row.get("edit_date") or None,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def link_values(row: dict, now: str) -> dict:
+    """Convert a link CSV row into column values."""
+    return dict(
+        # idが空なら自動採番
+        id=int(row["id"]) if row.get("id") else None,
+        source=int(row["source"]),
+        target=int(row["target"]),
+        type=int(row["type"]) if row.get("type") else 0,
+    )
+
+
+def normalize_task_batch(values: List[dict]):
+    """Normalize the date columns of a batch and fill in blank durations, column-wise."""
+    starts = [record["start_date"] for record in values]
+    ends = [record["end_date"] for record in values]
+    # 解析できた日付は "YYYY-MM-DD HH:mm:ss" に揃え、できないものはそのまま残す
+    for record, start, end in zip(values, normalize_dates(starts), normalize_dates(ends)):
+        record["start_date"] = start or record["start_date"]
+        record["end_date"] = end or record["end_date"]
+    for record, duration in zip(values, calculate_durations(starts, ends)):
+        if record["duration"] is None:
+            record["duration"] = duration
+
+
+# table -> (model, required columns, row converter, batch normalizer or None)
+IMPORT_TABLES = {
+    "tasks": (TaskModel, ["id"], task_values, normalize_task_batch),
+    "links": (LinkModel, ["source", "target"], link_values, None),
+}
+
+# 1回の executemany で投入する行数
+IMPORT_BATCH_SIZE = 1000
+
+
+def build_import_statement(model, mode: str, fieldnames: List[str]):
+    """INSERT for replace mode, or an upsert keyed on id for merge mode."""
+    table = model.__table__
+    if mode == "replace":
+        return insert(table)
+
+    statement = sqlite_insert(table)
+    # CSVに含まれるカラムだけを更新する（created_at は既存の値を残す）
+    update_columns = [
+        name for name in fieldnames
+        if name in table.c and name not in ("id", "created_at")
+    ]
+    if "updated_at" in table.c:
+        update_columns.append("updated_at")
+    update_columns.append("revision")
+    if not update_columns:
+        return statement.on_conflict_do_nothing(index_elements=[table.c.id])
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={name: statement.excluded[name] for name in update_columns},
+    )
+
+
+@router.post("/import/csv", response_model=ImportResponse)
+async def import_csv(
+    file: UploadFile = File(...),
+    table: Literal["tasks", "links"] = "tasks",
+    mode: Literal["replace", "merge"] = "replace",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Import tasks or links from a CSV file in a single transaction.
+    replace: delete existing rows first / merge: upsert rows by id.
+    """
+    model, required, convert, normalize = IMPORT_TABLES[table]
+
+    # アップロード全体をメモリに読み込まず、行単位でデコード・パースする
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+
+    try:
+        fieldnames = await run_in_threadpool(lambda: reader.fieldnames)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"CSV解析エラー: {e}")
+    missing = [name for name in required if name not in (fieldnames or [])]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"CSV解析エラー: 必須カラムがありません: {', '.join(missing)}",
+        )
+
+    imported_count = 0
+    skipped_count = 0
+    errors: List[str] = []
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    statement = build_import_statement(model, mode, fieldnames)
+    row_num = 1
+
+    try:
+        if mode == "replace" and table == "tasks":
+            # タスクの全件置き換えはクライアントに全件再取得させる（個別の削除記録は不要）
+            revision = await bump_revision(db, reset=True)
+            await db.execute(delete(Tombstone))
+        else:
+            revision = await bump_revision(db)
+
+        # リンクが一括で変わるので依存グラフは次回読み直す
+        stage_reset(db)
+
+        if mode == "replace":
+            # Clear existing data (commit は全行の投入後)
+            if table == "tasks":
+                await db.execute(delete(LinkModel))
+                await db.execute(delete(TaskEdit))
+            else:
+                await add_tombstones_from(db, "link", select(LinkModel.id), revision)
+            await db.execute(delete(model))
+
+        while True:
+            rows = await run_in_threadpool(list, islice(reader, IMPORT_BATCH_SIZE))
+            if not rows:
+                break
+
+            values = []
+            for row in rows:
+                row_num += 1
+                try:
+                    record = convert(row, now)
+                    record["revision"] = revision
+                    values.append(record)
+                except Exception as e:
+                    errors.append(f"行 {row_num}: {str(e)}")
+                    skipped_count += 1
+
+            if values:
+                if normalize:
+                    normalize(values)
+                if table == "tasks":
+                    # 編集日はタスクのカラムではなく task_edits に入れる
+                    edit_dates = [(record["id"], record.pop("edit_date")) for record in values]
+                await db.execute(statement, values)
+                if table == "tasks" and mode == "replace":
+                    await add_edits(db, [
+                        row for task_id, value in edit_dates for row in edit_rows(task_id, value)
+                    ])
+                elif table == "tasks" and "edit_date" in fieldnames:
+                    # merge ではCSVに含まれるカラムだけを更新するので、edit_date 列があるときだけ置き換える
+                    await replace_edits(db, edit_dates)
+                imported_count += len(values)
+
+        if table == "tasks":
+            # CSVの sortorder の順に並び順キーを振り直す（変わる行だけ更新される）
+            await renumber(db, None, revision, by_sortorder=True)
+            # 親子関係がまとめて変わりうるので集計は全件やり直す（変化した行だけ更新される）
+            await rebuild_rollups(db, revision)
+        else:
+            # 既存のリンクと合わせて、存在しないタスクへのリンクと循環がないことを確かめる
+            await check_links(db)
+        await db.commit()
+    except HTTPException as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"CSVインポートに失敗したため変更を取り消しました: {e.detail}",
+        )
+    except (csv.Error, UnicodeDecodeError, SQLAlchemyError) as e:
+        await db.rollback()
+        reason = getattr(e, "orig", None) or e
+        raise HTTPException(
+            status_code=400,
+            detail=f"CSVインポートに失敗したため変更を取り消しました（行 {row_num} 付近）: {reason}",
+        )
+
+    return ImportResponse(
+        imported_count=imported_count,
+        skipped_count=skipped_count,
+        errors=errors,
+    )
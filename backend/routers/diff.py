@@ -0,0 +1,457 @@
+"""
+Server-side diff between an uploaded task CSV (an older snapshot) and the tasks table.
+The CSV is streamed in batches and compared row by row. Each task's normalized
+compared fields are hashed, and the hash is cached together with the row
+revision, so rows that have not changed since the last diff are matched
+without loading their columns. The result has the shape of the frontend's
+types/diff.ts; a chosen subset of it can be applied back as a merge.
+"""
+
+import csv
+import io
+import re
+from hashlib import blake2b
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from database import get_async_db, get_async_read_db
+from models import Task as TaskModel
+from revision import bump_revision, get_revision
+from routers.tasks import insert_task, apply_task_update, delete_subtree
+from schemas import DiffApplyResponse, DiffSelection, TaskCreate, TaskUpdate
+from serialization import TASK_FIELDS, task_columns, rows_to_dicts, dumps
+
+router = APIRouter(prefix="/api", tags=["diff"])
+
+# 比較するフィールド（sortorder は比較しない）とその表示名（フロントエンドの FIELD_LABELS と同じ）
+FIELD_LABELS = {
+    "text": "タスク名",
+    "start_date": "開始日",
+    "end_date": "終了日",
+    "duration": "期間",
+    "progress": "進捗",
+    "parent": "親タスク",
+    "kind_task": "種類",
+    "owner_id": "オーナー",
+    "color": "色",
+    "memo": "メモ",
+    "hyperlink": "リンク",
+}
+COMPARE_FIELDS = list(FIELD_LABELS)
+DATE_FIELDS = ("start_date", "end_date")
+NUMERIC_FIELDS = ("duration", "progress", "parent", "kind_task", "owner_id")
+
+# 日本語ヘッダーのCSVも読めるようにする
+HEADER_ALIASES = {
+    "id": "ID",
+    "sortorder": "並び順",
+    **FIELD_LABELS,
+}
+
+# 1回の SELECT で照合する行数
+DIFF_BATCH_SIZE = 1000
+
+_LEADING_INT = re.compile(r"\s*([+-]?\d+)")
+_LEADING_FLOAT = re.compile(r"\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)")
+_DATE_PREFIX = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def parse_int(value: str, default: int) -> int:
+    """parseInt(value) || default, as the frontend parses CSV cells."""
+    if value.isascii() and value.isdigit():
+        return int(value) or default
+    match = _LEADING_INT.match(value)
+    return (int(match.group(1)) if match else 0) or default
+
+
+def parse_float(value: str, default: float) -> float:
+    if value.isascii() and value.replace(".", "", 1).isdigit():
+        return float(value) or default
+    match = _LEADING_FLOAT.match(value)
+    return (float(match.group(1)) if match else 0.0) or default
+
+
+def _normalize_text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _normalize_number(value) -> str:
+    # 整数で表せる値は ".0" を付けない（DBの 1.0 と CSV の "1" を同じとみなす）
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, int):
+        return str(value)
+    text = _normalize_text(value)
+    match = _LEADING_FLOAT.match(text)
+    return _normalize_number(float(match.group(1))) if match else text
+
+
+@lru_cache(maxsize=4096)
+def _normalize_date(value) -> str:
+    # 時刻部分は比較しない
+    text = _normalize_text(value)
+    return text[:10] if _DATE_PREFIX.match(text) else text
+
+
+NORMALIZERS = {
+    field: (
+        _normalize_number if field in NUMERIC_FIELDS
+        else _normalize_date if field in DATE_FIELDS
+        else _normalize_text
+    )
+    for field in COMPARE_FIELDS
+}
+
+
+def normalize_value(value, field: str) -> str:
+    """Comparison form of a value: trimmed, numbers without ".0", dates without the time."""
+    return NORMALIZERS[field](value)
+
+
+def normalized(task: dict, fields: Sequence[str]) -> List[str]:
+    return [NORMALIZERS[field](task.get(field)) for field in fields]
+
+
+def header_map(fieldnames: Optional[Sequence[str]]) -> Dict[str, Optional[str]]:
+    """Task field -> CSV header holding it (the English name, else the Japanese alias)."""
+    present = set(fieldnames or ())
+    names = ["id", "sortorder", *COMPARE_FIELDS]
+    return {
+        name: name if name in present else HEADER_ALIASES[name] if HEADER_ALIASES[name] in present else None
+        for name in names
+    }
+
+
+def row_id(row: dict, headers: Dict[str, Optional[str]]) -> Optional[int]:
+    """Task ID of a CSV row (None if it has no numeric id)."""
+    match = _LEADING_INT.match((row.get(headers["id"]) or "").strip())
+    return int(match.group(1)) if match else None
+
+
+def file_task(row: dict, headers: Dict[str, Optional[str]]) -> Optional[dict]:
+    """A CSV row as a task dict (None if it has no numeric id), with the frontend's defaults."""
+    def cell(name: str) -> str:
+        return (row.get(headers[name]) or "").strip()
+
+    task_id = row_id(row, headers)
+    if task_id is None:
+        return None
+    return {
+        "id": task_id,
+        "text": cell("text"),
+        "start_date": cell("start_date"),
+        "end_date": cell("end_date"),
+        "duration": parse_int(cell("duration"), 1),
+        "progress": parse_float(cell("progress"), 0),
+        "parent": parse_int(cell("parent"), 0),
+        "kind_task": parse_int(cell("kind_task"), 1),
+        "owner_id": parse_int(cell("owner_id"), 0),
+        "sortorder": parse_int(cell("sortorder"), 0),
+        "color": cell("color") or None,
+        "memo": cell("memo") or None,
+        "hyperlink": cell("hyperlink") or None,
+    }
+
+
+def content_hash(values: Sequence[str]) -> bytes:
+    return blake2b("\x1f".join(values).encode("utf-8"), digest_size=16).digest()
+
+
+def changed_fields(old: Sequence[str], new: Sequence[str], fields: Sequence[str]) -> List[str]:
+    return [field for field, a, b in zip(fields, old, new) if a != b]
+
+
+class RowHashCache:
+    """
+    Hash of each task's normalized compared fields, keyed by the row revision.
+    Every write stamps the rows it touches with a new revision, so an entry
+    is valid exactly while the stored revision matches.
+    """
+
+    def __init__(self):
+        # 比較フィールドの組 -> {task_id: (revision, hash)}
+        self.entries: Dict[Tuple[str, ...], Dict[int, Tuple[int, bytes]]] = {}
+
+    def table(self, fields: Sequence[str]) -> Dict[int, Tuple[int, bytes]]:
+        return self.entries.setdefault(tuple(fields), {})
+
+    def prune(self, live_ids: set):
+        """Drop the entries of deleted tasks."""
+        for table in self.entries.values():
+            for task_id in table.keys() - live_ids:
+                del table[task_id]
+
+
+row_hashes = RowHashCache()
+
+
+async def _read(function):
+    try:
+        return await run_in_threadpool(function)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"CSV解析エラー: {e}")
+
+
+async def open_task_csv(file: UploadFile) -> Tuple[csv.DictReader, Dict[str, Optional[str]]]:
+    """A row reader over the upload and its header_map()."""
+    # アップロード全体をメモリに読み込まず、行単位でデコード・パースする
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    return reader, header_map(await _read(lambda: reader.fieldnames))
+
+
+async def read_batch(reader: csv.DictReader) -> List[dict]:
+    return await _read(lambda: list(islice(reader, DIFF_BATCH_SIZE)))
+
+
+def _parse_batch(reader: csv.DictReader, headers, fields: Sequence[str]) -> List[Tuple[dict, List[str], bytes]]:
+    parsed = []
+    for row in islice(reader, DIFF_BATCH_SIZE):
+        task = file_task(row, headers)
+        if task is not None:
+            values = normalized(task, fields)
+            parsed.append((task, values, content_hash(values)))
+    return parsed
+
+
+async def read_compared_batch(reader: csv.DictReader, headers, fields: Sequence[str]):
+    """
+    The next batch of rows as (file task, normalized values, hash); empty at the end.
+    Parsing and hashing run in a worker thread to keep the event loop free.
+    """
+    while True:
+        before = reader.line_num
+        parsed = await _read(lambda: _parse_batch(reader, headers, fields))
+        # id のない行だけのバッチは読み飛ばす
+        if parsed or reader.line_num == before:
+            return parsed
+
+
+def compared_fields(exclude_dates: bool) -> List[str]:
+    if exclude_dates:
+        return [field for field in COMPARE_FIELDS if field not in DATE_FIELDS]
+    return list(COMPARE_FIELDS)
+
+
+@router.post("/diff/csv")
+async def diff_csv(
+    file: UploadFile = File(...),
+    exclude_dates: bool = False,
+    include_unchanged: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Compare a task CSV (the old side) with the current tasks.
+    added: only in the database / deleted: only in the file / modified: field changes.
+    Unchanged rows are counted; include_unchanged also lists them.
+    """
+    fields = compared_fields(exclude_dates)
+    hashes = row_hashes.table(fields)
+    columns = task_columns(TASK_FIELDS)
+    revision = await get_revision(db)
+    reader, headers = await open_task_csv(file)
+
+    added, deleted, modified, unchanged = [], [], [], []
+    unchanged_count = 0
+    seen = set()
+
+    while True:
+        batch = await read_compared_batch(reader, headers, fields)
+        if not batch:
+            break
+        ids = {task["id"] for task, _, _ in batch}
+        seen |= ids
+        revisions = dict((await db.execute(
+            select(TaskModel.id, TaskModel.revision).where(TaskModel.id.in_(ids))
+        )).all())
+
+        # ハッシュが前回と同じで行のリビジョンも変わっていなければ、列を読まずに「変更なし」とする
+        pending = []
+        for task, values, digest in batch:
+            task_id = task["id"]
+            if task_id not in revisions:
+                deleted.append({"type": "deleted", "task": task})
+                continue
+            if not include_unchanged and hashes.get(task_id) == (revisions[task_id], digest):
+                unchanged_count += 1
+            else:
+                pending.append((task, values))
+        if not pending:
+            continue
+
+        current = {}
+        for row_revision, *row in (await db.execute(
+            select(TaskModel.revision, *columns)
+            .where(TaskModel.id.in_({task["id"] for task, _ in pending}))
+        )).all():
+            current_task = dict(zip(TASK_FIELDS, row))
+            current[current_task["id"]] = (row_revision, current_task)
+        for task, values in pending:
+            row_revision, current_task = current[task["id"]]
+            current_values = normalized(current_task, fields)
+            hashes[task["id"]] = (row_revision, content_hash(current_values))
+            changes = [
+                {
+                    "field": FIELD_LABELS[field],
+                    "oldValue": old or "(空)",
+                    "newValue": new or "(空)",
+                }
+                for field, old, new in zip(fields, values, current_values)
+                if old != new
+            ]
+            if changes:
+                modified.append({
+                    "type": "modified", "task": current_task, "originalTask": task, "changes": changes,
+                })
+            else:
+                unchanged_count += 1
+                if include_unchanged:
+                    unchanged.append({"type": "unchanged", "task": current_task})
+
+    # ファイルにないタスク = 追加されたタスク（画面と同じ並び順で返す）
+    ordered_ids = (await db.scalars(
+        select(TaskModel.id).order_by(TaskModel.parent, TaskModel.sort_key, TaskModel.id)
+    )).all()
+    row_hashes.prune(set(ordered_ids))
+    added_ids = [task_id for task_id in ordered_ids if task_id not in seen]
+    for start in range(0, len(added_ids), DIFF_BATCH_SIZE):
+        chunk = added_ids[start:start + DIFF_BATCH_SIZE]
+        by_id = {
+            task["id"]: task
+            for task in rows_to_dicts(TASK_FIELDS, (await db.execute(
+                select(*columns).where(TaskModel.id.in_(chunk))
+            )).all())
+        }
+        added.extend({"type": "added", "task": by_id[task_id]} for task_id in chunk)
+
+    body = dumps({
+        "added": added,
+        "deleted": deleted,
+        "modified": modified,
+        "unchanged": unchanged,
+        "summary": {
+            "addedCount": len(added),
+            "deletedCount": len(deleted),
+            "modifiedCount": len(modified),
+            "unchangedCount": unchanged_count,
+        },
+        "revision": revision,
+    })
+    return Response(content=body, media_type="application/json")
+
+
+def restore_values(row: dict, task: dict, headers: Dict[str, Optional[str]]) -> TaskCreate:
+    """TaskCreate re-creating a deleted task from its CSV row (all exported columns)."""
+    values = {
+        name: row.get(name) or None
+        for name in ("textColor", "ToDo", "task_schedule", "folder", "url_adress", "mail", "edit_date")
+    }
+    values.update(
+        text=task["text"],
+        start_date=task["start_date"],
+        end_date=task["end_date"],
+        # 期間が空欄なら日付から計算する
+        duration=task["duration"] if (row.get(headers["duration"]) or "").strip() else None,
+        progress=task["progress"],
+        parent=task["parent"],
+        kind_task=task["kind_task"],
+        owner_id=task["owner_id"],
+        sortorder=task["sortorder"],
+        color=task["color"],
+        memo=task["memo"],
+        hyperlink=task["hyperlink"],
+    )
+    return TaskCreate(**values)
+
+
+@router.post("/diff/csv/apply", response_model=DiffApplyResponse)
+async def apply_csv_diff(
+    file: UploadFile = File(...),
+    selection: str = Form(...),
+    exclude_dates: bool = False,
+    base_revision: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Merge the selected entries of a diff into the tasks, in one transaction.
+    selection is JSON {"modified": [...], "deleted": [...], "added": [...]} of task IDs:
+    modified -> take the file's values of the changed fields, deleted -> re-create
+    the task with its ID, added -> delete the task (and its descendants).
+    base_revision (the diff's revision) rejects the merge with 409 if tasks changed since.
+    """
+    try:
+        chosen = DiffSelection.model_validate_json(selection)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", "selection", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+    fields = compared_fields(exclude_dates)
+    to_update, to_restore = set(chosen.modified), set(chosen.deleted)
+    reader, headers = await open_task_csv(file)
+
+    if base_revision is not None and base_revision != await get_revision(db):
+        raise HTTPException(status_code=409, detail="Tasks have changed since the diff was computed")
+
+    updated: List[int] = []
+    restored: List[int] = []
+    removed: List[int] = []
+    try:
+        revision = await bump_revision(db)
+        # 選ばれたIDを適用するたびに消し、すべて済んだらファイルの残りは読まない
+        pending = to_update | to_restore
+        while pending:
+            rows = await read_batch(reader)
+            if not rows:
+                break
+            # 同じIDの行が複数あっても最初の1行だけ使う
+            selected = {}
+            for row in rows:
+                task_id = row_id(row, headers)
+                if task_id in pending and task_id not in selected:
+                    selected[task_id] = row
+            if not selected:
+                continue
+            # バッチ内の対象タスクは1回の SELECT でまとめて読む
+            existing = {
+                db_task.id: db_task
+                for db_task in (await db.scalars(
+                    select(TaskModel).where(TaskModel.id.in_(list(selected)))
+                )).all()
+            }
+            for task_id, row in selected.items():
+                task = file_task(row, headers)
+                db_task = existing.get(task_id)
+                if task_id in to_update and db_task is not None:
+                    current = {field: getattr(db_task, field) for field in fields}
+                    changes = changed_fields(normalized(current, fields), normalized(task, fields), fields)
+                    if changes:
+                        await apply_task_update(
+                            db, task_id, TaskUpdate(**{field: task[field] for field in changes}),
+                            revision, auto_schedule=False,
+                        )
+                        updated.append(task_id)
+                elif task_id in to_restore and db_task is None:
+                    await insert_task(db, restore_values(row, task, headers), revision, task_id=task_id)
+                    restored.append(task_id)
+                pending.discard(task_id)
+
+        for task_id in chosen.added:
+            # 先に削除した祖先と一緒に消えていれば何もしない
+            if await db.get(TaskModel, task_id) is not None:
+                await delete_subtree(db, task_id, revision)
+                removed.append(task_id)
+        await db.commit()
+    except HTTPException:
+        await db.rollback()
+        raise
+
+    return DiffApplyResponse(revision=revision, updated=updated, restored=restored, removed=removed)
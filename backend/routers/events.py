@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from change_feed import broker, change_events
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+@router.get("")
+async def stream_events(since: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events stream of task/link changes (see change_feed.py).
+    Events: "ready" {revision} once, then "changes" (same payload as
+    GET /api/tasks/changes) or "resync" {revision} when the client should reload everything.
+    Starts after since (default: now); a reconnecting EventSource resumes from Last-Event-ID.
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        change_events(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+async def get_event_stats():
+    """Broker name, last announced revision and number of connected clients."""
+    return broker.stats()
@@ -1,41 +1,99 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import Link as LinkModel
+from database import get_async_db, get_async_read_db
+from dependency_graph import (
+    dependency_graph, check_new_link, stage_link_added, stage_link_removed
+)
+from models import Task as TaskModel, Link as LinkModel
+from routers.tasks import window_cte, check_window
+from revision import (
+    bump_revision, get_revision, add_tombstones, make_etag, etag_matches, not_modified
+)
 from schemas import Link, LinkCreate
 
 router = APIRouter(prefix="/api/links", tags=["links"])
 
 
 @router.get("", response_model=List[Link])
-def get_all_links(db: Session = Depends(get_db)):
-    """Get all links."""
-    return db.query(LinkModel).all()
+async def get_all_links(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get all links, or with from/to only those between tasks shown in the window."""
+    check_window(date_from, date_to)
+    windowed = date_from is not None or date_to is not None
 
+    variant = f"links-{date_from or ''}_{date_to or ''}" if windowed else "links"
+    etag = make_etag(await get_revision(db), variant)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    query = select(LinkModel)
+    if windowed:
+        visible_ids = select(window_cte(date_from, date_to).c.id)
+        query = query.where(LinkModel.source.in_(visible_ids), LinkModel.target.in_(visible_ids))
+    return (await db.scalars(query)).all()
+
+
+async def insert_link(db: AsyncSession, link: LinkCreate, revision: int) -> LinkModel:
+    """
+    Insert a link (without committing) and return it with its new ID.
+    dependency_graph.ensure_current() must have run before the transaction's first write.
+    """
+    task_ids = {link.source, link.target}
+    found = await db.scalar(
+        select(func.count()).select_from(TaskModel).where(TaskModel.id.in_(task_ids))
+    )
+    if found != len(task_ids):
+        raise HTTPException(status_code=400, detail="Source or target task not found")
+    check_new_link(db, link.source, link.target)
 
-@router.post("", response_model=Link)
-def create_link(link: LinkCreate, db: Session = Depends(get_db)):
-    """Create a new link."""
     db_link = LinkModel(
         source=link.source,
         target=link.target,
         type=link.type or 0,
+        revision=revision,
     )
     db.add(db_link)
-    db.commit()
-    db.refresh(db_link)
+    await db.flush()
+    stage_link_added(db, db_link.id, db_link.source, db_link.target, db_link.type)
     return db_link
 
 
-@router.delete("/{link_id}")
-def delete_link(link_id: int, db: Session = Depends(get_db)):
-    """Delete a link."""
-    db_link = db.query(LinkModel).filter(LinkModel.id == link_id).first()
+@router.post("", response_model=Link)
+async def create_link(link: LinkCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new link (rejects missing tasks and dependency cycles)."""
+    await dependency_graph.ensure_current(db)
+    db_link = await insert_link(db, link, await bump_revision(db))
+    await db.commit()
+    await db.refresh(db_link)
+    return db_link
+
+
+async def remove_link(db: AsyncSession, link_id: int, revision: int):
+    """Delete a link (without committing)."""
+    db_link = await db.get(LinkModel, link_id)
     if not db_link:
         raise HTTPException(status_code=404, detail="Link not found")
 
-    db.delete(db_link)
-    db.commit()
+    await add_tombstones(db, "link", [link_id], revision)
+    await db.delete(db_link)
+    await db.flush()
+    stage_link_removed(db, link_id)
+
+
+@router.delete("/{link_id}")
+async def delete_link(link_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a link."""
+    await remove_link(db, link_id, await bump_revision(db))
+    await db.commit()
     return {"message": "Link deleted"}
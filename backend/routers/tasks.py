@@ -1,76 +1,381 @@
-from datetime import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from database import get_db
-from models import Task as TaskModel, Link as LinkModel
-from schemas import Task, TaskCreate, TaskUpdate, GanttData, DeleteResponse, TaskReorderRequest
+import hashlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import case, delete, func, insert, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db, get_async_read_db
+from dates import (
+    calculate_durations, date_to_timestamp, format_timestamps, normalize_dates, shift_dates
+)
+from dependency_graph import dependency_graph, stage_link_added, stage_tasks_removed
+from edit_history import add_edits, edit_rows, record_edit
+from models import Task as TaskModel, Link as LinkModel, SyncState, TaskEdit, Tombstone
+from response_cache import response_cache
+from scheduling import analyze_critical_path, reschedule_successors
+from ranking import place_task
+from rollups import refresh_rollups
+from search import HIT_FIELDS, ancestor_paths, make_snippet, parse_terms, search_statement
+from revision import (
+    bump_revision, get_revision, add_tombstones_from, make_etag, etag_matches, not_modified
+)
+from serialization import (
+    TASK_FIELDS, LINK_FIELDS, parse_fields, task_columns, link_columns, rows_to_dicts, dumps
+)
+from schemas import (
+    Task, TaskCreate, TaskUpdate, TaskUpdateResponse, TaskSchedule, TaskSlack, TaskRollup,
+    CriticalPathResponse, TaskDependencies, GanttData, GanttChanges, DeleteResponse,
+    TaskReorderRequest, TaskTree, SubtreeClone, TaskPathItem, TaskSearchHit, TaskSearchResult
+)
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
 
+# 変更されると集計（rollups.py）をやり直す必要があるフィールド
+ROLLUP_INPUTS = {"start_date", "end_date", "duration", "progress", "parent"}
+
+# クリティカルパスの各タスクのフィールド（スキーマの定義順）
+SLACK_FIELDS = list(TaskSlack.model_fields)
+
+
 def calculate_duration(start_date: str, end_date: str) -> int:
     """Calculate duration in days between two dates."""
-    try:
-        start = datetime.strptime(start_date.split(" ")[0], "%Y-%m-%d")
-        end = datetime.strptime(end_date.split(" ")[0], "%Y-%m-%d")
-        return max(1, (end - start).days)
-    except (ValueError, AttributeError, IndexError):
-        return 1
+    return calculate_durations([start_date], [end_date])[0]
+
+
+def normalize_task_dates(values: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """
+    start_date/end_date of a create/update as "YYYY-MM-DD HH:mm:ss" (like CSV import).
+    422 if one is null or cannot be parsed: start_ts/end_ts would be NULL and
+    the task would drop out of windowed queries and the critical path.
+    """
+    # 送られなかった項目だけを除く（明示的な null は解析できない日付として拒否する）
+    fields = [name for name in ("start_date", "end_date") if name in values]
+    normalized = normalize_dates([values[name] for name in fields])
+    invalid = [name for name, value in zip(fields, normalized) if value is None]
+    if invalid:
+        raise HTTPException(
+            status_code=422,
+            detail="Invalid date: " + ", ".join(f"{name}={values[name]!r}" for name in invalid),
+        )
+    return dict(zip(fields, normalized))
+
+
+def subtree_cte(task_id: int):
+    """Recursive CTE selecting the ID of a task and all of its descendants."""
+    subtree = select(TaskModel.id).where(TaskModel.id == task_id).cte("subtree", recursive=True)
+    # UNION（重複排除）なので親子関係が循環していても停止する
+    return subtree.union(
+        select(TaskModel.id).where(TaskModel.parent == subtree.c.id)
+    )
+
+
+def descendants_cte(parent_id: int, depth: Optional[int]):
+    """Recursive CTE selecting the IDs of the descendants of a task (0: every task) up to depth levels."""
+    if depth is None:
+        tree = select(TaskModel.id).where(TaskModel.parent == parent_id).cte("tree", recursive=True)
+        return tree.union(select(TaskModel.id).where(TaskModel.parent == tree.c.id))
+    # 深さを数えて打ち切る（深さの上限があるので親子関係が循環していても停止する）
+    tree = (
+        select(TaskModel.id, literal(1).label("level"))
+        .where(TaskModel.parent == parent_id)
+        .cte("tree", recursive=True)
+    )
+    return tree.union(
+        select(TaskModel.id, tree.c.level + 1)
+        .where(TaskModel.parent == tree.c.id, tree.c.level < depth)
+    )
+
+
+def tree_order(parent_id: int, rows, depth: Optional[int]) -> List[Tuple[int, tuple]]:
+    """
+    Arrange (id, parent, sort_key, ...) rows depth-first below parent_id,
+    siblings in sort_key order. Returns (level, row) pairs.
+    """
+    children = defaultdict(list)
+    for row in rows:
+        children[row[1]].append(row)
+    for siblings in children.values():
+        siblings.sort(key=lambda row: (row[2], row[0]))
+
+    ordered = []
+    seen = set()
+    stack = [(1, row) for row in reversed(children.get(parent_id, []))]
+    while stack:
+        level, row = stack.pop()
+        if row[0] in seen:
+            continue
+        seen.add(row[0])
+        ordered.append((level, row))
+        if depth is None or level < depth:
+            stack.extend((level + 1, child) for child in reversed(children.get(row[0], [])))
+    return ordered
+
+
+async def tree_response(
+    request: Request, db: AsyncSession, parent_id: int, depth: Optional[int], fields: Optional[str]
+) -> Response:
+    """TaskTree of the descendants of parent_id as a JSON response (ETag and cache like get_all_tasks)."""
+    selected = parse_fields(fields)
+    variant = f"tree-{parent_id}-{depth or 'all'}"
+    if selected != TASK_FIELDS:
+        variant += "-" + hashlib.sha1(",".join(selected).encode()).hexdigest()[:12]
+
+    revision = await get_revision(db)
+    etag = make_etag(revision, variant)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    body = response_cache.get(variant, revision)
+    if body is None:
+        # 並べ替え用のカラムを先頭に付けて読み、JSONには選択されたフィールドだけを出す
+        tree = descendants_cte(parent_id, depth)
+        rows = (await db.execute(
+            select(TaskModel.id, TaskModel.parent, TaskModel.sort_key, TaskModel.child_count,
+                   *task_columns(selected))
+            .join(tree, tree.c.id == TaskModel.id)
+        )).all()
+        # depth 指定時は同じタスクが複数の深さで現れうるので重複を除く
+        rows = list({row[0]: row for row in rows}.values())
+        tasks = []
+        for level, row in tree_order(parent_id, rows, depth):
+            node = dict(zip(selected, row[4:]))
+            node["level"] = level
+            node["has_children"] = row[3] > 0
+            tasks.append(node)
+        body = dumps({"parent": parent_id, "depth": depth, "tasks": tasks, "revision": revision})
+        response_cache.put(variant, revision, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def window_cte(date_from: Optional[date], date_to: Optional[date]):
+    """Recursive CTE selecting tasks overlapping a date window plus all of their ancestors."""
+    # 整数の start_ts/end_ts で比較し、ix_tasks_end_ts_start_ts で範囲検索する
+    conditions = []
+    if date_to is not None:
+        conditions.append(TaskModel.start_ts < date_to_timestamp(date_to + timedelta(days=1)))
+    if date_from is not None:
+        conditions.append(TaskModel.end_ts >= date_to_timestamp(date_from))
+    visible = (
+        select(TaskModel.id, TaskModel.parent).where(*conditions).cte("visible", recursive=True)
+    )
+    # ツリーを描画できるよう祖先を親方向にたどって加える
+    return visible.union(
+        select(TaskModel.id, TaskModel.parent).where(TaskModel.id == visible.c.parent)
+    )
+
+
+def check_window(date_from: Optional[date], date_to: Optional[date]):
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+
+async def load_gantt_data(db: AsyncSession, revision: int) -> GanttData:
+    """Load every task and link."""
+    tasks = (await db.scalars(
+        select(TaskModel).order_by(TaskModel.parent, TaskModel.sort_key, TaskModel.id)
+    )).all()
+    links = (await db.scalars(select(LinkModel))).all()
+    return GanttData(tasks=tasks, links=links, revision=revision)
 
 
 @router.get("", response_model=GanttData)
-def get_all_tasks(db: Session = Depends(get_db)):
-    """Get all tasks and links."""
-    tasks = db.query(TaskModel).order_by(TaskModel.parent, TaskModel.sortorder).all()
-    links = db.query(LinkModel).all()
-    return GanttData(tasks=tasks, links=links)
+async def get_all_tasks(
+    request: Request,
+    fields: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Get all tasks and links, optionally projected to the given task fields.
+    With from/to, only tasks overlapping the window (plus their ancestors) and
+    the links between them are returned.
+    """
+    selected = parse_fields(fields)
+    check_window(date_from, date_to)
+    windowed = date_from is not None or date_to is not None
+
+    variant = "tasks"
+    if selected != TASK_FIELDS:
+        variant += "-" + hashlib.sha1(",".join(selected).encode()).hexdigest()[:12]
+    if windowed:
+        variant += f"-{date_from or ''}_{date_to or ''}"
+
+    # リビジョンを先に読む（後続の読み取りがそれより新しくても差分同期で再送されるだけ）
+    revision = await get_revision(db)
+    etag = make_etag(revision, variant)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    body = response_cache.get(variant, revision)
+    if body is None:
+        # ORM/Pydantic を経由せず、必要なカラムだけの行タプルから直接JSONを組み立てる
+        task_query = select(*task_columns(selected)).order_by(
+            TaskModel.parent, TaskModel.sort_key, TaskModel.id
+        )
+        link_query = select(*link_columns())
+        if windowed:
+            visible_ids = select(window_cte(date_from, date_to).c.id)
+            task_query = task_query.where(TaskModel.id.in_(visible_ids))
+            link_query = link_query.where(
+                LinkModel.source.in_(visible_ids), LinkModel.target.in_(visible_ids)
+            )
+        task_rows = (await db.execute(task_query)).all()
+        link_rows = (await db.execute(link_query)).all()
+        body = dumps({
+            "tasks": rows_to_dicts(selected, task_rows),
+            "links": rows_to_dicts(LINK_FIELDS, link_rows),
+            "revision": revision,
+        })
+        response_cache.put(variant, revision, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/roots", response_model=TaskTree)
+async def get_root_tasks(
+    request: Request,
+    depth: int = Query(1, ge=1),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get the top-level tasks (and their descendants down to depth levels) in tree order."""
+    return await tree_response(request, db, 0, depth, fields)
+
+
+@router.get("/search", response_model=TaskSearchResult)
+async def search_tasks(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    mark_start: str = "【",
+    mark_end: str = "】",
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Full-text search over text, memo, ToDo and task_schedule (see search.py).
+    Space-separated terms must all match; best matches first, each with a
+    snippet and the path of its ancestors.
+    """
+    terms = parse_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    revision = await get_revision(db)
+    rows = (await db.execute(search_statement(terms, limit + 1, offset, mark_start, mark_end))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    paths = await ancestor_paths(db, {row.id: row.parent for row in rows})
+
+    results = [
+        TaskSearchHit(
+            **{name: getattr(row, name) for name in HIT_FIELDS},
+            snippet=row.snippet or make_snippet(
+                [row.text, row.memo, row.ToDo, row.task_schedule], terms, mark_start, mark_end
+            ),
+            rank=row.rank,
+            path=[TaskPathItem(id=node, text=text) for node, text in paths[row.id]],
+        )
+        for row in rows
+    ]
+    return TaskSearchResult(query=q, results=results, has_more=has_more, revision=revision)
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters of the serialized response cache."""
+    return response_cache.stats()
+
+
+async def load_changes(db: AsyncSession, since: int) -> GanttChanges:
+    """Tasks/links changed and IDs deleted after the given revision (everything if a reset happened since)."""
+    revision, reset_revision = (await db.execute(
+        select(SyncState.revision, SyncState.reset_revision).where(SyncState.id == 1)
+    )).one()
+
+    # 全件置き換え以前のリビジョンからは差分を作れないので全件を返す
+    if since < reset_revision:
+        data = await load_gantt_data(db, revision)
+        return GanttChanges(
+            revision=data.revision, full_sync=True, tasks=data.tasks, links=data.links
+        )
+
+    tasks = (await db.scalars(
+        select(TaskModel)
+        .where(TaskModel.revision > since)
+        .order_by(TaskModel.parent, TaskModel.sort_key, TaskModel.id)
+    )).all()
+    links = (await db.scalars(select(LinkModel).where(LinkModel.revision > since))).all()
+    tombstones = (await db.execute(
+        select(Tombstone.entity, Tombstone.entity_id).where(Tombstone.revision > since)
+    )).all()
+
+    # 削除後に同じIDで再作成されたものは削除扱いにしない
+    live_task_ids = {task.id for task in tasks}
+    live_link_ids = {link.id for link in links}
+    deleted_tasks = sorted({
+        entity_id for entity, entity_id in tombstones
+        if entity == "task" and entity_id not in live_task_ids
+    })
+    deleted_links = sorted({
+        entity_id for entity, entity_id in tombstones
+        if entity == "link" and entity_id not in live_link_ids
+    })
+
+    return GanttChanges(
+        revision=revision,
+        tasks=tasks,
+        links=links,
+        deleted_tasks=deleted_tasks,
+        deleted_links=deleted_links,
+    )
+
+
+@router.get("/changes", response_model=GanttChanges)
+async def get_changes(since: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Get tasks/links changed and IDs deleted after the given revision."""
+    return await load_changes(db, since)
 
 
 @router.get("/{task_id}", response_model=Task)
-def get_task(task_id: int, db: Session = Depends(get_db)):
+async def get_task(task_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get a single task by ID."""
-    task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+    task = await db.get(TaskModel, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
 
-@router.post("", response_model=Task)
-def create_task(task: TaskCreate, db: Session = Depends(get_db)):
-    """Create a new task."""
+async def insert_task(
+    db: AsyncSession, task: TaskCreate, revision: int, task_id: Optional[int] = None
+) -> TaskModel:
+    """Insert a task (without committing) and return it with its new ID (or task_id, if given)."""
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    duration = task.duration or calculate_duration(task.start_date, task.end_date)
-
-    parent_id = task.parent or 0
-    
-    # sortorderが負の値の場合は一番上に追加
-    if task.sortorder is not None and task.sortorder < 0:
-        # 同じparent内の全タスクのsortorderを+1して後ろにずらす
-        db.query(TaskModel).filter(TaskModel.parent == parent_id).update(
-            {TaskModel.sortorder: TaskModel.sortorder + 1}
-        )
-        new_sortorder = 0
-    elif task.sortorder is not None:
-        new_sortorder = task.sortorder
-    else:
-        # デフォルト: 末尾に追加
-        max_sortorder = db.query(TaskModel).filter(
-            TaskModel.parent == parent_id
-        ).count()
-        new_sortorder = max_sortorder
+    dates = normalize_task_dates({"start_date": task.start_date, "end_date": task.end_date})
+    duration = task.duration or calculate_duration(dates["start_date"], dates["end_date"])
+
+    # 位置は並び順キーだけで決まるので兄弟の行は書き換えない
+    # （sortorder が負なら先頭、指定があればその位置、before/after があればその隣、既定は末尾）
+    position = task.sortorder if "sortorder" in task.model_fields_set else None
+    parent_id, sort_key, new_sortorder = await place_task(
+        db, task.parent or 0, before=task.before, after=task.after, position=position
+    )
 
     db_task = TaskModel(
+        id=task_id,
         text=task.text,
-        start_date=task.start_date,
-        end_date=task.end_date,
+        start_date=dates["start_date"],
+        end_date=dates["end_date"],
         duration=duration,
         progress=task.progress or 0.0,
         parent=parent_id,
         kind_task=task.kind_task or 1,
         owner_id=task.owner_id or 0,
         sortorder=new_sortorder,
+        sort_key=sort_key,
         color=task.color,
         textColor=task.textColor,
         ToDo=task.ToDo,
@@ -80,107 +385,398 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
         mail=task.mail,
         memo=task.memo,
         hyperlink=task.hyperlink,
-        edit_date=task.edit_date,
         created_at=now,
         updated_at=now,
+        revision=revision,
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await db.flush()
+    await add_edits(db, edit_rows(db_task.id, task.edit_date))
+    await refresh_rollups(db, [db_task.id], revision)
+    return db_task
+
+
+@router.get("/{task_id}/children", response_model=TaskTree)
+async def get_task_children(
+    task_id: int,
+    request: Request,
+    depth: int = Query(1, ge=1),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get the descendants of a task down to depth levels in tree order (for lazy expansion)."""
+    if await db.get(TaskModel, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return await tree_response(request, db, task_id, depth, fields)
+
+
+@router.get("/{task_id}/rollup", response_model=TaskRollup)
+async def get_task_rollup(task_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Subtree rollups of a task, read from its own row (kept current by every write)."""
+    row = (await db.execute(
+        select(
+            TaskModel.id, TaskModel.child_count, TaskModel.descendant_count,
+            TaskModel.rollup_start, TaskModel.rollup_end, TaskModel.rollup_progress,
+        ).where(TaskModel.id == task_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return TaskRollup.model_validate(row)
+
+
+@router.get("/{task_id}/dependencies", response_model=TaskDependencies)
+async def get_task_dependencies(task_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Links entering and leaving a task, answered from the in-memory dependency index."""
+    # 索引には存在しないタスクの項目もないので、404 はタスクの表で判定する
+    if await db.scalar(select(TaskModel.id).where(TaskModel.id == task_id)) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    graph = await dependency_graph.ensure_current(db)
+
+    def as_links(entries):
+        return [
+            {"id": link_id, "source": source, "target": target, "type": link_type}
+            for link_id, source, target, link_type in sorted(entries)
+        ]
+
+    return TaskDependencies(
+        task_id=task_id,
+        predecessors=as_links(graph.predecessors(task_id)),
+        successors=as_links(graph.successors(task_id)),
+    )
+
+
+@router.get("/{task_id}/critical-path", response_model=CriticalPathResponse)
+async def get_critical_path(task_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Early/late dates, total float and the critical path of a project (kind_task=2) subtree."""
+    revision = await get_revision(db)
+    variant = f"critical-path-{task_id}"
+    body = response_cache.get(variant, revision)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+    project = await db.get(TaskModel, task_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if project.kind_task != 2:
+        raise HTTPException(status_code=400, detail="Task is not a project (kind_task=2)")
+
+    # プロジェクト（集計行）は除き、配下の作業タスクとその間のリンクだけで計算する
+    subtree_ids = select(subtree_cte(task_id).c.id)
+    rows = (await db.execute(
+        select(TaskModel.id, TaskModel.start_ts, TaskModel.end_ts)
+        .where(TaskModel.id.in_(subtree_ids), TaskModel.kind_task != 2)
+    )).all()
+    spans = {
+        id_: (start, max(start, end))
+        for id_, start, end in rows if start is not None and end is not None
+    }
+    edges = (await db.execute(
+        select(LinkModel.source, LinkModel.target, LinkModel.type)
+        .where(LinkModel.source.in_(subtree_ids))
+    )).all()
+    result = analyze_critical_path(spans, [(s, t, link_type or 0) for s, t, link_type in edges])
+
+    ordered = sorted(result.items(), key=lambda item: (item[1][0], item[0]))
+    # 日付は異なる値ごとに1回だけ整形し、スキーマを通さず行タプルから直接JSONにする
+    text = format_timestamps(value for _, times in ordered for value in times)
+    rows = [
+        (id_, text[es], text[ef], text[ls], text[lf], (ls - es) / 86400, ls <= es)
+        for id_, (es, ef, ls, lf) in ordered
+    ]
+    body = dumps({
+        "task_id": task_id,
+        "revision": revision,
+        "project_start": text[ordered[0][1][0]] if ordered else None,
+        "project_finish": text[max(ef for _, ef, _, _ in result.values())] if ordered else None,
+        "tasks": rows_to_dicts(SLACK_FIELDS, rows),
+        "critical_path": [row[0] for row in rows if row[-1]],
+    })
+    response_cache.put(variant, revision, body)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("", response_model=Task)
+async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new task."""
+    db_task = await insert_task(db, task, await bump_revision(db))
+    await db.commit()
+    await db.refresh(db_task)
     return db_task
 
 
-@router.put("/{task_id}", response_model=Task)
-def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db)):
-    """Update a task."""
-    db_task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+async def apply_task_update(
+    db: AsyncSession, task_id: int, task: TaskUpdate, revision: int, auto_schedule: bool = True
+) -> Tuple[TaskModel, List[Dict]]:
+    """
+    Apply a partial update to a task (without committing).
+    Returns the task and the new dates of successors shifted by auto-scheduling.
+    """
+    db_task = await db.get(TaskModel, task_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     update_data = task.model_dump(exclude_unset=True)
+    update_data.update(normalize_task_dates(update_data))
+
+    dates_changed = "start_date" in update_data or "end_date" in update_data
 
     # Recalculate duration if dates changed
-    if "start_date" in update_data or "end_date" in update_data:
+    if dates_changed:
         start = update_data.get("start_date", db_task.start_date)
         end = update_data.get("end_date", db_task.end_date)
         update_data["duration"] = calculate_duration(start, end)
 
     update_data["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # Add to edit_date history
-    today = datetime.now().strftime("%Y-%m-%d")
-    if db_task.edit_date:
-        if today not in db_task.edit_date:
-            update_data["edit_date"] = f"{db_task.edit_date},{today}"
-    else:
-        update_data["edit_date"] = today
+    # 編集履歴に今日を追加する（クライアントが送った編集日も取り込む。既にある日は無視される）
+    await record_edit(db, task_id, update_data.pop("edit_date", None))
+
+    update_data["revision"] = revision
+
+    # sortorder は参考値（クライアントの値は古いことがある）なので位置の指定には使わず、
+    # 親が変わるか before/after が指定されたときだけ並び順キーを選び直す
+    update_data.pop("sortorder", None)
+    before, after = update_data.pop("before", None), update_data.pop("after", None)
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Give either before or after")
+    new_parent = update_data.get("parent", db_task.parent) or 0
+    if new_parent != db_task.parent or before is not None or after is not None:
+        update_data["parent"], update_data["sort_key"], update_data["sortorder"] = await place_task(
+            db, new_parent, before=before, after=after, task_id=task_id
+        )
 
+    old_parent = db_task.parent
     for key, value in update_data.items():
         setattr(db_task, key, value)
 
-    db.commit()
-    db.refresh(db_task)
-    return db_task
+    await db.flush()
 
+    rescheduled = []
+    if dates_changed and auto_schedule:
+        rescheduled = await reschedule_successors(db, task_id, revision)
 
-@router.delete("/{task_id}", response_model=DeleteResponse)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    """Delete a task and all its children."""
-    db_task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+    # 集計に関わる値が変わったときだけ、祖先（移動前の親側も）を再計算する
+    if update_data.keys() & ROLLUP_INPUTS or rescheduled:
+        await refresh_rollups(
+            db, [task_id, old_parent, *(item["id"] for item in rescheduled)], revision
+        )
+    return db_task, rescheduled
+
+
+@router.put("/{task_id}", response_model=TaskUpdateResponse)
+async def update_task(
+    task_id: int,
+    task: TaskUpdate,
+    auto_schedule: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Update a task; if its dates changed, successors are shifted along their links."""
+    db_task, rescheduled = await apply_task_update(
+        db, task_id, task, await bump_revision(db), auto_schedule
+    )
+    await db.commit()
+    await db.refresh(db_task)
+
+    response = TaskUpdateResponse.model_validate(db_task)
+    response.rescheduled = [TaskSchedule(**item) for item in rescheduled]
+    return response
+
+
+async def delete_subtree(db: AsyncSession, task_id: int, revision: int) -> List[int]:
+    """Delete a task, its descendants and their links (without committing); return the descendant IDs."""
+    db_task = await db.get(TaskModel, task_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Find all children recursively
-    deleted_children = []
-
-    def find_children(parent_id: int):
-        children = db.query(TaskModel).filter(TaskModel.parent == parent_id).all()
-        for child in children:
-            deleted_children.append(child.id)
-            find_children(child.id)
+    parent_id = db_task.parent
 
-    find_children(task_id)
+    # 子孫を1回の再帰CTEで解決し、リンク→タスクの順に集合DELETEする
+    subtree = subtree_cte(task_id)
+    deleted_children = (await db.scalars(
+        select(subtree.c.id).where(subtree.c.id != task_id)
+    )).all()
 
-    # Delete all children
-    for child_id in deleted_children:
-        db.query(TaskModel).filter(TaskModel.id == child_id).delete()
-        # Delete links for this task
-        db.query(LinkModel).filter(
-            (LinkModel.source == child_id) | (LinkModel.target == child_id)
-        ).delete()
+    subtree_ids = select(subtree.c.id)
+    link_ids = select(LinkModel.id).where(
+        or_(LinkModel.source.in_(subtree_ids), LinkModel.target.in_(subtree_ids))
+    )
+    await add_tombstones_from(db, "task", subtree_ids, revision)
+    await add_tombstones_from(db, "link", link_ids, revision)
 
-    # Delete the task itself
-    db.delete(db_task)
+    await db.execute(
+        delete(LinkModel)
+        .where(or_(LinkModel.source.in_(subtree_ids), LinkModel.target.in_(subtree_ids)))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(TaskEdit)
+        .where(TaskEdit.task_id.in_(subtree_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(TaskModel)
+        .where(TaskModel.id.in_(subtree_ids))
+        .execution_options(synchronize_session=False)
+    )
+    # 集合DELETEはセッションに反映されないので、削除済みのオブジェクトを残さない
+    db.expunge_all()
+    stage_tasks_removed(db, [task_id, *deleted_children])
+    await refresh_rollups(db, [parent_id], revision)
+    return deleted_children
 
-    # Delete links for this task
-    db.query(LinkModel).filter(
-        (LinkModel.source == task_id) | (LinkModel.target == task_id)
-    ).delete()
 
-    db.commit()
+@router.delete("/{task_id}", response_model=DeleteResponse)
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a task and all its children."""
+    deleted_children = await delete_subtree(db, task_id, await bump_revision(db))
+    await db.commit()
 
     return DeleteResponse(deleted_id=task_id, deleted_children=deleted_children)
 
 
-@router.post("/{task_id}/clone", response_model=Task)
-def clone_task(task_id: int, db: Session = Depends(get_db)):
-    """Clone a task."""
-    db_task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
+async def clone_subtree(db: AsyncSession, task_id: int, offset_days: int, revision: int) -> Dict[int, int]:
+    """
+    Copy a task, its descendants and the links among them (without committing).
+    The copy goes right after the original; progress is reset and dates are
+    shifted by offset_days. Returns {original ID: copy ID}.
+    """
+    tasks = TaskModel.__table__
+    links = LinkModel.__table__
+    root = (await db.execute(select(tasks.c.parent).where(tasks.c.id == task_id))).first()
+    if root is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    parent_id, sort_key, sortorder = await place_task(db, root.parent, after=task_id)
+
+    subtree_ids = (await db.scalars(select(subtree_cte(task_id).c.id))).all()
+    # 複製のID = 元のID + delta（既存のどのIDより大きくなり、親子の対応は足し算だけで保てる）
+    delta = (await db.scalar(select(func.max(tasks.c.id)))) + 1 - min(subtree_ids)
+    subtree = select(subtree_cte(task_id).c.id)
+    in_subtree = tasks.c.id.in_(subtree)
+    is_root = tasks.c.id == task_id
+
+    def shifted(column):
+        if not offset_days:
+            return column
+        # 解析できない日付はそのまま残す
+        return func.coalesce(
+            func.strftime("%Y-%m-%d %H:%M:%S", column, f"{offset_days:+d} days"), column
+        )
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    overrides = {
+        "id": tasks.c.id + delta,
+        "parent": case((is_root, parent_id), else_=tasks.c.parent + delta),
+        "sort_key": case((is_root, sort_key), else_=tasks.c.sort_key),
+        "sortorder": case((is_root, sortorder), else_=tasks.c.sortorder),
+        "text": case((is_root, tasks.c.text + " (コピー)"), else_=tasks.c.text),
+        "start_date": shifted(tasks.c.start_date),
+        "end_date": shifted(tasks.c.end_date),
+        "rollup_start": shifted(tasks.c.rollup_start),
+        "rollup_end": shifted(tasks.c.rollup_end),
+        "progress": literal(0.0),
+        "rollup_progress": literal(0.0),  # 進捗をすべて0に戻すので集計も0
+        "created_at": literal(now),
+        "updated_at": literal(now),
+        "revision": literal(revision),
+    }
+    # 1文の INSERT ... SELECT でサブツリー全体を複製する（生成カラムは除く）
+    names = [column.name for column in tasks.columns if column.computed is None]
+    await db.execute(
+        insert(tasks).from_select(
+            names, select(*[overrides.get(name, tasks.c[name]) for name in names]).where(in_subtree)
+        )
+    )
+
+    internal = links.c.source.in_(subtree), links.c.target.in_(subtree)
+    first_link = await db.scalar(select(func.min(links.c.id)).where(*internal))
+    if first_link is not None:
+        next_link_id = (await db.scalar(select(func.max(links.c.id)))) + 1
+        await db.execute(
+            insert(links).from_select(
+                ["id", "source", "target", "type", "revision"],
+                select(
+                    links.c.id + (next_link_id - first_link),
+                    links.c.source + delta,
+                    links.c.target + delta,
+                    links.c.type,
+                    literal(revision),
+                ).where(*internal),
+            )
+        )
+        for link_id, source, target, link_type in (await db.execute(
+            select(links.c.id, links.c.source, links.c.target, links.c.type)
+            .where(links.c.id >= next_link_id)
+        )).all():
+            stage_link_added(db, link_id, source, target, link_type or 0)
+
+    await refresh_rollups(db, [task_id + delta], revision)
+    return {old_id: old_id + delta for old_id in subtree_ids}
+
+
+@router.post("/{task_id}/clone", response_model=Union[Task, SubtreeClone])
+async def clone_task(
+    task_id: int,
+    deep: bool = False,
+    offset_days: int = 0,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Clone a task, shifting its dates by offset_days.
+    With deep=true, the whole subtree and the links inside it are copied in one
+    transaction and returned as a SubtreeClone.
+    """
+    if deep:
+        revision = await bump_revision(db)
+        id_map = await clone_subtree(db, task_id, offset_days, revision)
+        await db.commit()
+
+        # 一覧と同じく行タプルから直接JSONにする
+        root_id = id_map[task_id]
+        new_ids = select(subtree_cte(root_id).c.id)
+        task_rows = (await db.execute(
+            select(*task_columns(TASK_FIELDS)).where(TaskModel.id.in_(new_ids))
+        )).all()
+        link_rows = (await db.execute(
+            select(*link_columns()).where(LinkModel.source.in_(new_ids), LinkModel.target.in_(new_ids))
+        )).all()
+        tasks = rows_to_dicts(TASK_FIELDS, task_rows)
+        # ツリー表示の順（親が先、兄弟は並び順）に並べる
+        by_id = {task["id"]: task for task in tasks}
+        ordered = tree_order(
+            by_id[root_id]["parent"],
+            [(task["id"], task["parent"], task["sort_key"]) for task in tasks],
+            None,
+        )
+        body = dumps({
+            "root_id": root_id,
+            "id_map": id_map,
+            "tasks": [by_id[row[0]] for _, row in ordered],
+            "links": rows_to_dicts(LINK_FIELDS, link_rows),
+            "revision": revision,
+        })
+        return Response(content=body, media_type="application/json")
+
+    db_task = await db.get(TaskModel, task_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    revision = await bump_revision(db)
+    # 元のタスクの直後に置く
+    parent_id, sort_key, sortorder = await place_task(db, db_task.parent, after=db_task.id)
+    start_date, end_date = shift_dates([db_task.start_date, db_task.end_date], offset_days)
 
     new_task = TaskModel(
         text=f"{db_task.text} (コピー)",
-        start_date=db_task.start_date,
-        end_date=db_task.end_date,
+        start_date=start_date,
+        end_date=end_date,
         duration=db_task.duration,
         progress=0.0,  # Reset progress
-        parent=db_task.parent,
+        parent=parent_id,
         kind_task=db_task.kind_task,
         owner_id=db_task.owner_id,
-        sortorder=db_task.sortorder + 1,
+        sortorder=sortorder,
+        sort_key=sort_key,
         color=db_task.color,
         textColor=db_task.textColor,
         ToDo=db_task.ToDo,
@@ -192,46 +788,87 @@ def clone_task(task_id: int, db: Session = Depends(get_db)):
         hyperlink=db_task.hyperlink,
         created_at=now,
         updated_at=now,
+        revision=revision,
     )
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    await db.flush()
+    await refresh_rollups(db, [new_task.id], revision)
+    await db.commit()
+    await db.refresh(new_task)
     return new_task
 
 
-@router.post("/expand-all")
-def expand_all():
-    """Expand all tasks (handled on frontend)."""
-    return {"message": "Expand all tasks"}
-
-
-@router.post("/collapse-all")
-def collapse_all():
-    """Collapse all tasks (handled on frontend)."""
-    return {"message": "Collapse all tasks"}
+@router.post("/expand-all", response_model=TaskTree)
+async def expand_all(
+    request: Request,
+    task_id: int = 0,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get every descendant of a task (default: the whole tree) in tree order, to show it fully expanded."""
+    if task_id and await db.get(TaskModel, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return await tree_response(request, db, task_id, None, fields)
+
+
+@router.post("/collapse-all", response_model=TaskTree)
+async def collapse_all(
+    request: Request,
+    task_id: int = 0,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get only the direct children of a task (default: the top-level tasks), to show it collapsed."""
+    if task_id and await db.get(TaskModel, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return await tree_response(request, db, task_id, 1, fields)
 
 
 @router.post("/reorder")
-def reorder_tasks(request: TaskReorderRequest, db: Session = Depends(get_db)):
-    """Reorder tasks in batch."""
+async def reorder_tasks(request: TaskReorderRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Move tasks, applying the items in order.
+    An item with before/after is placed next to that task (under its parent);
+    otherwise it goes to position sortorder under parent (default: its current
+    parent), or to the end. Each item rewrites only the moved task's row.
+    """
     try:
-        # Create a mapping of id -> item for quick lookup
-        updates = {item.id: item for item in request.items}
-        
-        # Get all affected tasks
-        tasks = db.query(TaskModel).filter(TaskModel.id.in_(updates.keys())).all()
-        
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        for task in tasks:
-            update = updates[task.id]
-            task.sortorder = update.sortorder
-            task.parent = update.parent
+        revision = await bump_revision(db)
+
+        moved = []
+        old_parents = []
+        for item in request.items:
+            if item.before is not None and item.after is not None:
+                raise HTTPException(status_code=400, detail=f"Task {item.id}: give either before or after")
+            task = await db.get(TaskModel, item.id)
+            if task is None:
+                continue
+            old_parents.append(task.parent)
+            parent = item.parent if item.parent is not None else task.parent
+            task.parent, task.sort_key, task.sortorder = await place_task(
+                db, parent, before=item.before, after=item.after, position=item.sortorder,
+                task_id=task.id,
+            )
             task.updated_at = now
-            
-        db.commit()
-        return {"status": "success", "updated_count": len(tasks)}
+            task.revision = revision
+            # 後続の項目がこのタスクを基準にできるよう、位置を反映しておく
+            await db.flush()
+            moved.append(task)
+
+        await refresh_rollups(db, [task.id for task in moved] + old_parents, revision)
+        await db.commit()
+        return {
+            "status": "success",
+            "updated_count": len(moved),
+            "items": [
+                {"id": task.id, "parent": task.parent, "sortorder": task.sortorder, "sort_key": task.sort_key}
+                for task in moved
+            ],
+        }
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-
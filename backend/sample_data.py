@@ -4,8 +4,11 @@ Run this to populate the database with sample data.
 """
 
 from datetime import datetime, timedelta
+from sqlalchemy import update
 from database import SessionLocal, init_db
-from models import Task as TaskModel, Link as LinkModel
+from models import Task as TaskModel, Link as LinkModel, SyncState
+from ranking import renumber_sync
+from rollups import rebuild_rollups_sync
 
 
 def create_sample_data():
@@ -195,6 +198,18 @@ def create_sample_data():
 
         for task in tasks:
             db.add(task)
+        db.flush()
+
+        # sortorder から並び順キーを振り、配下の集計を計算する
+        renumber_sync(db.connection())
+        rebuild_rollups_sync(db.connection())
+
+        # 差分同期中のクライアントに全件再取得させる
+        db.execute(
+            update(SyncState)
+            .where(SyncState.id == 1)
+            .values(revision=SyncState.revision + 1, reset_revision=SyncState.revision + 1)
+        )
 
         db.commit()
         print(f"Created {len(tasks)} sample tasks")
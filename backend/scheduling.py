@@ -0,0 +1,206 @@
+"""
+Auto-scheduling along FS/SS/FF/SF links.
+When a task's dates change, only its downstream cone (tasks reachable through
+outgoing links) is loaded, sorted topologically and pushed forward so every
+link constraint holds again. Successors are never pulled earlier.
+"""
+
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dates import DATETIME_FORMAT, format_datetime, parse_datetime
+from models import Task as TaskModel, Link as LinkModel
+
+# Link.type
+FINISH_TO_START = 0
+START_TO_START = 1
+FINISH_TO_FINISH = 2
+START_TO_FINISH = 3
+
+Edge = Tuple[int, int, int]  # (source, target, type)
+Span = Tuple[datetime, datetime]  # (start, end)
+
+
+def downstream_cte(task_id: int):
+    """Recursive CTE selecting a task and every task reachable through outgoing links."""
+    cone = select(TaskModel.id).where(TaskModel.id == task_id).cte("cone", recursive=True)
+    # UNION なのでリンクが循環していても停止する
+    return cone.union(select(LinkModel.target).where(LinkModel.source == cone.c.id))
+
+
+def topological_order(nodes: List[int], edges: List[Edge]) -> List[int]:
+    """Kahn's algorithm; nodes on a cycle are left out."""
+    successors = defaultdict(list)
+    in_degree = dict.fromkeys(nodes, 0)
+    for source, target, _ in edges:
+        if source in in_degree and target in in_degree:
+            successors[source].append(target)
+            in_degree[target] += 1
+
+    queue = deque(node for node in nodes if in_degree[node] == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for successor in successors[node]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                queue.append(successor)
+    return order
+
+
+def required_start(link_type: int, predecessor: Span, duration: timedelta) -> datetime:
+    """Earliest start of a successor allowed by one link."""
+    pred_start, pred_end = predecessor
+    if link_type == START_TO_START:
+        return pred_start
+    if link_type == FINISH_TO_FINISH:
+        return pred_end - duration
+    if link_type == START_TO_FINISH:
+        return pred_start - duration
+    return pred_end  # FINISH_TO_START（既定）
+
+
+def propagate(root: int, spans: Dict[int, Span], edges: List[Edge]) -> Dict[int, Span]:
+    """
+    Push successors of root forward until all links in the cone are satisfied.
+    Returns the new spans of the tasks that moved.
+    """
+    predecessors = defaultdict(list)
+    for source, target, link_type in edges:
+        predecessors[target].append((source, link_type))
+
+    spans = dict(spans)
+    moved: Dict[int, Span] = {}
+    for node in topological_order(list(spans), edges):
+        if node == root:
+            continue
+        start, end = spans[node]
+        duration = end - start
+        earliest = start
+        for source, link_type in predecessors[node]:
+            if source in spans:
+                earliest = max(earliest, required_start(link_type, spans[source], duration))
+        if earliest > start:
+            spans[node] = moved[node] = (earliest, earliest + duration)
+    return moved
+
+
+async def reschedule_successors(
+    db: AsyncSession, task_id: int, revision: int
+) -> List[Dict[str, object]]:
+    """
+    Shift the downstream cone of a task whose dates changed (call after flushing it).
+    Returns {id, start_date, end_date} of every rescheduled task.
+    """
+    cone = downstream_cte(task_id)
+    # 再帰CTEは1回だけ評価し、コーン内のタスクの日付と出リンクをまとめて読む
+    rows = (await db.execute(
+        select(TaskModel.id, TaskModel.start_date, TaskModel.end_date, LinkModel.target, LinkModel.type)
+        .join(cone, cone.c.id == TaskModel.id)
+        .outerjoin(LinkModel, LinkModel.source == TaskModel.id)
+    )).all()
+
+    spans: Dict[int, Span] = {}
+    edges: List[Edge] = []
+    for id_, start_date, end_date, target, link_type in rows:
+        if target is not None:
+            edges.append((id_, target, link_type or 0))
+        if id_ not in spans:
+            start, end = parse_datetime(start_date), parse_datetime(end_date)
+            # 日付を解析できないタスクは動かさない（制約の起点にもしない）
+            if start and end:
+                spans[id_] = (start, end)
+    if task_id not in spans or not edges:
+        return []
+
+    moved = [
+        {
+            "id": id_,
+            "start_date": format_datetime(start),
+            "end_date": format_datetime(end),
+        }
+        for id_, (start, end) in propagate(task_id, spans, edges).items()
+    ]
+    if moved:
+        now = datetime.now().strftime(DATETIME_FORMAT)
+        table = TaskModel.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("task_id"))
+            .values(
+                start_date=bindparam("new_start"),
+                end_date=bindparam("new_end"),
+                updated_at=now,
+                revision=revision,
+            ),
+            [
+                {"task_id": item["id"], "new_start": item["start_date"], "new_end": item["end_date"]}
+                for item in moved
+            ],
+        )
+    return moved
+
+
+def analyze_critical_path(
+    spans: Dict[int, Tuple[int, int]], edges: List[Edge]
+) -> Dict[int, Tuple[int, int, int, int]]:
+    """
+    Forward/backward pass over tasks given as (start_ts, end_ts) seconds.
+    A task never starts before its planned start; the project finishes at the
+    latest early finish. Returns {id: (early_start, early_finish, late_start,
+    late_finish)}; tasks on a cycle are left out. O(tasks + links).
+    """
+    durations = {id_: end - start for id_, (start, end) in spans.items()}
+
+    # どのリンク種別も「後続の開始 >= 先行の開始 + lag」に帰着できるので lag を先に求める
+    #   FS: +先行の期間 / SS: 0 / FF: +先行の期間 -後続の期間 / SF: -後続の期間
+    outgoing = defaultdict(list)
+    in_degree = dict.fromkeys(spans, 0)
+    for source, target, link_type in edges:
+        if source not in spans or target not in spans:
+            continue
+        lag = 0
+        if link_type in (FINISH_TO_START, FINISH_TO_FINISH):
+            lag += durations[source]
+        if link_type in (FINISH_TO_FINISH, START_TO_FINISH):
+            lag -= durations[target]
+        outgoing[source].append((target, lag))
+        in_degree[target] += 1
+
+    # 前進計算（Kahn法のトポロジカル順で先行が確定したものから後続へ伝える）
+    early = {id_: start for id_, (start, _) in spans.items()}
+    queue = deque(id_ for id_, degree in in_degree.items() if degree == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        es = early[node]
+        for target, lag in outgoing[node]:
+            if es + lag > early[target]:
+                early[target] = es + lag
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                queue.append(target)
+    if not order:
+        return {}
+
+    # 後退計算
+    project_finish = max(early[node] + durations[node] for node in order)
+    late = {}
+    for node in reversed(order):
+        ls = project_finish - durations[node]
+        for target, lag in outgoing[node]:
+            # 循環上の後続は order に含まれないので無視する
+            if target in late and late[target] - lag < ls:
+                ls = late[target] - lag
+        late[node] = ls
+
+    return {
+        node: (early[node], early[node] + durations[node], late[node], late[node] + durations[node])
+        for node in order
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Literal, Optional, List, Union
 
 
 # Task schemas
@@ -26,7 +26,9 @@ class TaskBase(BaseModel):
 
 
 class TaskCreate(TaskBase):
-    pass
+    # 指定したタスクの直前/直後に作成する（親はそのタスクの親になる）
+    before: Optional[int] = None
+    after: Optional[int] = None
 
 
 class TaskUpdate(BaseModel):
@@ -38,7 +40,7 @@ class TaskUpdate(BaseModel):
     parent: Optional[int] = None
     kind_task: Optional[int] = None
     owner_id: Optional[int] = None
-    sortorder: Optional[int] = None
+    sortorder: Optional[int] = None  # 参考値なので無視される（位置は parent と before/after で変える）
     color: Optional[str] = None
     textColor: Optional[str] = None
     ToDo: Optional[str] = None
@@ -49,17 +51,56 @@ class TaskUpdate(BaseModel):
     memo: Optional[str] = None
     hyperlink: Optional[str] = None
     edit_date: Optional[str] = None
+    # 指定したタスクの直前/直後に移動する（親はそのタスクの親になる）
+    before: Optional[int] = None
+    after: Optional[int] = None
 
 
 class Task(TaskBase):
     id: int
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
+    # 配下タスクの集計（子がなければ自身の値）
+    sort_key: Optional[str] = None  # 兄弟内の並び順キー（この順に並べる）
+    child_count: int = 0
+    descendant_count: int = 0
+    rollup_start: Optional[str] = None
+    rollup_end: Optional[str] = None
+    rollup_progress: Optional[float] = None
 
     class Config:
         from_attributes = True
 
 
+class TaskSchedule(BaseModel):
+    id: int
+    start_date: str
+    end_date: str
+
+
+class TaskUpdateResponse(Task):
+    rescheduled: List[TaskSchedule] = []  # 自動スケジューリングで日付がずれた後続タスク
+
+
+class TaskSlack(BaseModel):
+    id: int
+    early_start: str
+    early_finish: str
+    late_start: str
+    late_finish: str
+    total_float: float  # 日数
+    critical: bool
+
+
+class CriticalPathResponse(BaseModel):
+    task_id: int
+    revision: int
+    project_start: Optional[str] = None
+    project_finish: Optional[str] = None
+    tasks: List[TaskSlack]  # 早い開始順
+    critical_path: List[int]  # 余裕日数0のタスク（早い開始順）
+
+
 # Link schemas
 class LinkBase(BaseModel):
     source: int
@@ -78,10 +119,104 @@ class Link(LinkBase):
         from_attributes = True
 
 
+class SubtreeClone(BaseModel):
+    root_id: int  # 複製したサブツリーの根
+    id_map: Dict[int, int]  # 元のタスクID -> 複製のタスクID
+    tasks: List[Task]  # 複製したタスク（親→子、兄弟は並び順）
+    links: List[Link]  # 複製したサブツリー内のリンク
+    revision: int
+
+
+class TaskRollup(BaseModel):
+    """Rollups of a task's subtree (its own values if it has no children)."""
+    id: int
+    child_count: int = 0
+    descendant_count: int = 0
+    rollup_start: Optional[str] = None
+    rollup_end: Optional[str] = None
+    rollup_progress: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TaskDependencies(BaseModel):
+    task_id: int
+    predecessors: List[Link]  # このタスクに入るリンク
+    successors: List[Link]  # このタスクから出るリンク
+
+
 # Response schemas
 class GanttData(BaseModel):
     tasks: List[Task]
     links: List[Link]
+    revision: int = 0  # 取得時点のリビジョン（差分同期の起点）
+
+
+class TaskNode(Task):
+    level: int  # 起点からの深さ（直下の子が1）
+    has_children: bool
+
+
+class TaskTree(BaseModel):
+    parent: int  # 起点のタスクID（0 = ルート）
+    depth: Optional[int] = None  # 取得した深さ（None = すべて）
+    tasks: List[TaskNode]  # 行き掛け順（兄弟は sortorder 順）
+    revision: int = 0
+
+
+class TaskPathItem(BaseModel):
+    id: int
+    text: str
+
+
+class TaskSearchHit(BaseModel):
+    id: int
+    parent: Optional[int] = 0
+    text: str
+    start_date: str
+    end_date: str
+    progress: Optional[float] = 0.0
+    kind_task: Optional[int] = 1
+    snippet: str  # 一致箇所の抜粋（検索語を mark_start / mark_end で囲む）
+    rank: float  # 小さいほど一致度が高い
+    path: List[TaskPathItem]  # 祖先（ルートから親まで）
+
+
+class TaskSearchResult(BaseModel):
+    query: str
+    results: List[TaskSearchHit]
+    has_more: bool = False  # offset + limit より後にも結果がある
+    revision: int = 0
+
+
+class EditCount(BaseModel):
+    date: str  # "YYYY-MM-DD"
+    count: int  # その日に編集されたタスク数
+
+
+class DailyEdits(BaseModel):
+    days: List[EditCount]  # 編集のあった日だけ（日付順）
+    revision: int = 0
+
+
+class EditedTask(Task):
+    last_edited: str  # 期間内で最後に編集された日
+    edit_days: int  # 期間内で編集された日数
+
+
+class EditedTasks(BaseModel):
+    tasks: List[EditedTask]  # 最後に編集された日の新しい順
+    revision: int = 0
+
+
+class GanttChanges(BaseModel):
+    revision: int
+    full_sync: bool = False  # True の場合 tasks/links は全件（クライアントは置き換える）
+    tasks: List[Task]
+    links: List[Link]
+    deleted_tasks: List[int] = []
+    deleted_links: List[int] = []
 
 
 class DeleteResponse(BaseModel):
@@ -95,11 +230,54 @@ class ImportResponse(BaseModel):
     errors: List[str]
 
 
+# CSV diff schemas
+class DiffSelection(BaseModel):
+    """Task IDs of the diff entries to merge (see POST /api/diff/csv/apply)."""
+    modified: List[int] = []  # ファイルの値に戻す
+    deleted: List[int] = []  # 同じIDで作り直す
+    added: List[int] = []  # 削除する（子孫も含む）
+
+
+class DiffApplyResponse(BaseModel):
+    revision: int
+    updated: List[int]
+    restored: List[int]
+    removed: List[int]
+
+
 class TaskReorderItem(BaseModel):
     id: int
-    sortorder: int
-    parent: int
+    sortorder: Optional[int] = None  # 移動先での位置（0始まり、負なら先頭）
+    parent: Optional[int] = None  # 移動先の親（省略時は現在の親）
+    # 指定したタスクの直前/直後に移動する（parent/sortorder より優先）
+    before: Optional[int] = None
+    after: Optional[int] = None
 
 
 class TaskReorderRequest(BaseModel):
     items: List[TaskReorderItem]
+
+
+# Batch schemas
+# 実ID、または同じバッチ内で先に create/link_create した操作の temp_id
+EntityRef = Union[int, str]
+
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete", "link_create", "link_delete"]
+    id: Optional[EntityRef] = None  # update / delete / link_delete の対象
+    temp_id: Optional[str] = None  # create / link_create で払い出されるIDに付ける名前
+    data: Dict[str, Any] = {}  # create: TaskCreate / update: TaskUpdate / link_create: LinkCreate
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+
+class BatchResponse(BaseModel):
+    revision: int
+    id_map: Dict[str, int] = {}  # temp_id -> 実ID
+    tasks: List[Task]  # このバッチで作成・変更されたタスク（確定後の値）
+    links: List[Link]
+    deleted_tasks: List[int] = []
+    deleted_links: List[int] = []
@@ -0,0 +1,182 @@
+"""
+Full-text search over task text, memo, ToDo and task_schedule.
+tasks_fts is an external-content FTS5 table over tasks with the trigram
+tokenizer, so any substring of three or more characters is indexed; this
+works for Japanese, which has no spaces between words. Triggers keep it in
+sync with every write, including bulk INSERT/UPDATE/DELETE statements.
+Search terms shorter than three characters cannot use the trigram index and
+are matched with LIKE instead.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Text, and_, bindparam, case, column, func, literal, literal_column, or_, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task as TaskModel
+
+# 検索対象のカラム（tasks と同じ名前）と bm25 の重み
+SEARCH_COLUMNS = ("text", "memo", "ToDo", "task_schedule")
+COLUMN_WEIGHTS = (10.0, 2.0, 2.0, 1.0)
+
+# 検索結果に含めるタスクのフィールド
+HIT_FIELDS = ("id", "parent", "text", "start_date", "end_date", "progress", "kind_task")
+
+# トライグラムなので3文字以上の語だけが索引を使える
+MIN_INDEXED_LENGTH = 3
+
+# 抜粋の長さ（FTS5 はトークン数、LIKE 検索では文字数）
+SNIPPET_TOKENS = 24
+
+_TERM_SEPARATOR = re.compile(r"[\s　]+")
+
+_quoted = ", ".join(f'"{name}"' for name in SEARCH_COLUMNS)
+_new = ", ".join(f'new."{name}"' for name in SEARCH_COLUMNS)
+_old = ", ".join(f'old."{name}"' for name in SEARCH_COLUMNS)
+
+SEARCH_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        {_quoted}, content='tasks', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, {_quoted}) VALUES (new.id, {_new});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, {_quoted}) VALUES ('delete', old.id, {_old});
+    END
+    """,
+    # 集計や並び順の更新では索引を触らない
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF {_quoted} ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, {_quoted}) VALUES ('delete', old.id, {_old});
+        INSERT INTO tasks_fts(rowid, {_quoted}) VALUES (new.id, {_new});
+    END
+    """,
+]
+
+
+def create_search_index(conn: Connection):
+    """Create tasks_fts and its triggers, and index the existing tasks (used by migrations)."""
+    for statement in SEARCH_DDL:
+        conn.exec_driver_sql(statement)
+    conn.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+tasks_fts = table("tasks_fts", column("rowid"), *(column(name) for name in SEARCH_COLUMNS))
+_fts = literal_column("tasks_fts")
+
+
+def parse_terms(query: str) -> List[str]:
+    """Split a query on half- and full-width spaces (every term must match)."""
+    return list(dict.fromkeys(term for term in _TERM_SEPARATOR.split(query) if term))
+
+
+def match_expression(terms: Sequence[str]) -> str:
+    """FTS5 query matching every term as a substring."""
+    # 語をフレーズとして引用し、演算子や記号をそのまま検索できるようにする
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _searchable_text():
+    # 4カラムを区切り文字でつないで1回の LIKE で判定する
+    parts = [func.coalesce(getattr(TaskModel, name), "") for name in SEARCH_COLUMNS]
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined.op("||")(literal("\x1f")).op("||")(part)
+    return joined
+
+
+def like_conditions(terms: Sequence[str]) -> list:
+    text = _searchable_text()
+    return [text.like(_like_pattern(term), escape="\\") for term in terms]
+
+
+def search_statement(
+    terms: Sequence[str], limit: int, offset: int, mark_start: str, mark_end: str
+):
+    """
+    SELECT of the HIT_FIELDS, the SEARCH_COLUMNS, snippet and rank of the tasks matching every term,
+    best first. Terms long enough use the FTS index (bm25 rank, FTS snippet);
+    with only short terms, tasks are scanned with LIKE, matches in text rank
+    first and the snippet is left to make_snippet().
+    """
+    indexed = [term for term in terms if len(term) >= MIN_INDEXED_LENGTH]
+    short = [term for term in terms if len(term) < MIN_INDEXED_LENGTH]
+    columns = [getattr(TaskModel, name) for name in dict.fromkeys(HIT_FIELDS + SEARCH_COLUMNS)]
+    if indexed:
+        rank = func.bm25(_fts, *COLUMN_WEIGHTS)
+        snippet = func.snippet(_fts, -1, mark_start, mark_end, "…", SNIPPET_TOKENS)
+        statement = (
+            select(*columns, snippet.label("snippet"), rank.label("rank"))
+            .select_from(tasks_fts.join(TaskModel.__table__, TaskModel.id == tasks_fts.c.rowid))
+            .where(_fts.op("MATCH")(bindparam("match", match_expression(indexed), type_=Text)))
+            .order_by(rank, TaskModel.id)
+        )
+    else:
+        in_text = or_(*(TaskModel.text.like(_like_pattern(term), escape="\\") for term in short))
+        rank = case((in_text, -1.0), else_=0.0)
+        statement = (
+            select(*columns, literal(None, Text).label("snippet"), rank.label("rank"))
+            .order_by(rank, TaskModel.id)
+        )
+    if short:
+        statement = statement.where(and_(*like_conditions(short)))
+    return statement.limit(limit).offset(offset)
+
+
+def make_snippet(
+    values: Sequence[Optional[str]], terms: Sequence[str], mark_start: str, mark_end: str,
+    width: int = SNIPPET_TOKENS * 2,
+) -> str:
+    """Excerpt around the first match in the first matching column, with the terms marked."""
+    lowered = [term.lower() for term in terms]
+    for value in values:
+        if not value:
+            continue
+        folded = value.lower()
+        hits = [folded.find(term) for term in lowered if term in folded]
+        if not hits:
+            continue
+        start = max(0, min(hits) - width // 4)
+        end = min(len(value), start + width)
+        excerpt = value[start:end]
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+        marked = pattern.sub(lambda match: f"{mark_start}{match.group(0)}{mark_end}", excerpt)
+        return ("…" if start > 0 else "") + marked + ("…" if end < len(value) else "")
+    return ""
+
+
+async def ancestor_paths(db: AsyncSession, parents: Dict[int, int]) -> Dict[int, List[Tuple[int, str]]]:
+    """(id, text) of the ancestors of each task (root first), given {task_id: parent}."""
+    chain = (
+        select(TaskModel.id, TaskModel.parent, TaskModel.text)
+        .where(TaskModel.id.in_({parent for parent in parents.values() if parent}))
+        .cte("chain", recursive=True)
+    )
+    chain = chain.union(
+        select(TaskModel.id, TaskModel.parent, TaskModel.text).where(TaskModel.id == chain.c.parent)
+    )
+    nodes = {row[0]: (row[1], row[2]) for row in (await db.execute(select(chain))).all()}
+
+    paths = {}
+    for task_id, parent in parents.items():
+        path = []
+        # 親子関係が循環していても止まるよう、たどった数で打ち切る
+        while parent in nodes and len(path) <= len(nodes):
+            grandparent, text = nodes[parent]
+            path.append((parent, text))
+            parent = grandparent
+        paths[task_id] = path[::-1]
+    return paths
@@ -0,0 +1,52 @@
+"""
+Fast JSON encoding of task/link listings straight from SQL row tuples.
+This bypasses ORM object construction and Pydantic validation for the large
+read endpoints; the output has the same shape as schemas.Task / schemas.Link.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+from models import Task as TaskModel, Link as LinkModel
+from schemas import Task, Link
+
+# 応答に含められるフィールド（スキーマの定義順）
+TASK_FIELDS = list(Task.model_fields)
+LINK_FIELDS = list(Link.model_fields)
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma-separated task field projection; "id" is always included."""
+    if not fields:
+        return list(TASK_FIELDS)
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in TASK_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(TASK_FIELDS)})",
+        )
+    # 順序を保ったまま重複を除き、id を先頭に置く
+    return ["id"] + [name for name in dict.fromkeys(selected) if name != "id"]
+
+
+def task_columns(fields: Sequence[str]):
+    return [getattr(TaskModel, name) for name in fields]
+
+
+def link_columns():
+    return [getattr(LinkModel, name) for name in LINK_FIELDS]
+
+
+def rows_to_dicts(fields: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Turn row tuples into dicts keyed by field name."""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON."""
+    return _encoder.encode(obj).encode("utf-8")
@@ -0,0 +1,76 @@
+"""
+Shared fixtures. The app runs in-process against a scratch database file
+(GANTT_DB_PATH is set before any backend module is imported), and every test
+starts from empty tables.
+"""
+
+import os
+import tempfile
+
+os.environ["GANTT_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="gantt-tests-"), "gantt.db")
+os.environ.setdefault("GANTT_CHANGE_FEED_COALESCE_SECONDS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, update
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(app_client):
+    """The app with every task, link and edit removed (clients see it as a full reset)."""
+    from database import engine
+    from models import Task as TaskModel, Link as LinkModel, SyncState, TaskEdit, Tombstone
+
+    with engine.begin() as conn:
+        for model in (LinkModel, TaskEdit, TaskModel, Tombstone):
+            conn.execute(delete(model))
+        # リビジョンは戻さない（キャッシュや依存グラフはリビジョンで古さを判定する）
+        conn.execute(
+            update(SyncState)
+            .where(SyncState.id == 1)
+            .values(revision=SyncState.revision + 1, reset_revision=SyncState.revision + 1)
+        )
+    return app_client
+
+
+@pytest.fixture
+def create_task(client):
+    def create(text="task", start_date="2026-03-02 00:00:00", end_date="2026-03-06 00:00:00", **fields):
+        response = client.post(
+            "/api/tasks", json={"text": text, "start_date": start_date, "end_date": end_date, **fields}
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
+
+
+@pytest.fixture
+def create_link(client):
+    def create(source, target, type=0):
+        response = client.post("/api/links", json={"source": source, "target": target, "type": type})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
+
+
+@pytest.fixture
+def import_csv(client):
+    def upload(content: str, table="tasks", mode="replace"):
+        return client.post(
+            "/api/import/csv",
+            params={"table": table, "mode": mode},
+            files={"file": (f"{table}.csv", content.encode("utf-8"), "text/csv")},
+        )
+
+    return upload
+
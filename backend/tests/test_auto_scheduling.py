@@ -0,0 +1,59 @@
+"""Auto-scheduling of successors along FS/SS/FF/SF links."""
+
+from datetime import datetime
+
+import pytest
+
+from scheduling import (
+    FINISH_TO_FINISH, FINISH_TO_START, START_TO_FINISH, START_TO_START, propagate,
+)
+
+
+def day(number: int) -> datetime:
+    return datetime(2026, 3, number)
+
+
+@pytest.mark.parametrize("link_type, expected", [
+    (FINISH_TO_START, (day(10), day(12))),  # 先行の終了後に開始
+    (START_TO_START, (day(5), day(7))),  # 先行の開始と同時に開始
+    (FINISH_TO_FINISH, (day(8), day(10))),  # 先行の終了と同時に終了
+    (START_TO_FINISH, (day(3), day(5))),  # 先行の開始と同時に終了
+])
+def test_each_link_type_sets_the_earliest_start(link_type, expected):
+    spans = {1: (day(5), day(10)), 2: (day(1), day(3))}
+    assert propagate(1, spans, [(1, 2, link_type)]) == {2: expected}
+
+
+def test_successors_are_never_pulled_earlier():
+    spans = {1: (day(1), day(2)), 2: (day(20), day(22))}
+    assert propagate(1, spans, [(1, 2, FINISH_TO_START)]) == {}
+
+
+def test_date_change_shifts_the_downstream_chain(client, create_task, create_link):
+    first = create_task("first", "2026-03-02 00:00:00", "2026-03-04 00:00:00")
+    second = create_task("second", "2026-03-04 00:00:00", "2026-03-06 00:00:00")
+    third = create_task("third", "2026-03-06 00:00:00", "2026-03-09 00:00:00")
+    unrelated = create_task("unrelated", "2026-03-01 00:00:00", "2026-03-02 00:00:00")
+    create_link(first["id"], second["id"])
+    create_link(second["id"], third["id"])
+
+    response = client.put(f"/api/tasks/{first['id']}", json={"end_date": "2026-03-05 00:00:00"})
+    assert response.status_code == 200
+    assert response.json()["rescheduled"] == [
+        {"id": second["id"], "start_date": "2026-03-05 00:00:00", "end_date": "2026-03-07 00:00:00"},
+        {"id": third["id"], "start_date": "2026-03-07 00:00:00", "end_date": "2026-03-10 00:00:00"},
+    ]
+    assert client.get(f"/api/tasks/{third['id']}").json()["start_date"] == "2026-03-07 00:00:00"
+    assert client.get(f"/api/tasks/{unrelated['id']}").json()["start_date"] == unrelated["start_date"]
+
+
+def test_auto_schedule_can_be_turned_off(client, create_task, create_link):
+    first = create_task("first", "2026-03-02 00:00:00", "2026-03-04 00:00:00")
+    second = create_task("second", "2026-03-04 00:00:00", "2026-03-06 00:00:00")
+    create_link(first["id"], second["id"])
+
+    response = client.put(
+        f"/api/tasks/{first['id']}", params={"auto_schedule": False}, json={"end_date": "2026-03-05 00:00:00"}
+    )
+    assert response.json()["rescheduled"] == []
+    assert client.get(f"/api/tasks/{second['id']}").json()["start_date"] == second["start_date"]
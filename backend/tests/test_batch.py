@@ -0,0 +1,76 @@
+"""POST /api/batch: ordered operations in one transaction with temp_id references."""
+
+TASK = {"start_date": "2026-03-02 00:00:00", "end_date": "2026-03-06 00:00:00"}
+
+
+def batch(client, *operations):
+    return client.post("/api/batch", json={"operations": list(operations)})
+
+
+def test_temp_ids_resolve_across_operations(client):
+    response = batch(
+        client,
+        {"op": "create", "temp_id": "project", "data": {"text": "project", "kind_task": 2, **TASK}},
+        {"op": "create", "temp_id": "first", "data": {"text": "first", "parent": "project", **TASK}},
+        {"op": "create", "temp_id": "second", "data": {"text": "second", "parent": "project", **TASK}},
+        {"op": "link_create", "temp_id": "link", "data": {"source": "first", "target": "second"}},
+        {"op": "update", "id": "second", "data": {"progress": 1.0}},
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    ids = body["id_map"]
+    assert set(ids) == {"project", "first", "second", "link"}
+
+    tasks = {task["id"]: task for task in body["tasks"]}
+    assert tasks[ids["first"]]["parent"] == ids["project"]
+    assert tasks[ids["second"]]["progress"] == 1.0
+    assert tasks[ids["project"]]["child_count"] == 2
+    assert body["links"] == [
+        {"id": ids["link"], "source": ids["first"], "target": ids["second"], "type": 0}
+    ]
+
+
+def test_a_failing_operation_rolls_back_the_whole_batch(client, create_task):
+    task = create_task("untouched")
+    response = batch(
+        client,
+        {"op": "create", "temp_id": "new", "data": {"text": "new", **TASK}},
+        {"op": "update", "id": task["id"], "data": {"text": "changed"}},
+        {"op": "delete", "id": 999},
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"].startswith("operations[2]:")
+
+    tasks = client.get("/api/tasks").json()["tasks"]
+    assert [item["text"] for item in tasks] == ["untouched"]
+
+
+def test_unknown_and_duplicate_temp_ids(client):
+    response = batch(client, {"op": "update", "id": "missing", "data": {"text": "x"}})
+    assert response.status_code == 400
+    assert "Unknown temp_id: missing" in response.json()["detail"]
+
+    create = {"op": "create", "temp_id": "dup", "data": {"text": "x", **TASK}}
+    response = batch(client, create, create)
+    assert response.status_code == 400
+    assert "Duplicate temp_id" in response.json()["detail"]
+    assert client.get("/api/tasks").json()["tasks"] == []
+
+
+def test_invalid_data_reports_the_operation(client):
+    response = batch(client, {"op": "create", "data": {"text": "no dates"}})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:4] == ["body", "operations", 0, "data"]
+
+
+def test_link_cycles_are_rejected_including_links_of_the_same_batch(client, create_task, create_link):
+    a, b, c = (create_task(name)["id"] for name in "abc")
+    create_link(a, b)
+    response = batch(
+        client,
+        {"op": "link_create", "data": {"source": b, "target": c}},
+        {"op": "link_create", "data": {"source": c, "target": a}},
+    )
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+    assert len(client.get("/api/links").json()) == 1
@@ -0,0 +1,76 @@
+"""The Server-Sent Events change feed (change_feed.py)."""
+
+import json
+
+import change_feed
+from change_feed import build_event, change_events, delta_too_large
+from database import read_session
+
+
+def parse(message: bytes):
+    lines = message.decode().splitlines()
+    fields = dict(line.split(": ", 1) for line in lines if ": " in line and not line.startswith(":"))
+    return fields["event"], int(fields["id"]), json.loads(fields["data"])
+
+
+def revision(client):
+    return client.get("/api/tasks/changes", params={"since": 0}).json()["revision"]
+
+
+def test_small_delta_is_sent_as_changes(client, create_task, create_link):
+    since = revision(client)
+    a = create_task("a")
+    b = create_task("b")
+    link = create_link(a["id"], b["id"])
+    client.put(f"/api/tasks/{a['id']}", json={"text": "renamed"})
+
+    message, latest = client.portal.call(build_event, since)
+    name, event_id, data = parse(message)
+    assert (name, event_id, latest) == ("changes", revision(client), revision(client))
+    assert {task["id"]: task["text"] for task in data["tasks"]} == {a["id"]: "renamed", b["id"]: "b"}
+    assert [item["id"] for item in data["links"]] == [link["id"]]
+
+    # 同じリビジョンの購読者は同じ本文を共有する
+    assert client.portal.call(build_event, since)[0] is message
+
+
+def test_large_delta_and_reset_become_resync(client, create_task, monkeypatch):
+    since = revision(client)
+    for i in range(3):
+        create_task(str(i))
+
+    async def too_large(limit):
+        async with read_session() as db:
+            return await delta_too_large(db, since, limit)
+
+    assert client.portal.call(too_large, 3) is False
+    assert client.portal.call(too_large, 2) is True
+
+    monkeypatch.setattr(change_feed, "CHANGE_FEED_MAX_ROWS", 3)
+    assert parse(client.portal.call(build_event, since)[0])[0] == "changes"
+    create_task("one more")
+    assert parse(client.portal.call(build_event, since)[0])[0] == "resync"
+
+    # client フィクスチャは全件置き換えとして扱われる（reset_revision が進む）
+    name, event_id, data = parse(client.portal.call(build_event, since - 1)[0])
+    assert name == "resync" and data == {"revision": event_id}
+
+
+def test_stream_sends_ready_then_the_pending_changes(client, create_task):
+    since = revision(client)
+    task = create_task("new")
+
+    async def first_events():
+        stream = change_events(since)
+        try:
+            return [await stream.__anext__(), await stream.__anext__()]
+        finally:
+            await stream.aclose()
+
+    ready, changes = client.portal.call(first_events)
+    assert b"retry: 3000" in ready and parse(ready)[0:2] == ("ready", since)
+    name, _, data = parse(changes)
+    assert name == "changes" and [item["id"] for item in data["tasks"]] == [task["id"]]
+
+    stats = client.get("/api/events/stats").json()
+    assert stats["subscribers"] == 0 and stats["revision"] == revision(client)
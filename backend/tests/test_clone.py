@@ -0,0 +1,48 @@
+"""POST /api/tasks/{id}/clone, single and deep."""
+
+
+def test_deep_clone_copies_subtree_and_internal_links(client, create_task, create_link):
+    root = create_task("root", kind_task=2)
+    design = create_task("design", parent=root["id"], progress=0.5)
+    build = create_task("build", "2026-03-09 00:00:00", "2026-03-13 00:00:00", parent=root["id"], progress=1.0)
+    after = create_task("after")
+    create_link(design["id"], build["id"], type=1)
+    create_link(build["id"], after["id"])  # サブツリー外へのリンクは複製しない
+
+    response = client.post(f"/api/tasks/{root['id']}/clone", params={"deep": "true", "offset_days": 7})
+    assert response.status_code == 200
+    body = response.json()
+    id_map = {int(old): new for old, new in body["id_map"].items()}
+    assert set(id_map) == {root["id"], design["id"], build["id"]}
+    assert body["root_id"] == id_map[root["id"]]
+
+    tasks = {task["id"]: task for task in body["tasks"]}
+    assert [task["id"] for task in body["tasks"]][0] == body["root_id"]
+    copy = tasks[id_map[root["id"]]]
+    assert copy["text"] == "root (コピー)" and copy["parent"] == 0
+    assert tasks[id_map[design["id"]]]["parent"] == copy["id"]
+    assert tasks[id_map[build["id"]]]["start_date"] == "2026-03-16 00:00:00"
+    assert all(task["progress"] == 0 for task in tasks.values())
+    assert [(link["source"], link["target"], link["type"]) for link in body["links"]] == [
+        (id_map[design["id"]], id_map[build["id"]], 1)
+    ]
+
+    # 元のタスクの直後に置かれ、リンクは依存グラフにも入る
+    order = [task["id"] for task in client.get("/api/tasks").json()["tasks"] if task["parent"] == 0]
+    assert order == [root["id"], copy["id"], after["id"]]
+    cycle = client.post("/api/links", json={"source": id_map[build["id"]], "target": id_map[design["id"]]})
+    assert cycle.status_code == 400
+
+
+def test_single_clone_shifts_dates_and_resets_progress(client, create_task):
+    task = create_task("memo", progress=0.3)
+    response = client.post(f"/api/tasks/{task['id']}/clone", params={"offset_days": -1})
+    assert response.status_code == 200
+    clone = response.json()
+    assert clone["text"] == "memo (コピー)" and clone["progress"] == 0
+    assert clone["start_date"] == "2026-03-01 00:00:00"
+
+
+def test_clone_of_missing_task_is_404(client):
+    assert client.post("/api/tasks/999/clone", params={"deep": "true"}).status_code == 404
+    assert client.post("/api/tasks/999/clone").status_code == 404
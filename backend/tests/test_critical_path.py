@@ -0,0 +1,39 @@
+"""Critical path and total float of a project subtree."""
+
+from scheduling import FINISH_TO_START, analyze_critical_path
+
+DAY = 86400
+
+
+def test_tasks_on_a_cycle_are_left_out():
+    spans = {1: (0, DAY), 2: (DAY, 2 * DAY), 3: (0, DAY)}
+    edges = [(1, 2, FINISH_TO_START), (2, 1, FINISH_TO_START)]
+    assert set(analyze_critical_path(spans, edges)) == {3}
+
+
+def test_critical_path_and_float(client, create_task, create_link):
+    project = create_task("project", kind_task=2)
+    # 日付の表記が揃っていなくても（作成時に正規化されるので）計算に含まれる
+    design = create_task("design", "2026/3/2", "2026/3/4", parent=project["id"])
+    build = create_task("build", "2026-03-04 00:00:00", "2026-03-09 00:00:00", parent=project["id"])
+    docs = create_task("docs", "2026-03-04 00:00:00", "2026-03-06 00:00:00", parent=project["id"])
+    release = create_task("release", "2026-03-09 00:00:00", "2026-03-10 00:00:00", parent=project["id"])
+    for source, target in [(design, build), (design, docs), (build, release), (docs, release)]:
+        create_link(source["id"], target["id"])
+
+    response = client.get(f"/api/tasks/{project['id']}/critical-path")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["critical_path"] == [design["id"], build["id"], release["id"]]
+    assert (body["project_start"], body["project_finish"]) == ("2026-03-02 00:00:00", "2026-03-10 00:00:00")
+    slack = {task["id"]: task for task in body["tasks"]}
+    assert slack[docs["id"]]["total_float"] == 3
+    assert slack[docs["id"]]["late_start"] == "2026-03-07 00:00:00"
+    # プロジェクト行そのものは計算に含めない
+    assert project["id"] not in slack
+
+
+def test_only_projects_have_a_critical_path(client, create_task):
+    task = create_task("plain task")
+    assert client.get(f"/api/tasks/{task['id']}/critical-path").status_code == 400
+    assert client.get("/api/tasks/999/critical-path").status_code == 404
@@ -0,0 +1,92 @@
+"""POST /api/diff/csv and /api/diff/csv/apply."""
+
+import json
+
+HEADER = "id,text,start_date,end_date,duration,progress,parent,kind_task\n"
+
+
+def diff(client, content, **params):
+    response = client.post(
+        "/api/diff/csv", params=params, files={"file": ("tasks.csv", content.encode("utf-8"), "text/csv")}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def apply(client, content, selection, **params):
+    return client.post(
+        "/api/diff/csv/apply",
+        params=params,
+        data={"selection": json.dumps(selection)},
+        files={"file": ("tasks.csv", content.encode("utf-8"), "text/csv")},
+    )
+
+
+def snapshot(client, create_task):
+    kept = create_task("kept")
+    renamed = create_task("old name")
+    added = create_task("added later")
+    csv_text = HEADER + (
+        f"{kept['id']},kept,2026-03-02,2026-03-06,4,0,0,1\n"
+        f"{renamed['id']},new name,2026-03-02 00:00:00,2026-03-06 00:00:00,4,0,0,1\n"
+        "900,gone,2026-04-01,2026-04-03,2,0.5,0,1\n"
+    )
+    return kept, renamed, added, csv_text
+
+
+def test_diff_lists_changes_in_both_directions(client, create_task):
+    kept, renamed, added, csv_text = snapshot(client, create_task)
+    result = diff(client, csv_text)
+    assert result["summary"] == {"addedCount": 1, "deletedCount": 1, "modifiedCount": 1, "unchangedCount": 1}
+    assert result["added"][0]["task"]["id"] == added["id"]
+    assert result["deleted"][0]["task"]["text"] == "gone"
+    assert result["modified"][0]["changes"] == [{"field": "タスク名", "oldValue": "new name", "newValue": "old name"}]
+
+    # 2回目は行ハッシュのキャッシュで判定しても同じ結果になり、変更後の行は読み直す
+    assert diff(client, csv_text)["summary"] == result["summary"]
+    client.put(f"/api/tasks/{kept['id']}", json={"progress": 0.5})
+    assert diff(client, csv_text)["summary"]["modifiedCount"] == 2
+    assert len(diff(client, csv_text, include_unchanged="true")["unchanged"]) == 0
+    assert diff(client, csv_text, exclude_dates="true")["summary"]["modifiedCount"] == 2
+
+
+def test_apply_merges_selected_entries(client, create_task):
+    kept, renamed, added, csv_text = snapshot(client, create_task)
+    revision = diff(client, csv_text)["revision"]
+    response = apply(
+        client, csv_text, {"modified": [renamed["id"]], "deleted": [900], "added": [added["id"]]},
+        base_revision=revision,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["updated"], body["restored"], body["removed"]) == ([renamed["id"]], [900], [added["id"]])
+
+    tasks = {task["id"]: task for task in client.get("/api/tasks").json()["tasks"]}
+    assert set(tasks) == {kept["id"], renamed["id"], 900}
+    assert tasks[renamed["id"]]["text"] == "new name"
+    assert tasks[900]["progress"] == 0.5
+    assert diff(client, csv_text)["summary"]["unchangedCount"] == 3
+
+
+def test_apply_rejects_a_stale_base_revision(client, create_task):
+    _, renamed, _, csv_text = snapshot(client, create_task)
+    revision = diff(client, csv_text)["revision"]
+    create_task("concurrent edit")
+    response = apply(client, csv_text, {"modified": [renamed["id"]]}, base_revision=revision)
+    assert response.status_code == 409
+    assert client.get(f"/api/tasks/{renamed['id']}").json()["text"] == "old name"
+
+
+def test_apply_uses_the_first_row_of_a_duplicated_id(client, create_task):
+    task = create_task("name")
+    csv_text = HEADER + (
+        f"{task['id']},first,2026-03-02,2026-03-06,4,0,0,1\n"
+        f"{task['id']},second,2026-03-02,2026-03-06,4,0,0,1\n"
+    )
+    response = apply(client, csv_text, {"modified": [task["id"]]})
+    assert response.json()["updated"] == [task["id"]]
+    assert client.get(f"/api/tasks/{task['id']}").json()["text"] == "first"
+
+
+def test_invalid_selection_is_422(client):
+    assert apply(client, HEADER, {"modified": ["x"]}).status_code == 422
@@ -0,0 +1,51 @@
+"""CSV import: batched, atomic (all or nothing) and merge by id."""
+
+TASK_HEADER = "id,text,start_date,end_date,parent,sortorder\n"
+
+
+def test_replace_imports_more_rows_than_one_batch(client, import_csv):
+    rows = "".join(f"{i},task {i},2026-03-02,2026-03-06,0,{i}\n" for i in range(1, 2501))
+    response = import_csv(TASK_HEADER + rows)
+    assert response.status_code == 200
+    assert response.json()["imported_count"] == 2500
+
+    tasks = client.get("/api/tasks").json()["tasks"]
+    assert len(tasks) == 2500
+    assert tasks[0]["start_date"] == "2026-03-02 00:00:00"
+    assert tasks[0]["duration"] == 4  # 空欄の duration は日付から計算する
+
+
+def test_failed_replace_keeps_existing_data(client, create_task, import_csv):
+    existing = create_task("keep me")
+    # 2つ目のバッチで主キーが重複するので、1つ目のバッチも含めて取り消される
+    rows = "".join(f"{i},new {i},2026-03-02,2026-03-06,0,0\n" for i in range(1, 1500))
+    response = import_csv(TASK_HEADER + rows + "1,duplicate,2026-03-02,2026-03-06,0,0\n")
+    assert response.status_code == 400
+    assert "取り消しました" in response.json()["detail"]
+
+    tasks = client.get("/api/tasks").json()["tasks"]
+    assert [task["text"] for task in tasks] == [existing["text"]]
+
+
+def test_invalid_rows_are_skipped_and_reported(client, import_csv):
+    response = import_csv(TASK_HEADER + "1,ok,2026-03-02,2026-03-06,0,0\nx,bad,2026-03-02,2026-03-06,0,0\n")
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["imported_count"], body["skipped_count"]) == (1, 1)
+    assert body["errors"][0].startswith("行 3")
+
+
+def test_merge_updates_only_the_columns_in_the_file(client, create_task, import_csv):
+    task = create_task("before", memo="kept", progress=0.5)
+    response = import_csv(f"id,text\n{task['id']},after\n", mode="merge")
+    assert response.status_code == 200
+
+    merged = client.get(f"/api/tasks/{task['id']}").json()
+    assert (merged["text"], merged["memo"], merged["progress"]) == ("after", "kept", 0.5)
+    assert merged["created_at"] == task["created_at"]
+
+
+def test_missing_required_column_is_rejected(client, import_csv):
+    response = import_csv("text,start_date\nno id,2026-03-02\n")
+    assert response.status_code == 400
+    assert "id" in response.json()["detail"]
@@ -0,0 +1,37 @@
+"""from/to date-window filtering of tasks and links."""
+
+
+def window(client, path="/api/tasks", **params):
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_window_returns_overlapping_tasks_their_ancestors_and_links(client, create_task, create_link):
+    project = create_task("project", "2026-01-01 00:00:00", "2026-12-31 00:00:00", kind_task=2)
+    march = create_task("march", "2026-03-02 00:00:00", "2026-03-06 00:00:00", parent=project["id"])
+    april = create_task("april", "2026-04-06 00:00:00", "2026-04-10 00:00:00", parent=project["id"])
+    may = create_task("may", "2026-05-04 00:00:00", "2026-05-08 00:00:00", parent=project["id"])
+    inside = create_link(march["id"], april["id"])
+    create_link(april["id"], may["id"])
+
+    result = window(client, **{"from": "2026-03-06", "to": "2026-04-06"})
+    assert {task["id"] for task in result["tasks"]} == {project["id"], march["id"], april["id"]}
+    assert [link["id"] for link in result["links"]] == [inside["id"]]
+    assert window(client, "/api/links", **{"from": "2026-03-06", "to": "2026-04-06"}) == result["links"]
+
+
+def test_ancestors_outside_the_window_are_included(client, create_task):
+    parent = create_task("parent", "2025-01-01 00:00:00", "2025-01-02 00:00:00", kind_task=2)
+    child = create_task("child", "2026-03-02 00:00:00", "2026-03-06 00:00:00", parent=parent["id"])
+    # 親は期間外でもツリーを描画するために返る
+    result = window(client, **{"from": "2026-03-03", "fields": "text,parent"})
+    assert [task["id"] for task in result["tasks"]] == [parent["id"], child["id"]]
+
+
+def test_open_ended_and_invalid_windows(client, create_task):
+    early = create_task("early", "2026-01-05 00:00:00", "2026-01-09 00:00:00")
+    late = create_task("late", "2026-06-01 00:00:00", "2026-06-05 00:00:00")
+    assert [task["id"] for task in window(client, to="2026-01-05")["tasks"]] == [early["id"]]
+    assert [task["id"] for task in window(client, **{"from": "2026-06-05"})["tasks"]] == [late["id"]]
+    assert client.get("/api/tasks", params={"from": "2026-02-01", "to": "2026-01-01"}).status_code == 400
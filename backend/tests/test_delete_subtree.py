@@ -0,0 +1,60 @@
+"""DELETE /api/tasks/{id}: set-based removal of a whole subtree."""
+
+from sqlalchemy import select
+
+from models import Task as TaskModel, Link as LinkModel, TaskEdit, Tombstone
+
+
+def test_deleting_a_deep_subtree(client, create_task, create_link):
+    from database import engine
+
+    root = create_task("root", kind_task=2)
+    outside = create_task("outside")
+    # 深さ6の枝と、途中から分かれる兄弟
+    chain = [root["id"]]
+    for depth in range(6):
+        chain.append(create_task(f"level {depth + 1}", kind_task=2, parent=chain[-1])["id"])
+    branch = create_task("branch", parent=chain[2])["id"]
+    descendants = chain[1:] + [branch]
+    subtree = [root["id"], *descendants]
+
+    inside = create_link(chain[1], branch)
+    entering = create_link(outside["id"], chain[-1])
+    leaving = create_link(branch, outside["id"], type=1)
+    kept = create_task("kept")
+    unrelated = create_link(outside["id"], kept["id"])
+    client.put(f"/api/tasks/{branch}", json={"text": "edited"})
+    since = client.get("/api/tasks").json()["revision"]
+
+    response = client.delete(f"/api/tasks/{root['id']}")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["deleted_id"] == root["id"]
+    assert sorted(body["deleted_children"]) == sorted(descendants)
+
+    assert {task["id"] for task in client.get("/api/tasks").json()["tasks"]} == {outside["id"], kept["id"]}
+    assert [link["id"] for link in client.get("/api/links").json()] == [unrelated["id"]]
+    assert client.get(f"/api/tasks/{root['id']}").status_code == 404
+
+    # 差分同期のクライアントには墓標で削除が届く
+    delta = client.get("/api/tasks/changes", params={"since": since}).json()
+    assert sorted(delta["deleted_tasks"]) == sorted(subtree)
+    assert sorted(delta["deleted_links"]) == sorted(link["id"] for link in (inside, entering, leaving))
+    with engine.connect() as conn:
+        tombstones = conn.execute(
+            select(Tombstone.entity_id).where(Tombstone.entity == "task", Tombstone.revision > since)
+        ).scalars().all()
+        assert sorted(tombstones) == sorted(subtree)
+        assert not conn.execute(select(TaskEdit.task_id).where(TaskEdit.task_id.in_(subtree))).all()
+        assert not conn.execute(select(TaskModel.id).where(TaskModel.parent.in_(subtree))).all()
+        assert conn.execute(select(LinkModel.id)).scalars().all() == [unrelated["id"]]
+
+
+def test_deleting_a_child_updates_its_parent(client, create_task):
+    parent = create_task("parent", kind_task=2)
+    child = create_task("child", kind_task=2, parent=parent["id"])
+    grandchild = create_task("grandchild", parent=child["id"])
+
+    assert client.delete(f"/api/tasks/{child['id']}").json()["deleted_children"] == [grandchild["id"]]
+    assert client.get(f"/api/tasks/{parent['id']}/rollup").json()["descendant_count"] == 0
+    assert client.delete(f"/api/tasks/{child['id']}").status_code == 404
@@ -0,0 +1,62 @@
+"""Delta sync: GET /api/tasks/changes?since=<revision>."""
+
+
+def changes(client, since):
+    response = client.get("/api/tasks/changes", params={"since": since})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_changes_since_a_revision(client, create_task, create_link):
+    kept = create_task("unchanged")
+    edited = create_task("edited")
+    doomed = create_task("deleted")
+    link = create_link(kept["id"], doomed["id"])
+    since = client.get("/api/tasks").json()["revision"]
+
+    client.put(f"/api/tasks/{edited['id']}", json={"text": "edited again"})
+    # 削除の後に作ると同じIDが再利用されるので先に作る
+    added = create_task("added")
+    client.delete(f"/api/tasks/{doomed['id']}")
+
+    delta = changes(client, since)
+    assert not delta["full_sync"]
+    assert {task["id"] for task in delta["tasks"]} == {edited["id"], added["id"]}
+    assert delta["deleted_tasks"] == [doomed["id"]]
+    # タスクと一緒に消えたリンクも削除として届く
+    assert delta["deleted_links"] == [link["id"]]
+    assert delta["revision"] > since
+
+
+def test_revision_increases_with_every_write(client, create_task):
+    first = changes(client, 0)["revision"]
+    task = create_task()
+    second = changes(client, 0)["revision"]
+    client.put(f"/api/tasks/{task['id']}", json={"progress": 0.3})
+    third = changes(client, 0)["revision"]
+    assert first < second < third
+    assert changes(client, third) == {
+        "revision": third, "full_sync": False, "tasks": [], "links": [],
+        "deleted_tasks": [], "deleted_links": [],
+    }
+
+
+def test_replace_import_forces_a_full_sync(client, create_task, import_csv):
+    create_task("old")
+    since = changes(client, 0)["revision"]
+    assert import_csv("id,text,start_date,end_date\n7,new,2026-03-02,2026-03-06\n").status_code == 200
+
+    delta = changes(client, since)
+    assert delta["full_sync"]
+    assert [task["id"] for task in delta["tasks"]] == [7]
+
+
+def test_recreated_id_is_not_reported_deleted(client, create_task, import_csv):
+    task = create_task("original")
+    since = changes(client, 0)["revision"]
+    client.delete(f"/api/tasks/{task['id']}")
+    import_csv(f"id,text,start_date,end_date\n{task['id']},again,2026-03-02,2026-03-06\n", mode="merge")
+
+    delta = changes(client, since)
+    assert delta["deleted_tasks"] == []
+    assert [item["text"] for item in delta["tasks"]] == ["again"]
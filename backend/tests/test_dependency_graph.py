@@ -0,0 +1,121 @@
+"""Dependency index: cycle and missing-task checks on every link write path."""
+
+import pytest
+from sqlalchemy import insert
+
+from dependency_graph import dependency_graph, find_cycle
+
+
+@pytest.fixture
+def chain(create_task, create_link):
+    """Tasks a -> b -> c linked in a chain."""
+    a, b, c = (create_task(name)["id"] for name in "abc")
+    create_link(a, b)
+    create_link(b, c)
+    return a, b, c
+
+
+def link_pairs(client):
+    return sorted((link["source"], link["target"]) for link in client.get("/api/links").json())
+
+
+def test_find_cycle():
+    assert find_cycle([(1, 2), (2, 3), (0, 1)]) is None
+    assert find_cycle([(0, 1), (1, 2), (2, 3), (3, 1)]) == [1, 2, 3, 1]
+    assert find_cycle([(4, 4)]) == [4, 4]
+
+
+@pytest.mark.parametrize("source, target", [("c", "a"), ("b", "a"), ("a", "a")])
+def test_post_link_rejects_cycles(client, chain, source, target):
+    ids = dict(zip("abc", chain))
+    response = client.post("/api/links", json={"source": ids[source], "target": ids[target]})
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+
+
+def test_post_link_rejects_missing_tasks(client, chain):
+    response = client.post("/api/links", json={"source": chain[0], "target": 999})
+    assert response.status_code == 400
+
+
+def test_batch_rejects_cycles(client, chain):
+    a, _, c = chain
+    response = client.post("/api/batch", json={"operations": [
+        {"op": "link_create", "data": {"source": c, "target": a}},
+    ]})
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("mode", ["merge", "replace"])
+def test_csv_import_rejects_cycles_and_rolls_back(client, import_csv, chain, mode):
+    a, b, c = chain
+    before = link_pairs(client)
+    # merge は既存の a->b->c と合わせて循環、replace はCSVだけで循環
+    rows = f"{c},{a}\n" if mode == "merge" else f"{a},{b}\n{b},{c}\n{c},{a}\n"
+    response = import_csv("source,target\n" + rows, table="links", mode=mode)
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+    assert link_pairs(client) == before
+
+
+@pytest.mark.parametrize("mode", ["merge", "replace"])
+def test_csv_import_rejects_links_to_missing_tasks(client, import_csv, chain, mode):
+    before = link_pairs(client)
+    response = import_csv(f"source,target\n{chain[0]},999\n", table="links", mode=mode)
+    assert response.status_code == 400
+    assert "not found" in response.json()["detail"]
+    assert link_pairs(client) == before
+
+
+def test_acyclic_csv_import_is_accepted_and_indexed(client, import_csv, chain):
+    a, b, c = chain
+    response = import_csv(f"source,target\n{a},{c}\n", table="links", mode="merge")
+    assert response.status_code == 200
+    # インポート後は索引が読み直され、新しいリンクも循環チェックに使われる
+    assert client.post("/api/links", json={"source": c, "target": a}).status_code == 400
+    successors = client.get(f"/api/tasks/{a}/dependencies").json()["successors"]
+    assert sorted(link["target"] for link in successors) == [b, c]
+
+
+def test_deleted_links_and_tasks_leave_the_index(client, create_task, chain):
+    a, b, c = chain
+    link_id = client.get(f"/api/tasks/{b}/dependencies").json()["successors"][0]["id"]
+    client.delete(f"/api/links/{link_id}")
+    assert client.post("/api/links", json={"source": c, "target": a}).status_code == 200
+
+    client.delete(f"/api/tasks/{c}")
+    assert client.get(f"/api/tasks/{a}/dependencies").json()["predecessors"] == []
+
+
+def test_rolled_back_links_do_not_reach_the_index(client, chain):
+    a, b, c = chain
+    response = client.post("/api/batch", json={"operations": [
+        {"op": "link_create", "data": {"source": a, "target": c}},
+        {"op": "delete", "id": 999},
+    ]})
+    assert response.status_code == 404
+    successors = client.get(f"/api/tasks/{a}/dependencies").json()["successors"]
+    assert [link["target"] for link in successors] == [b]
+
+
+def test_index_reloads_after_writes_it_did_not_see(client, chain, create_task):
+    from database import engine
+    from models import Link as LinkModel, SyncState
+    from sqlalchemy import update
+
+    a, _, c = chain
+    d = create_task("d")["id"]
+    client.get(f"/api/tasks/{d}/dependencies")
+    # 他のプロセスの書き込みを模して、索引を通さずにリンクとリビジョンを更新する
+    with engine.begin() as conn:
+        conn.execute(insert(LinkModel).values(source=c, target=d))
+        conn.execute(update(SyncState).values(revision=SyncState.revision + 1))
+    assert client.get(f"/api/tasks/{d}/dependencies").json()["predecessors"][0]["source"] == c
+    assert dependency_graph.revision == client.get("/api/tasks/changes", params={"since": 0}).json()["revision"]
+
+
+def test_dependencies_of_a_missing_task_is_404(client, chain):
+    response = client.get("/api/tasks/999/dependencies")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Task not found"
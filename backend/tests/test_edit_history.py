@@ -0,0 +1,83 @@
+"""task_edits history, the activity endpoints, and migrating a baseline database."""
+
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+
+from edit_history import parse_edit_dates, unparsed_edit_dates
+from migrations import MIGRATIONS, _v1_initial_schema, get_schema_version, run_migrations
+
+
+def test_parse_legacy_edit_dates():
+    assert parse_edit_dates("2026-1-5,2026-01-05 10:00:00, 2025-12-31,garbage") == ["2025-12-31", "2026-01-05"]
+    assert unparsed_edit_dates("2026-1-5,garbage, ,13/45/2026") == ["garbage", "13/45/2026"]
+    assert parse_edit_dates(None) == [] and unparsed_edit_dates("") == []
+
+
+def test_edits_are_recorded_once_per_day(client, create_task):
+    today = date.today().isoformat()
+    task = create_task("task")
+    client.put(f"/api/tasks/{task['id']}", json={"text": "first"})
+    client.put(f"/api/tasks/{task['id']}", json={"text": "second", "edit_date": "2026-1-5"})
+    assert client.get(f"/api/tasks/{task['id']}").json()["edit_date"] == f"2026-01-05,{today}"
+
+    other = create_task("other")
+    client.put(f"/api/tasks/{other['id']}", json={"progress": 0.5})
+    days = client.get("/api/activity/daily", params={"from": "2026-01-01"}).json()["days"]
+    assert days == [{"date": "2026-01-05", "count": 1}, {"date": today, "count": 2}]
+
+
+def test_edited_tasks_window(client, create_task, import_csv):
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    import_csv(
+        "id,text,start_date,end_date,edit_date\n"
+        f"1,old,2026-03-02,2026-03-06,\"2026-01-05,{yesterday}\"\n"
+        "2,older,2026-03-02,2026-03-06,2026-01-04\n"
+    )
+    response = client.get("/api/activity/tasks", params={"from": "2026-01-01", "fields": "id,text"})
+    assert response.json()["tasks"] == [
+        {"id": 1, "text": "old", "last_edited": yesterday, "edit_days": 2},
+        {"id": 2, "text": "older", "last_edited": "2026-01-04", "edit_days": 1},
+    ]
+    windowed = client.get("/api/activity/tasks", params={"to": "2026-01-04"}).json()["tasks"]
+    assert [task["id"] for task in windowed] == [2]
+    assert client.get("/api/activity/daily", params={"from": "2026-02-01", "to": "2026-01-01"}).status_code == 400
+
+
+def test_migrating_a_baseline_database(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    # 最初のバージョンのアプリが作ったDB（user_version は 0 のまま）
+    with engine.begin() as conn:
+        _v1_initial_schema(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO tasks (id, text, start_date, end_date, progress, parent, kind_task, sortorder, edit_date) VALUES"
+            " (1, 'project', '2026-03-02 00:00:00', '2026-03-06 00:00:00', 0, 0, 2, 0, NULL),"
+            " (2, 'b', '2026/3/9', '2026/3/13', 1, 1, 1, 5, '2026-1-5,garbage'),"
+            " (3, 'a', '2026-03-02', '2026-03-04', 0, 1, 1, 2, '2026-01-05,2026-01-06')"
+        )
+        conn.exec_driver_sql("INSERT INTO links (id, source, target, type) VALUES (1, 3, 2, 0)")
+
+    with caplog.at_level(logging.WARNING, logger="migrations"):
+        assert run_migrations(engine) == MIGRATIONS[-1][0]
+    assert "task 2: garbage" in caplog.text
+
+    with engine.connect() as conn:
+        assert get_schema_version(conn) == MIGRATIONS[-1][0]
+        assert conn.exec_driver_sql("SELECT task_id, date FROM task_edits ORDER BY task_id, date").all() == [
+            (2, "2026-01-05"), (3, "2026-01-05"), (3, "2026-01-06"),
+        ]
+        columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_xinfo(tasks)")}
+        assert "edit_date" not in columns
+        # 兄弟の並び順はキーに、非ISOの日付も時刻列に変換されている
+        assert conn.exec_driver_sql(
+            "SELECT id FROM tasks WHERE parent = 1 ORDER BY sort_key"
+        ).scalars().all() == [3, 2]
+        assert conn.exec_driver_sql("SELECT start_ts FROM tasks WHERE id = 2").scalar() is not None
+        assert conn.exec_driver_sql(
+            "SELECT rollup_start, rollup_end, descendant_count FROM tasks WHERE id = 1"
+        ).first() == ("2026-03-02 00:00:00", "2026-03-13 00:00:00", 2)
+
+    # もう一度実行しても何もしない
+    assert run_migrations(engine) == MIGRATIONS[-1][0]
+    engine.dispose()
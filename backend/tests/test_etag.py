@@ -0,0 +1,40 @@
+"""ETag / If-None-Match on the full-chart endpoints and CSV export."""
+
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/api/tasks", "/api/links", "/api/export/csv"])
+def test_unchanged_data_answers_304(client, create_task, path):
+    create_task()
+    first = client.get(path)
+    etag = first.headers["etag"]
+
+    repeated = client.get(path, headers={"If-None-Match": etag})
+    assert repeated.status_code == 304
+    assert repeated.content == b""
+    assert repeated.headers["etag"] == etag
+    # 弱いETagとしての比較やリスト指定でも一致する
+    assert client.get(path, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+
+def test_any_write_changes_the_etag(client, create_task):
+    task = create_task()
+    etag = client.get("/api/tasks").headers["etag"]
+    client.put(f"/api/tasks/{task['id']}", json={"progress": 0.5})
+
+    response = client.get("/api/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["tasks"][0]["progress"] == 0.5
+
+
+def test_representations_have_their_own_etags(client, create_task):
+    create_task()
+    etags = {
+        client.get("/api/tasks").headers["etag"],
+        client.get("/api/tasks", params={"fields": "text"}).headers["etag"],
+        client.get("/api/tasks", params={"from": "2026-03-01"}).headers["etag"],
+        client.get("/api/export/csv", params={"gzip": True}).headers["etag"],
+        client.get("/api/export/csv").headers["etag"],
+    }
+    assert len(etags) == 5
@@ -0,0 +1,23 @@
+"""fields= projection and the row-tuple JSON path of the task listing."""
+
+
+def test_fields_selects_columns_and_always_includes_id(client, create_task):
+    task = create_task("projected", memo="heavy text")
+    tasks = client.get("/api/tasks", params={"fields": "text,start_date"}).json()["tasks"]
+    assert tasks == [{"id": task["id"], "text": "projected", "start_date": task["start_date"]}]
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/api/tasks", params={"fields": "text,nope"})
+    assert response.status_code == 400
+    assert "nope" in response.json()["detail"]
+
+
+def test_row_tuple_listing_matches_the_single_task_schema(client, create_task):
+    parent = create_task("parent", kind_task=2)
+    child = create_task("child", parent=parent["id"], progress=0.25, color="#ff0000")
+    client.put(f"/api/tasks/{child['id']}", json={"memo": "note"})
+
+    listed = {task["id"]: task for task in client.get("/api/tasks").json()["tasks"]}
+    for task_id in (parent["id"], child["id"]):
+        assert listed[task_id] == client.get(f"/api/tasks/{task_id}").json()
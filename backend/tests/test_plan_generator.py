@@ -0,0 +1,84 @@
+"""Synthetic plans (plan_generator.py) and the benchmark's statistics."""
+
+import os
+import random
+import subprocess
+import sys
+
+from benchmark import compare, percentile, summarize
+from dependency_graph import find_cycle
+from plan_generator import PlanSpec, build_links, build_tree, generate_plan, level_sizes
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_level_sizes_use_every_level():
+    for tasks, depth in [(100_000, 10), (1000, 4), (5, 10), (3, 3), (1, 1)]:
+        sizes = level_sizes(tasks, depth)
+        assert sum(sizes) == tasks
+        assert len(sizes) == min(depth, tasks) and min(sizes) >= 1
+        assert sizes == sorted(sizes)
+
+
+def test_generated_plan_is_reproducible_and_acyclic():
+    spec = PlanSpec(tasks=500, depth=5, links=800, seed=3, start="2026-01-05")
+    rows = build_tree(spec, random.Random(spec.seed))
+    assert rows == build_tree(spec, random.Random(spec.seed))
+
+    by_id = {row["id"]: row for row in rows}
+    for row in rows:
+        if row["parent"]:
+            parent = by_id[row["parent"]]
+            assert parent["id"] < row["id"] and parent["kind_task"] == 2
+            assert parent["start_date"] <= row["start_date"] and row["end_date"] <= parent["end_date"]
+
+    links = build_links(rows, spec.links, random.Random(1))
+    assert len(links) == 800
+    assert len({(link["source"], link["target"]) for link in links}) == 800
+    assert find_cycle([(link["source"], link["target"]) for link in links]) is None
+
+
+def test_generate_plan_replaces_the_database(client, create_task):
+    from database import engine
+
+    create_task("replaced")
+    with engine.begin() as conn:
+        stats = generate_plan(conn, PlanSpec(tasks=200, depth=4, links=150, seed=1, start="2026-01-05"))
+    assert (stats.tasks, stats.links, sum(stats.tasks_per_level)) == (200, 150, 200)
+
+    tasks = client.get("/api/tasks").json()["tasks"]
+    assert len(tasks) == 200 and "replaced" not in {task["text"] for task in tasks}
+    root = next(task for task in tasks if task["parent"] == 0 and task["kind_task"] == 2)
+    rollup = client.get(f"/api/tasks/{root['id']}/rollup").json()
+    assert rollup["descendant_count"] > 0 and rollup["rollup_start"] == root["start_date"]
+    # 依存グラフは全件置き換えを検知して読み直す
+    link = client.get("/api/links").json()[0]
+    assert client.post("/api/links", json={"source": link["target"], "target": link["source"]}).status_code == 400
+
+
+def test_benchmark_statistics():
+    values = [float(i) for i in range(1, 101)]
+    assert [percentile(values, p) for p in (50, 90, 99, 100)] == [50.0, 90.0, 99.0, 100.0]
+    summary = summarize([0.002, 0.001, 0.003], [10, 20])
+    assert summary["p50_ms"] == 2.0 and summary["max_ms"] == 3.0
+    assert summary["mean_response_bytes"] == 15 and summary["throughput_per_s"] == 500.0
+
+    baseline = {"plan": {}, "results": {"list": {"p50_ms": 10.0, "p95_ms": 20.0}}}
+    slower = {"plan": {}, "results": {"list": {"p50_ms": 13.0, "p95_ms": 20.0}}}
+    assert compare(slower, baseline, 0.2) == ["list"]
+    assert compare(slower, baseline, 0.5) == []
+
+
+def test_cli_does_not_overwrite_an_existing_plan(tmp_path):
+    # database はテスト用のDBで import 済みなので、CLIは別プロセスで動かす
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, "plan_generator.py", "--db", str(tmp_path / "plan.db"),
+             "--tasks", "30", "--depth", "3", "--links", "10", *args],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+
+    assert run("--seed", "1").returncode == 0
+    refused = run("--seed", "2")
+    assert refused.returncode == 2 and "--replace" in refused.stderr
+    assert run("--seed", "2", "--replace").returncode == 0
@@ -0,0 +1,175 @@
+"""Sibling sort keys: key generation, renumbering, and moves through the API."""
+
+import asyncio
+import random
+
+import pytest
+
+from ranking import MAX_SORT_KEY_LENGTH, assign_keys, key_between, renumberer, sequential_keys
+
+
+def ids(client):
+    return [task["id"] for task in client.get("/api/tasks").json()["tasks"]]
+
+
+def test_key_between_orders_keys():
+    assert key_between(None, None) == "a0"
+    assert key_between("a0", None) == "a1"
+    assert key_between(None, "a0") == "Zz"
+    middle = key_between("a0", "a1")
+    assert "a0" < middle < "a1"
+    with pytest.raises(ValueError):
+        key_between("a1", "a0")
+
+
+def test_random_inserts_keep_keys_strictly_ordered():
+    rng = random.Random(7)
+    keys = []
+    for _ in range(2000):
+        index = rng.randint(0, len(keys))
+        low = keys[index - 1] if index > 0 else None
+        high = keys[index] if index < len(keys) else None
+        key = key_between(low, high)
+        assert (low is None or low < key) and (high is None or key < high)
+        keys.insert(index, key)
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+
+
+def test_appending_grows_keys_logarithmically():
+    keys = sequential_keys(10000)
+    assert keys == sorted(keys)
+    assert max(len(key) for key in keys) <= 4
+
+
+def test_assign_keys_renumbers_only_rows_that_change():
+    rows = [(1, 0, "a0", 0), (2, 0, "a0V", 0), (3, 0, "a1", 1), (4, 7, "a0", 0)]
+    assert assign_keys(rows) == [
+        {"node": 2, "new_key": "a1", "new_sortorder": 1},
+        {"node": 3, "new_key": "a2", "new_sortorder": 2},
+    ]
+    # CSVインポートでは sortorder の順に振る
+    assert [change["node"] for change in assign_keys(rows, by_sortorder=True)] == [2, 3]
+
+
+def test_positions_of_new_tasks(client, create_task):
+    first = create_task("first")
+    last = create_task("last")
+    top = create_task("top", sortorder=-1)
+    second = create_task("second", sortorder=2)
+    after_first = create_task("after first", after=first["id"])
+    assert ids(client) == [top["id"], first["id"], after_first["id"], second["id"], last["id"]]
+
+
+def test_edit_after_reorder_does_not_move_the_task(client, create_task):
+    tasks = [create_task(str(i)) for i in range(4)]
+    stale = {task["id"]: task["sortorder"] for task in client.get("/api/tasks").json()["tasks"]}
+    # 全件を逆順に並べ替えた後、クライアントの古い sortorder を付けて編集する（saveTask と同じ）
+    items = [{"id": task["id"], "sortorder": 0} for task in tasks]
+    assert client.post("/api/tasks/reorder", json={"items": items}).status_code == 200
+    order = ids(client)
+    assert order == [task["id"] for task in reversed(tasks)]
+
+    for task in tasks:
+        response = client.put(
+            f"/api/tasks/{task['id']}",
+            json={"text": "edited", "start_date": "2026-03-03 00:00:00", "parent": 0, "sortorder": stale[task["id"]]},
+        )
+        assert response.status_code == 200
+        assert ids(client) == order
+
+
+def test_put_moves_only_with_a_new_parent_or_anchor(client, create_task):
+    a, b, c = (create_task(name) for name in "abc")
+    project = create_task("project", kind_task=2)
+    client.put(f"/api/tasks/{c['id']}", json={"before": a["id"]})
+    assert ids(client) == [c["id"], a["id"], b["id"], project["id"]]
+
+    client.put(f"/api/tasks/{a['id']}", json={"parent": project["id"]})
+    tasks = client.get("/api/tasks", params={"fields": "parent"}).json()["tasks"]
+    assert {task["id"]: task["parent"] for task in tasks}[a["id"]] == project["id"]
+    assert client.put(f"/api/tasks/{b['id']}", json={"before": c["id"], "after": c["id"]}).status_code == 400
+
+
+def test_csv_merge_puts_rows_without_sortorder_last(client, create_task, import_csv):
+    existing = [create_task(str(i))["id"] for i in range(3)]
+    response = import_csv("id,text,start_date,end_date\n10,new,2026-03-02,2026-03-06\n", mode="merge")
+    assert response.status_code == 200
+    assert ids(client) == existing + [10]
+    exported = client.get("/api/export/csv", params={"columns": "id,sortorder"}).text
+    assert exported.splitlines()[1:] == ["1,0", "2,1", "3,2", "10,3"]
+
+
+def test_long_keys_are_renumbered_in_the_background(client, create_task):
+    first = create_task("first")
+    last = create_task("last")
+    # 同じ場所への挿入を繰り返すとキーが伸びる
+    for i in range(40):
+        create_task(f"inserted {i}", before=last["id"])
+    order = ids(client)
+    client.portal.call(asyncio.sleep, 0.2)
+    keys = [task["sort_key"] for task in client.get("/api/tasks").json()["tasks"]]
+    assert ids(client) == order and order[0] == first["id"]
+    assert max(len(key) for key in keys) <= MAX_SORT_KEY_LENGTH
+    assert not renumberer.pending
+
+
+def test_moving_several_tasks_into_another_parent(client, create_task):
+    # GanttChart.tsx の onAfterTaskMove と同じ形: 動かしていない兄弟を基準にする
+    p1 = create_task("p1", kind_task=2)
+    p2 = create_task("p2", kind_task=2)
+    a = create_task("a", parent=p1["id"])
+    b = create_task("b", parent=p1["id"])
+    c = create_task("c", parent=p2["id"])
+    d = create_task("d", parent=p1["id"])
+    e = create_task("e", parent=p1["id"])
+
+    def children(parent):
+        tasks = client.get("/api/tasks", params={"fields": "parent"}).json()["tasks"]
+        return [task["id"] for task in tasks if task["parent"] == parent]
+
+    # 先頭へ: [a, b, c]
+    items = [{"id": a["id"], "before": c["id"]}, {"id": b["id"], "before": c["id"]}]
+    assert client.post("/api/tasks/reorder", json={"items": items}).status_code == 200
+    assert children(p2["id"]) == [a["id"], b["id"], c["id"]]
+
+    # 末尾へ: 後ろのタスクから送る -> [a, b, c, d, e]
+    items = [{"id": e["id"], "after": c["id"]}, {"id": d["id"], "after": c["id"]}]
+    client.post("/api/tasks/reorder", json={"items": items})
+    assert children(p2["id"]) == [a["id"], b["id"], c["id"], d["id"], e["id"]]
+
+    # 動かしていない兄弟がいない: 親と位置で送る
+    items = [{"id": c["id"], "parent": p1["id"], "sortorder": 0}, {"id": a["id"], "parent": p1["id"], "sortorder": 1}]
+    client.post("/api/tasks/reorder", json={"items": items})
+    assert children(p1["id"]) == [c["id"], a["id"]]
+
+
+def test_moves_to_an_invalid_parent_are_rejected(client, create_task):
+    root = create_task("root", kind_task=2)
+    child = create_task("child", kind_task=2, parent=root["id"])
+    grandchild = create_task("grandchild", parent=child["id"])
+    other = create_task("other")
+
+    for parent, message in [(999, "does not exist"), (root["id"], "under itself"), (grandchild["id"], "descendant")]:
+        for response in (
+            client.put(f"/api/tasks/{root['id']}", json={"parent": parent}),
+            client.post("/api/tasks/reorder", json={"items": [{"id": root["id"], "parent": parent}]}),
+            client.post("/api/batch", json={"operations": [
+                {"op": "update", "id": root["id"], "data": {"parent": parent}},
+            ]}),
+        ):
+            assert response.status_code == 400
+            assert message in response.text
+    # 子孫を基準にした移動も同じ
+    assert client.put(f"/api/tasks/{root['id']}", json={"after": grandchild["id"]}).status_code == 400
+    response = client.post(
+        "/api/tasks/reorder",
+        json={"items": [{"id": other["id"], "parent": child["id"]}, {"id": root["id"], "before": other["id"]}]},
+    )
+    assert response.status_code == 400
+
+    # 何も変わっていない
+    tasks = client.get("/api/tasks", params={"fields": "parent"}).json()["tasks"]
+    assert {task["id"]: task["parent"] for task in tasks} == {
+        root["id"]: 0, child["id"]: root["id"], grandchild["id"]: child["id"], other["id"]: 0,
+    }
+    assert [task["id"] for task in client.get("/api/tasks/roots").json()["tasks"]] == [root["id"], other["id"]]
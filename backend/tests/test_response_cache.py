@@ -0,0 +1,40 @@
+"""Serialized response cache keyed by variant and revision."""
+
+from response_cache import ResponseCache
+
+
+def test_entries_are_served_only_for_their_revision():
+    cache = ResponseCache(max_bytes=100)
+    cache.put("tasks", 3, b"body")
+    assert cache.get("tasks", 3) == b"body"
+    assert cache.get("tasks", 4) is None
+    # 古いリビジョンの本文で新しいものを上書きしない
+    cache.put("tasks", 2, b"stale")
+    assert cache.get("tasks", 3) == b"body"
+
+
+def test_least_recently_used_variants_are_evicted_over_the_cap():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 1)
+    cache.put("c", 1, b"cccc")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa"
+    assert cache.stats()["size_bytes"] == 8
+    # 上限を超える本文はキャッシュしない
+    cache.put("huge", 1, b"x" * 11)
+    assert cache.get("huge", 1) is None
+
+
+def test_full_chart_is_served_from_cache_until_a_write(client, create_task):
+    task = create_task()
+    first = client.get("/api/tasks").content
+    hits = client.get("/api/tasks/cache-stats").json()["hits"]
+
+    assert client.get("/api/tasks").content == first
+    assert client.get("/api/tasks/cache-stats").json()["hits"] == hits + 1
+
+    client.put(f"/api/tasks/{task['id']}", json={"text": "renamed"})
+    assert client.get("/api/tasks/cache-stats").json()["entries"] == 0
+    assert client.get("/api/tasks").json()["tasks"][0]["text"] == "renamed"
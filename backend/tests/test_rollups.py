@@ -0,0 +1,51 @@
+"""Incremental subtree rollups and GET /api/tasks/{id}/rollup."""
+
+
+def rollup(client, task_id):
+    response = client.get(f"/api/tasks/{task_id}/rollup")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_rollups_follow_every_write(client, create_task):
+    root = create_task("root", kind_task=2)
+    group = create_task("group", kind_task=2, parent=root["id"])
+    short = create_task("short", "2026-03-02 00:00:00", "2026-03-04 00:00:00", parent=group["id"], progress=1.0)
+    long = create_task("long", "2026-03-04 00:00:00", "2026-03-10 00:00:00", parent=group["id"])
+
+    # 期間（2日と6日）で重み付けした進捗
+    assert rollup(client, root["id"]) == {
+        "id": root["id"], "child_count": 1, "descendant_count": 3,
+        "rollup_start": "2026-03-02 00:00:00", "rollup_end": "2026-03-10 00:00:00",
+        "rollup_progress": 0.25,
+    }
+
+    client.put(f"/api/tasks/{long['id']}", json={"end_date": "2026-03-20 00:00:00", "progress": 0.5})
+    assert rollup(client, root["id"])["rollup_end"] == "2026-03-20 00:00:00"
+
+    # 移動すると移動前の親側も再計算される
+    client.put(f"/api/tasks/{short['id']}", json={"parent": root["id"]})
+    assert rollup(client, group["id"])["child_count"] == 1
+    assert rollup(client, group["id"])["rollup_start"] == "2026-03-04 00:00:00"
+    assert rollup(client, root["id"])["child_count"] == 2
+
+    client.delete(f"/api/tasks/{group['id']}")
+    assert rollup(client, root["id"])["descendant_count"] == 1
+    assert rollup(client, root["id"])["rollup_end"] == "2026-03-04 00:00:00"
+
+
+def test_leaf_rollups_are_its_own_values(client, create_task):
+    task = create_task("leaf", progress=0.4)
+    assert rollup(client, task["id"]) == {
+        "id": task["id"], "child_count": 0, "descendant_count": 0,
+        "rollup_start": task["start_date"], "rollup_end": task["end_date"], "rollup_progress": 0.4,
+    }
+    assert client.get("/api/tasks/999/rollup").status_code == 404
+
+
+def test_rollup_fields_of_the_listing_match_the_endpoint(client, create_task):
+    parent = create_task("parent", kind_task=2)
+    create_task("child", parent=parent["id"])
+    fields = "child_count,descendant_count,rollup_start,rollup_end,rollup_progress"
+    listed = client.get("/api/tasks", params={"fields": fields}).json()["tasks"]
+    assert listed[0] == rollup(client, parent["id"])
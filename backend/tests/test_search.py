@@ -0,0 +1,66 @@
+"""GET /api/tasks/search over the FTS5 trigram index."""
+
+from search import make_snippet, parse_terms
+
+
+def search(client, q, **params):
+    response = client.get("/api/tasks/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def hit_ids(client, q, **params):
+    return [hit["id"] for hit in search(client, q, **params)["results"]]
+
+
+def test_parse_terms_and_snippet():
+    assert parse_terms(" 設計　レビュー  ") == ["設計", "レビュー"]
+    assert make_snippet([None, "詳細設計のレビュー"], ["設計"], "[", "]") == "詳細[設計]のレビュー"
+    assert make_snippet(["abc"], ["x"], "[", "]") == ""
+
+
+def test_japanese_substrings_with_snippet_and_path(client, create_task):
+    project = create_task("新システム導入", kind_task=2)
+    phase = create_task("基本設計フェーズ", kind_task=2, parent=project["id"])
+    review = create_task("画面仕様のレビュー会議", parent=phase["id"], memo="議事録は共有フォルダ")
+    create_task("詳細設計書の作成")
+
+    body = search(client, "レビュー会")
+    assert [hit["id"] for hit in body["results"]] == [review["id"]]
+    hit = body["results"][0]
+    assert "【レビュー会】" in hit["snippet"]
+    assert [node["text"] for node in hit["path"]] == ["新システム導入", "基本設計フェーズ"]
+
+    # すべての語が一致する必要がある（メモも対象）
+    assert hit_ids(client, "レビュー 共有フォルダ") == [review["id"]]
+    assert hit_ids(client, "レビュー 存在しない語") == []
+
+
+def test_short_terms_fall_back_to_like(client, create_task):
+    design = create_task("設計")
+    memo = create_task("打ち合わせ", memo="設計の確認")
+    assert hit_ids(client, "設計") == [design["id"], memo["id"]]  # タスク名の一致が先
+    assert hit_ids(client, "設計 確認") == [memo["id"]]
+
+
+def test_index_follows_updates_and_deletes(client, create_task, import_csv):
+    task = create_task("見積もり作成")
+    client.put(f"/api/tasks/{task['id']}", json={"text": "発注手続き"})
+    assert hit_ids(client, "見積もり") == []
+    assert hit_ids(client, "発注手続") == [task["id"]]
+
+    client.delete(f"/api/tasks/{task['id']}")
+    assert hit_ids(client, "発注手続") == []
+
+    import_csv("id,text,start_date,end_date\n7,CSVから取り込み,2026-03-02,2026-03-06\n")
+    assert hit_ids(client, "取り込み") == [7]
+
+
+def test_paging(client, create_task):
+    for i in range(5):
+        create_task(f"テスト項目 {i}")
+    first = search(client, "テスト項目", limit=3)
+    rest = search(client, "テスト項目", limit=3, offset=3)
+    assert first["has_more"] and not rest["has_more"]
+    assert len({hit["id"] for hit in first["results"] + rest["results"]}) == 5
+    assert client.get("/api/tasks/search", params={"q": "　"}).status_code == 400
@@ -0,0 +1,51 @@
+"""Lazy tree endpoints: roots, children, expand-all and collapse-all."""
+
+import pytest
+
+
+@pytest.fixture
+def tree(create_task):
+    """root1 > (a > a1, b), root2"""
+    root1 = create_task("root1", kind_task=2)
+    a = create_task("a", kind_task=2, parent=root1["id"])
+    a1 = create_task("a1", parent=a["id"])
+    b = create_task("b", parent=root1["id"])
+    root2 = create_task("root2")
+    return {task["text"]: task["id"] for task in (root1, a, a1, b, root2)}
+
+
+def levels(response):
+    assert response.status_code == 200
+    return [(task["id"], task["level"], task["has_children"]) for task in response.json()["tasks"]]
+
+
+def test_roots_with_depth(client, tree):
+    assert levels(client.get("/api/tasks/roots")) == [
+        (tree["root1"], 1, True), (tree["root2"], 1, False),
+    ]
+    assert levels(client.get("/api/tasks/roots", params={"depth": 2})) == [
+        (tree["root1"], 1, True), (tree["a"], 2, True), (tree["b"], 2, False), (tree["root2"], 1, False),
+    ]
+
+
+def test_children_in_depth_first_order(client, tree):
+    assert levels(client.get(f"/api/tasks/{tree['root1']}/children", params={"depth": 5})) == [
+        (tree["a"], 1, True), (tree["a1"], 2, False), (tree["b"], 1, False),
+    ]
+    assert client.get("/api/tasks/999/children").status_code == 404
+
+
+def test_expand_and_collapse_all(client, tree):
+    expanded = levels(client.post("/api/tasks/expand-all"))
+    assert [task_id for task_id, _, _ in expanded] == [
+        tree["root1"], tree["a"], tree["a1"], tree["b"], tree["root2"],
+    ]
+    collapsed = levels(client.post("/api/tasks/collapse-all", params={"task_id": tree["root1"]}))
+    assert [task_id for task_id, _, _ in collapsed] == [tree["a"], tree["b"]]
+
+
+def test_fields_and_etag(client, tree):
+    response = client.get("/api/tasks/roots", params={"fields": "text"})
+    assert response.json()["tasks"][0] == {"id": tree["root1"], "text": "root1", "level": 1, "has_children": True}
+    etag = response.headers["etag"]
+    assert client.get("/api/tasks/roots", params={"fields": "text"}, headers={"If-None-Match": etag}).status_code == 304
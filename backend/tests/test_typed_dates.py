@@ -0,0 +1,73 @@
+"""Typed start/end timestamps and column-wise date parsing."""
+
+from datetime import datetime
+
+from dates import calculate_durations, normalize_dates
+
+
+def test_normalize_and_durations_column_wise():
+    values = ["2026/3/5", "2026-03-05", "2026-3-5 9:30", "garbage", None]
+    assert normalize_dates(values) == [
+        "2026-03-05 00:00:00", "2026-03-05 00:00:00", "2026-03-05 09:30:00", None, None,
+    ]
+    assert calculate_durations(["2026-03-02", "2026-03-02", "x"], ["2026-03-06 23:00", "2026-03-02", "2026-03-06"]) == [4, 1, 1]
+
+
+def test_non_iso_dates_are_stored_canonically_and_found_by_windows(client, create_task):
+    task = create_task("slashes", "2026/03/05", "2026/3/9")
+    assert (task["start_date"], task["end_date"], task["duration"]) == (
+        "2026-03-05 00:00:00", "2026-03-09 00:00:00", 4,
+    )
+    tasks = client.get("/api/tasks", params={"from": "2026-03-06", "to": "2026-03-07"}).json()["tasks"]
+    assert [item["id"] for item in tasks] == [task["id"]]
+
+
+def test_non_iso_update_stays_in_windowed_queries(client, create_task):
+    task = create_task("moved")
+    response = client.put(f"/api/tasks/{task['id']}", json={"start_date": "2026/7/1", "end_date": "2026-7-3 9:00"})
+    assert response.status_code == 200
+    assert response.json()["end_date"] == "2026-07-03 09:00:00"
+    tasks = client.get("/api/tasks", params={"from": "2026-07-02", "to": "2026-07-02"}).json()["tasks"]
+    assert [item["id"] for item in tasks] == [task["id"]]
+
+
+def test_unparsable_dates_are_rejected(client, create_task):
+    response = client.post(
+        "/api/tasks", json={"text": "bad", "start_date": "someday", "end_date": "2026-03-06"}
+    )
+    assert response.status_code == 422
+    assert "start_date" in response.json()["detail"]
+
+    task = create_task()
+    response = client.put(f"/api/tasks/{task['id']}", json={"end_date": "31/02/2026"})
+    assert response.status_code == 422
+    assert client.get(f"/api/tasks/{task['id']}").json()["end_date"] == task["end_date"]
+
+
+def test_null_dates_are_rejected(client, create_task):
+    task = create_task()
+    for body in ({"start_date": None}, {"end_date": None, "text": "renamed"}):
+        response = client.put(f"/api/tasks/{task['id']}", json=body)
+        assert response.status_code == 422
+        assert "Invalid date" in response.json()["detail"]
+    response = client.post("/api/batch", json={"operations": [
+        {"op": "update", "id": task["id"], "data": {"start_date": None}},
+    ]})
+    assert response.status_code == 422
+    assert client.get(f"/api/tasks/{task['id']}").json()["text"] == task["text"]
+
+
+def test_utc_offsets_are_converted_to_local_time(client, create_task):
+    def local(value):
+        return datetime.fromisoformat(value).astimezone().replace(tzinfo=None)
+
+    start = "2026-01-05T09:00:00+09:00"
+    assert normalize_dates([start, "2026-01-05T00:00:00Z"]) == [
+        local(start).isoformat(" "), local("2026-01-05T00:00:00+00:00").isoformat(" "),
+    ]
+
+    task = create_task("offset", start, "2026-01-07T09:00:00+09:00")
+    assert task["start_date"] == local(start).isoformat(" ") and task["duration"] == 2
+    day = local(start).date().isoformat()
+    tasks = client.get("/api/tasks", params={"from": day, "to": day}).json()["tasks"]
+    assert [item["id"] for item in tasks] == [task["id"]]
@@ -72,8 +72,18 @@ function AppContent() {
   const handleTaskUpdate = async (id: number, taskData: Partial<Task>) => {
     const result = await api.updateTask(id, taskData);
     if (result.success) {
+      // 自動スケジューリングでずれた後続タスクの日付も反映する
+      const rescheduled = new Map(
+        (result.data?.rescheduled ?? []).map((s) => [s.id, s])
+      );
       setTasks((prev) =>
-        prev.map((t) => (t.id === id ? { ...t, ...taskData } : t))
+        prev.map((t) => {
+          if (t.id === id) return { ...t, ...taskData };
+          const schedule = rescheduled.get(t.id);
+          return schedule
+            ? { ...t, start_date: schedule.start_date, end_date: schedule.end_date }
+            : t;
+        })
       );
     }
   };
@@ -363,7 +373,6 @@ function AppContent() {
       {/* Diff Viewer Modal */}
       {showDiffViewer && (
         <DiffViewer
-          currentTasks={tasks}
           onClose={() => setShowDiffViewer(false)}
         />
       )}
@@ -1,65 +1,69 @@
 /**
  * 差分ビューアコンポーネント
  * CSVファイルと現在のタスクを比較し、追加・削除・変更を視覚的に表示する
+ * 比較はサーバーで行う（大きなCSVでもブラウザで全件をパース・比較しない）
  */
 
 import { useState, useCallback, useMemo } from 'react';
-import type { Task } from '../../types/gantt';
 import type { DiffResult, TaskDiff } from '../../types/diff';
-import { compareTasks, parseCSVToTasks } from '../../utils/diffUtils';
+import { diffCSV } from '../../services/api';
 import './DiffViewer.css';
 
 interface DiffViewerProps {
-    currentTasks: Task[];
     onClose: () => void;
 }
 
 type TabType = 'all' | 'added' | 'deleted' | 'modified';
 
-export function DiffViewer({ currentTasks, onClose }: DiffViewerProps) {
+export function DiffViewer({ onClose }: DiffViewerProps) {
     const [diffResult, setDiffResult] = useState<DiffResult | null>(null);
     const [error, setError] = useState<string | null>(null);
     const [fileName, setFileName] = useState<string>('');
     const [activeTab, setActiveTab] = useState<TabType>('all');
     const [expandedIds, setExpandedIds] = useState<Set<number>>(new Set());
-    const [fileTasks, setFileTasks] = useState<Task[]>([]); // CSVから読み込んだタスクを保持
+    const [file, setFile] = useState<File | null>(null); // 選択したCSVファイルを保持（オプション変更時に再比較）
+    const [comparing, setComparing] = useState<boolean>(false);
     const [excludeDateFields, setExcludeDateFields] = useState<boolean>(true); // デフォルトで日付を除外
     const [searchText, setSearchText] = useState<string>(''); // 検索テキスト
 
+    // サーバーで比較する
+    const compare = useCallback(async (target: File, excludeDates: boolean) => {
+        setComparing(true);
+        const result = await diffCSV(target, { excludeDates });
+        setComparing(false);
+        if (!result.success || !result.data) {
+            setError(`差分の計算に失敗しました: ${result.error ?? ''}`);
+            return;
+        }
+        const { summary } = result.data;
+        if (summary.addedCount + summary.deletedCount + summary.modifiedCount + summary.unchangedCount === 0) {
+            setError('CSVファイルからタスクを読み込めませんでした。フォーマットを確認してください。');
+            return;
+        }
+        setDiffResult(result.data);
+    }, []);
+
     // ファイル選択ハンドラ
     const handleFileSelect = useCallback(async (event: React.ChangeEvent<HTMLInputElement>) => {
-        const file = event.target.files?.[0];
-        if (!file) return;
+        const selected = event.target.files?.[0];
+        if (!selected) return;
 
-        setFileName(file.name);
+        setFileName(selected.name);
+        setFile(selected);
         setError(null);
-
-        try {
-            const text = await file.text();
-            const parsed = parseCSVToTasks(text);
-
-            if (parsed.length === 0) {
-                setError('CSVファイルからタスクを読み込めませんでした。フォーマットを確認してください。');
-                return;
-            }
-
-            setFileTasks(parsed); // 読み込んだタスクを保持
-            const result = compareTasks(currentTasks, parsed, { excludeDateFields });
-            setDiffResult(result);
-            setExpandedIds(new Set()); // リセット
-        } catch (err) {
-            setError(err instanceof Error ? err.message : 'ファイルの読み込みに失敗しました');
-        }
-    }, [currentTasks, excludeDateFields]);
+        setDiffResult(null);
+        setExpandedIds(new Set()); // リセット
+        await compare(selected, excludeDateFields);
+    }, [compare, excludeDateFields]);
 
     // 日付除外オプション変更時に再比較
-    const handleExcludeDateChange = useCallback((checked: boolean) => {
+    const handleExcludeDateChange = useCallback(async (checked: boolean) => {
         setExcludeDateFields(checked);
-        if (fileTasks.length > 0) {
-            const result = compareTasks(currentTasks, fileTasks, { excludeDateFields: checked });
-            setDiffResult(result);
+        if (file) {
+            setError(null);
+            await compare(file, checked);
         }
-    }, [currentTasks, fileTasks]);
+    }, [compare, file]);
 
     /**
      * 検索キーワードによるフィルタリング
@@ -191,6 +195,7 @@ export function DiffViewer({ currentTasks, onClose }: DiffViewerProps) {
                     </div>
 
                     {error && <div className="error-message">{error}</div>}
+                    {comparing && <div className="initial-message">比較中...</div>}
 
                     {/* 差分結果 */}
                     {diffResult && (
@@ -328,7 +333,7 @@ export function DiffViewer({ currentTasks, onClose }: DiffViewerProps) {
                         </>
                     )}
 
-                    {!diffResult && !error && (
+                    {!diffResult && !error && !comparing && (
                         <div className="initial-message">
                             <p>📋 CSVファイルを選択すると、現在のタスクとの差分を比較できます。</p>
                             <ul>
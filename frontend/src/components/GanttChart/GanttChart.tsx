@@ -1,7 +1,7 @@
 import { useEffect, useRef, useCallback, useState } from 'react';
 import { gantt } from 'dhtmlx-gantt';
 import 'dhtmlx-gantt/codebase/dhtmlxgantt.css';
-import type { Task, Link, TaskKind, TaskFilter } from '../../types/gantt';
+import type { Task, Link, TaskKind, TaskFilter, TaskReorderItem } from '../../types/gantt';
 import {
   ContextMenu,
   getTaskContextMenuItems,
@@ -628,7 +628,6 @@ export function GanttChart({
           parent: task.parent || 0,
           kind_task: task.kind_task,
           owner_id: task.owner_id,
-          sortorder: task.sortorder, // sortorderも保存
           hyperlink: task.hyperlink,
           ToDo: task.ToDo,
           memo: task.memo,
@@ -705,16 +704,26 @@ export function GanttChart({
       // parent: new parent id
       // tindex: new index (0-based)
 
-      // Get all children of the new parent (siblings including the moved task)
-      const children = gantt.getChildren(parent);
-
-      const items = children.map((childId, index) => {
-        return {
-          id: Number(childId),
-          sortorder: index,
-          parent: Number(parent),
-        };
+      // 動かしたタスクだけを、動かしていない兄弟を基準に送る
+      // （動かすタスク同士を基準にすると、DB上ではまだ移動前の親にいるため親が変わらない）
+      const children = gantt.getChildren(parent).map(Number);
+      const movedIds = new Set([id, ...selectedTasks].map(Number));
+      const leading: TaskReorderItem[] = [];
+      const trailing: TaskReorderItem[] = [];
+      children.forEach((childId, index) => {
+        if (!movedIds.has(childId)) return;
+        const next = children.slice(index + 1).find((sibling) => !movedIds.has(sibling));
+        const previous = children.slice(0, index).reverse().find((sibling) => !movedIds.has(sibling));
+        if (next !== undefined) {
+          leading.push({ id: childId, before: next });
+        } else if (previous !== undefined) {
+          // 同じタスクの直後に順に入れると逆順になるので、後ろのタスクから送る
+          trailing.unshift({ id: childId, after: previous });
+        } else {
+          leading.push({ id: childId, parent: Number(parent), sortorder: index });
+        }
       });
+      const items = [...leading, ...trailing];
 
       // Send batch update to backend
       isInternalChange.current = true;
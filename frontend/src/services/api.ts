@@ -4,10 +4,30 @@ import type {
   Task,
   Link,
   GanttData,
+  GanttChanges,
   CreateTaskRequest,
   UpdateTaskRequest,
   TaskReorderRequest,
+  ExportCSVOptions,
+  GetTasksOptions,
+  GetTreeOptions,
+  TaskTree,
+  SubtreeClone,
+  DateWindow,
+  BatchOperation,
+  BatchResponse,
+  TaskUpdateResponse,
+  CriticalPath,
+  TaskDependencies,
+  TaskRollup,
+  TaskSearchResult,
+  SearchTasksOptions,
+  DailyEdits,
+  EditedTasks,
+  GetEditedTasksOptions,
+  ChangeFeedHandlers,
 } from '../types/gantt';
+import type { DiffApplyResult, DiffCSVOptions, DiffResult, DiffSelection } from '../types/diff';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
@@ -19,9 +39,93 @@ const api = axios.create({
 });
 
 // タスク API
-export async function getTasks(): Promise<ApiResponse<GanttData>> {
+/**
+ * 全タスク・リンクを取得
+ * fields を指定するとそのフィールドだけを返す（memo などは getTask で個別に取得）
+ * from/to を指定すると表示期間に重なるタスクとその祖先だけを返す
+ */
+export async function getTasks(
+  options: GetTasksOptions = {}
+): Promise<ApiResponse<GanttData>> {
   try {
-    const response = await api.get('/api/tasks');
+    const response = await api.get('/api/tasks', {
+      params: {
+        fields: options.fields?.join(','),
+        from: options.from,
+        to: options.to,
+      },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** トップレベルのタスクを取得（depth を指定するとその深さまで） */
+export async function getRootTasks(
+  options: GetTreeOptions = {}
+): Promise<ApiResponse<TaskTree>> {
+  try {
+    const response = await api.get('/api/tasks/roots', {
+      params: { depth: options.depth, fields: options.fields?.join(',') },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** 折りたたまれたタスクの子孫を取得（展開時に必要な分だけ読み込む） */
+export async function getTaskChildren(
+  id: number,
+  options: GetTreeOptions = {}
+): Promise<ApiResponse<TaskTree>> {
+  try {
+    const response = await api.get(`/api/tasks/${id}/children`, {
+      params: { depth: options.depth, fields: options.fields?.join(',') },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** すべて展開: 配下の全タスクを取得（taskId 省略時はツリー全体） */
+export async function expandAll(
+  taskId?: number,
+  fields?: string[]
+): Promise<ApiResponse<TaskTree>> {
+  try {
+    const response = await api.post('/api/tasks/expand-all', null, {
+      params: { task_id: taskId, fields: fields?.join(',') },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** すべて折りたたみ: 直下の子だけを取得（taskId 省略時はトップレベル） */
+export async function collapseAll(
+  taskId?: number,
+  fields?: string[]
+): Promise<ApiResponse<TaskTree>> {
+  try {
+    const response = await api.post('/api/tasks/collapse-all', null, {
+      params: { task_id: taskId, fields: fields?.join(',') },
+    });
     return { success: true, data: response.data };
   } catch (error) {
     return {
@@ -31,6 +135,47 @@ export async function getTasks(): Promise<ApiResponse<GanttData>> {
   }
 }
 
+/** 指定リビジョン以降の差分を取得（full_sync=true の場合は全件） */
+export async function getTaskChanges(
+  since: number
+): Promise<ApiResponse<GanttChanges>> {
+  try {
+    const response = await api.get('/api/tasks/changes', { params: { since } });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/**
+ * 他のクライアントの変更をサーバーから受け取る（Server-Sent Events）
+ * since 以降の変更を送ってもらい、再接続時は最後に受け取ったリビジョンから再開する
+ * 戻り値の関数を呼ぶと購読をやめる
+ */
+export function subscribeChanges(
+  since: number | undefined,
+  handlers: ChangeFeedHandlers
+): () => void {
+  const url = new URL('/api/events', API_BASE_URL);
+  if (since !== undefined) {
+    url.searchParams.set('since', String(since));
+  }
+  const source = new EventSource(url.toString());
+  source.addEventListener('changes', (event) => {
+    handlers.onChanges(JSON.parse((event as MessageEvent).data) as GanttChanges);
+  });
+  source.addEventListener('resync', (event) => {
+    handlers.onResync(JSON.parse((event as MessageEvent).data).revision);
+  });
+  if (handlers.onError) {
+    source.onerror = handlers.onError;
+  }
+  return () => source.close();
+}
+
 export async function getTask(id: number): Promise<ApiResponse<Task>> {
   try {
     const response = await api.get(`/api/tasks/${id}`);
@@ -60,7 +205,7 @@ export async function createTask(
 export async function updateTask(
   id: number,
   task: UpdateTaskRequest
-): Promise<ApiResponse<Task>> {
+): Promise<ApiResponse<TaskUpdateResponse>> {
   try {
     const response = await api.put(`/api/tasks/${id}`, task);
     return { success: true, data: response.data };
@@ -87,9 +232,32 @@ export async function deleteTask(
 }
 
 // ... (existing code)
-export async function cloneTask(id: number): Promise<ApiResponse<Task>> {
+export async function cloneTask(
+  id: number,
+  offsetDays = 0
+): Promise<ApiResponse<Task>> {
   try {
-    const response = await api.post(`/api/tasks/${id}/clone`);
+    const response = await api.post(`/api/tasks/${id}/clone`, null, {
+      params: { offset_days: offsetDays || undefined },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** 配下のタスクと内部のリンクごと複製（日付を offsetDays 日ずらす、1トランザクション） */
+export async function cloneSubtree(
+  id: number,
+  offsetDays = 0
+): Promise<ApiResponse<SubtreeClone>> {
+  try {
+    const response = await api.post(`/api/tasks/${id}/clone`, null, {
+      params: { deep: true, offset_days: offsetDays || undefined },
+    });
     return { success: true, data: response.data };
   } catch (error) {
     return {
@@ -113,10 +281,127 @@ export async function reorderTasks(
   }
 }
 
+/** タスク配下の集計を取得 */
+export async function getTaskRollup(id: number): Promise<ApiResponse<TaskRollup>> {
+  try {
+    const response = await api.get(`/api/tasks/${id}/rollup`);
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** タスクの先行・後続リンクを取得 */
+export async function getTaskDependencies(
+  id: number
+): Promise<ApiResponse<TaskDependencies>> {
+  try {
+    const response = await api.get(`/api/tasks/${id}/dependencies`);
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** プロジェクト配下の最早/最遅日程・余裕日数とクリティカルパスを取得 */
+export async function getCriticalPath(
+  projectId: number
+): Promise<ApiResponse<CriticalPath>> {
+  try {
+    const response = await api.get(`/api/tasks/${projectId}/critical-path`);
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** タスク名・メモ・ToDo・スケジュールを全文検索（スペース区切りの語はすべて一致） */
+export async function searchTasks(
+  q: string,
+  options: SearchTasksOptions = {}
+): Promise<ApiResponse<TaskSearchResult>> {
+  try {
+    const response = await api.get('/api/tasks/search', {
+      params: { q, limit: options.limit, offset: options.offset },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** 日ごとの編集タスク数を取得（from/to で期間を指定） */
+export async function getDailyEdits(
+  window: DateWindow = {}
+): Promise<ApiResponse<DailyEdits>> {
+  try {
+    const response = await api.get('/api/activity/daily', {
+      params: { from: window.from, to: window.to },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** 期間内に編集されたタスクを最後に編集された順に取得 */
+export async function getEditedTasks(
+  options: GetEditedTasksOptions = {}
+): Promise<ApiResponse<EditedTasks>> {
+  try {
+    const response = await api.get('/api/activity/tasks', {
+      params: {
+        fields: options.fields?.join(','),
+        from: options.from,
+        to: options.to,
+        limit: options.limit,
+      },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/** 複数のタスク・リンク操作を1トランザクションで適用（失敗時はすべて取り消し） */
+export async function applyBatch(
+  operations: BatchOperation[]
+): Promise<ApiResponse<BatchResponse>> {
+  try {
+    const response = await api.post('/api/batch', { operations });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
 // リンク API
-export async function getLinks(): Promise<ApiResponse<Link[]>> {
+export async function getLinks(
+  window: DateWindow = {}
+): Promise<ApiResponse<Link[]>> {
   try {
-    const response = await api.get('/api/links');
+    const response = await api.get('/api/links', { params: window });
     return { success: true, data: response.data };
   } catch (error) {
     return {
@@ -153,9 +438,16 @@ export async function deleteLink(id: number): Promise<ApiResponse<void>> {
 }
 
 // エクスポート/インポート API
-export async function exportCSV(): Promise<Blob | null> {
+export async function exportCSV(
+  options: ExportCSVOptions = {}
+): Promise<Blob | null> {
   try {
     const response = await api.get('/api/export/csv', {
+      params: {
+        table: options.table,
+        columns: options.columns?.join(','),
+        gzip: options.gzip,
+      },
       responseType: 'blob',
     });
     return response.data;
@@ -187,4 +479,64 @@ export async function importCSV(
   }
 }
 
+/**
+ * CSVファイル（旧）と現在のタスクの差分をサーバーで計算する
+ * ファイルはストリームで照合されるので、全タスクを取得しなくてよい
+ */
+export async function diffCSV(
+  file: File,
+  options: DiffCSVOptions = {}
+): Promise<ApiResponse<DiffResult>> {
+  try {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await api.post('/api/diff/csv', formData, {
+      params: {
+        exclude_dates: options.excludeDates,
+        include_unchanged: options.includeUnchanged,
+      },
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
+/**
+ * 差分のうち選んだ項目をマージする
+ * baseRevision を渡すと、比較後にタスクが変わっていた場合は失敗する（409）
+ */
+export async function applyCSVDiff(
+  file: File,
+  selection: DiffSelection,
+  options: { excludeDates?: boolean; baseRevision?: number } = {}
+): Promise<ApiResponse<DiffApplyResult>> {
+  try {
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('selection', JSON.stringify(selection));
+    const response = await api.post('/api/diff/csv/apply', formData, {
+      params: {
+        exclude_dates: options.excludeDates,
+        base_revision: options.baseRevision,
+      },
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return {
+      success: false,
+      error: error instanceof Error ? error.message : '通信エラー',
+    };
+  }
+}
+
 export default api;
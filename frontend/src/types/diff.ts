@@ -35,4 +35,26 @@ export interface DiffResult {
         modifiedCount: number;
         unchangedCount: number;
     };
+    revision?: number;       // 比較したときのリビジョン（サーバーで比較した場合）
+}
+
+/** サーバー側比較のオプション */
+export interface DiffCSVOptions {
+    excludeDates?: boolean;      // 開始日・終了日を比較から除外
+    includeUnchanged?: boolean;  // 変更なしのタスクも一覧に含める（件数は常に返る）
+}
+
+/** 差分のうちマージする項目（タスクID） */
+export interface DiffSelection {
+    modified?: number[];  // ファイルの値に戻す
+    deleted?: number[];   // 同じIDで作り直す
+    added?: number[];     // 削除する（子孫も含む）
+}
+
+/** 差分マージの結果 */
+export interface DiffApplyResult {
+    revision: number;
+    updated: number[];
+    restored: number[];
+    removed: number[];
 }
@@ -15,7 +15,8 @@ export interface Task {
   parent: number; // 0 = トップレベル
   kind_task: TaskKind;
   owner_id: OwnerId;
-  sortorder: number;
+  sortorder: number; // 兄弟内の位置（参考値）
+  sort_key?: string; // 兄弟内の並び順キー（この順に並べる）
   color?: string; // "#RRGGBBAA"
   textColor?: string;
   ToDo?: string;
@@ -25,7 +26,13 @@ export interface Task {
   mail?: string;
   memo?: string;
   hyperlink?: string;
-  edit_date?: string; // カンマ区切りの編集日履歴
+  edit_date?: string; // カンマ区切りの編集日履歴（サーバーの task_edits から組み立てる）
+  // 配下タスクの集計（サーバーで計算。子がなければ自身の値）
+  child_count?: number;
+  descendant_count?: number; // 配下の全タスク数
+  rollup_start?: string | null; // 配下の最早開始
+  rollup_end?: string | null; // 配下の最遅終了
+  rollup_progress?: number | null; // 期間で重み付けした進捗
   // フロントエンド専用
   expanded?: boolean; // 展開状態（プロジェクトのみ）
   open?: boolean; // MLX Gantt用（expandedと同義）
@@ -73,6 +80,29 @@ export interface AppSettings {
 export interface GanttData {
   tasks: Task[];
   links: Link[];
+  revision?: number; // 取得時点のリビジョン（差分同期の起点）
+}
+
+/** 差分同期レスポンス（GET /api/tasks/changes?since=） */
+export interface GanttChanges {
+  revision: number;
+  full_sync: boolean; // true の場合 tasks/links は全件（置き換える）
+  tasks: Task[]; // 追加・更新されたタスク
+  links: Link[]; // 追加・更新されたリンク
+  deleted_tasks: number[];
+  deleted_links: number[];
+}
+
+/** 自動スケジューリングで移動したタスクの新しい日付 */
+export interface TaskSchedule {
+  id: number;
+  start_date: string;
+  end_date: string;
+}
+
+/** タスク更新レスポンス */
+export interface TaskUpdateResponse extends Task {
+  rescheduled: TaskSchedule[]; // 日付変更に伴いリンクに沿って後ろにずれた後続タスク
 }
 
 /** タスク作成リクエスト */
@@ -99,21 +129,192 @@ export interface UpdateTaskRequest {
   parent?: number;
   kind_task?: TaskKind;
   owner_id?: OwnerId;
-  sortorder?: number;
   color?: string;
   textColor?: string;
   memo?: string;
   hyperlink?: string;
+  before?: number; // このタスクの直前に移動（位置は sortorder ではなく before/after で変える）
+  after?: number; // このタスクの直後に移動
 }
 
 /** タスク並び替えアイテム */
 export interface TaskReorderItem {
   id: number;
-  sortorder: number;
-  parent: number;
+  sortorder?: number; // 移動先での位置（0始まり、負なら先頭）
+  parent?: number; // 移動先の親（省略時は現在の親）
+  before?: number; // このタスクの直前に移動（parent/sortorder より優先）
+  after?: number; // このタスクの直後に移動
+}
+
+/** サブツリー複製レスポンス */
+export interface SubtreeClone {
+  root_id: number; // 複製したサブツリーの根
+  id_map: Record<string, number>; // 元のタスクID -> 複製のタスクID
+  tasks: Task[]; // 親→子の順（兄弟は並び順）
+  links: Link[]; // サブツリー内のリンクの複製
+  revision: number;
 }
 
 /** タスク並び替えリクエスト */
 export interface TaskReorderRequest {
   items: TaskReorderItem[];
 }
+
+/** タスク一覧取得オプション */
+export interface GetTasksOptions {
+  fields?: string[]; // 返すフィールド（省略時は全フィールド、id は常に含まれる）
+  from?: string; // 表示期間の開始 YYYY-MM-DD（重なるタスクとその祖先のみ返す）
+  to?: string; // 表示期間の終了 YYYY-MM-DD
+}
+
+/** ツリーの部分取得オプション */
+export interface GetTreeOptions {
+  depth?: number; // 取得する深さ（既定: 1 = 直下の子のみ）
+  fields?: string[];
+}
+
+/** ツリーの部分取得で返るタスク */
+export type TaskNode = Partial<Task> & {
+  id: number;
+  level: number; // 起点からの深さ（直下の子が1）
+  has_children: boolean;
+};
+
+/** ツリーの部分取得レスポンス（行き掛け順、兄弟は sortorder 順） */
+export interface TaskTree {
+  parent: number; // 起点のタスクID（0 = ルート）
+  depth: number | null; // null = すべての深さ
+  tasks: TaskNode[];
+  revision: number;
+}
+
+/** 表示期間オプション */
+export type DateWindow = Pick<GetTasksOptions, 'from' | 'to'>;
+
+/** CSVエクスポートオプション */
+export interface ExportCSVOptions {
+  table?: 'tasks' | 'links'; // 既定: tasks
+  columns?: string[]; // 出力するカラム（省略時は全カラム）
+  gzip?: boolean; // gzip圧縮（.csv.gz）
+}
+
+/** 実ID、または同じバッチ内で先に作成した操作の temp_id */
+export type EntityRef = number | string;
+
+/** 一括変更の1操作（配列の順に1トランザクションで適用） */
+export type BatchOperation =
+  | { op: 'create'; temp_id?: string; data: Omit<CreateTaskRequest, 'parent'> & { parent?: EntityRef } }
+  | { op: 'update'; id: EntityRef; data: Omit<UpdateTaskRequest, 'parent'> & { parent?: EntityRef } }
+  | { op: 'delete'; id: EntityRef }
+  | { op: 'link_create'; temp_id?: string; data: { source: EntityRef; target: EntityRef; type?: number } }
+  | { op: 'link_delete'; id: EntityRef };
+
+/** 一括変更のレスポンス（変更された行のみ） */
+export interface BatchResponse {
+  revision: number;
+  id_map: Record<string, number>; // temp_id -> 実ID
+  tasks: Task[];
+  links: Link[];
+  deleted_tasks: number[];
+  deleted_links: number[];
+}
+
+/** クリティカルパス解析の各タスクの結果 */
+export interface TaskSlack {
+  id: number;
+  early_start: string;
+  early_finish: string;
+  late_start: string;
+  late_finish: string;
+  total_float: number; // 余裕日数
+  critical: boolean;
+}
+
+/** クリティカルパス解析結果（kind_task=2 のプロジェクト配下） */
+export interface CriticalPath {
+  task_id: number;
+  revision: number;
+  project_start: string | null;
+  project_finish: string | null;
+  tasks: TaskSlack[];
+  critical_path: number[]; // 余裕日数0のタスクID（早い開始順）
+}
+
+/** 配下タスクの集計（子がなければ自身の値） */
+export interface TaskRollup {
+  id: number;
+  child_count: number;
+  descendant_count: number; // 配下の全タスク数
+  rollup_start: string | null; // 配下の最早開始
+  rollup_end: string | null; // 配下の最遅終了
+  rollup_progress: number | null; // 期間で重み付けした進捗
+}
+
+/** タスクに出入りするリンク */
+export interface TaskDependencies {
+  task_id: number;
+  predecessors: Link[];
+  successors: Link[];
+}
+
+/** 検索結果の祖先（ルートから親まで） */
+export interface TaskPathItem {
+  id: number;
+  text: string;
+}
+
+/** 全文検索の1件 */
+export interface TaskSearchHit
+  extends Pick<Task, 'id' | 'parent' | 'text' | 'start_date' | 'end_date' | 'progress' | 'kind_task'> {
+  snippet: string; // 一致箇所の抜粋（検索語を【】で囲む）
+  rank: number; // 小さいほど一致度が高い
+  path: TaskPathItem[];
+}
+
+/** 全文検索の結果 */
+export interface TaskSearchResult {
+  query: string;
+  results: TaskSearchHit[];
+  has_more: boolean;
+  revision: number;
+}
+
+export interface SearchTasksOptions {
+  limit?: number;
+  offset?: number;
+}
+
+/** 日ごとの編集タスク数 */
+export interface EditCount {
+  date: string; // "YYYY-MM-DD"
+  count: number;
+}
+
+export interface DailyEdits {
+  days: EditCount[]; // 編集のあった日だけ（日付順）
+  revision: number;
+}
+
+/** 期間内に編集されたタスク */
+export type EditedTask = Partial<Task> & {
+  id: number;
+  last_edited: string; // 期間内で最後に編集された日
+  edit_days: number; // 期間内で編集された日数
+};
+
+export interface EditedTasks {
+  tasks: EditedTask[]; // 最後に編集された日の新しい順
+  revision: number;
+}
+
+export interface GetEditedTasksOptions extends DateWindow {
+  fields?: string[];
+  limit?: number;
+}
+
+/** 変更フィード（GET /api/events）のハンドラ */
+export interface ChangeFeedHandlers {
+  onChanges: (changes: GanttChanges) => void; // 前回のイベント以降の差分
+  onResync: (revision: number) => void; // 差分が大きいため全件を取り直す
+  onError?: (event: Event) => void; // 切断時（EventSource は自動で再接続する）
+}